@@ -1,12 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
-from typing import Optional
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Optional
 import os
-import tempfile
-import uuid
+import asyncio
+import functools
+import json
 import logging
-from app.services.image_service import ImageService
+from app.services.image_service import ImageService, ImageTooLargeError, BATCH_OPERATIONS, BATCH_MAX_FILES, RESIZE_MODES, PIPELINE_FORMATS
 from app.services.file_service import FileService
+from app.services.executor_service import executor_service
+from app.services.cache_service import result_cache
+from app.services.artifact_service import artifact_store
+from app.services.metrics_service import metrics
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -15,6 +20,22 @@ router = APIRouter()
 image_service = ImageService()
 file_service = FileService()
 
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
+
+def _validate_resize_options(resize_type: str, width: Optional[int], height: Optional[int], percentage: Optional[float],
+                             resize_mode: str):
+    """Validate parameters based on resize type"""
+    if resize_mode not in RESIZE_MODES:
+        raise HTTPException(status_code=400, detail=f"Resize mode must be one of: {', '.join(RESIZE_MODES)}")
+    if resize_type == "percentage":
+        if not percentage or percentage <= 0:
+            raise HTTPException(status_code=400, detail="Percentage must be specified and greater than 0")
+    elif resize_type == "pixels":
+        if not width and not height:
+            raise HTTPException(status_code=400, detail="At least one dimension (width or height) must be specified for pixel resize")
+    else:
+        raise HTTPException(status_code=400, detail="Resize type must be 'pixels' or 'percentage'")
+
 @router.post("/resize")
 async def resize_image(
     file: UploadFile = File(...),
@@ -22,7 +43,8 @@ async def resize_image(
     height: Optional[int] = Form(None),
     resize_type: Optional[str] = Form("pixels"),
     percentage: Optional[float] = Form(None),
-    maintain_aspect_ratio: Optional[str] = Form("true")
+    maintain_aspect_ratio: Optional[str] = Form("true"),
+    resize_mode: str = Form("quality")  # "quality" or "fast" reduced-resolution decoding
 ):
     """Resize image with advanced options including percentage and aspect ratio control"""
     try:
@@ -32,40 +54,58 @@ async def resize_image(
         # Convert string boolean to actual boolean
         maintain_ratio = maintain_aspect_ratio.lower() == "true"
         
-        # Validate parameters based on resize type
-        if resize_type == "percentage":
-            if not percentage or percentage <= 0:
-                raise HTTPException(status_code=400, detail="Percentage must be specified and greater than 0")
-        elif resize_type == "pixels":
-            if not width and not height:
-                raise HTTPException(status_code=400, detail="At least one dimension (width or height) must be specified for pixel resize")
-        else:
-            raise HTTPException(status_code=400, detail="Resize type must be 'pixels' or 'percentage'")
+        _validate_resize_options(resize_type, width, height, percentage, resize_mode)
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Resize image with new parameters
-            output_path = await image_service.resize_image_advanced(
-                temp_path, 
-                width, 
-                height, 
-                resize_type, 
-                percentage, 
-                maintain_ratio
+            cache_key = result_cache.make_key(
+                "image/resize",
+                [content_hash],
+                {"width": width, "height": height, "resize_type": resize_type,
+                 "percentage": percentage, "maintain_aspect_ratio": maintain_ratio, "resize_mode": resize_mode}
             )
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Resize image with new parameters
+                output_path = await executor_service.run(
+                    "image.resize",
+                    image_service.resize_image_advanced,
+                    temp_path, 
+                    width, 
+                    height, 
+                    resize_type, 
+                    percentage, 
+                    maintain_ratio,
+                    resize_mode
+                )
+                metrics.record_files("image.resize", [temp_path], output_path)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
             return FileResponse(
                 output_path,
                 media_type=file_service.get_mime_type(output_path),
                 filename="resized_image.jpg",
-                headers={"Content-Disposition": "attachment; filename=resized_image.jpg"}
+                headers={"Content-Disposition": "attachment; filename=resized_image.jpg"},
+                background=cleanup
             )
         finally:
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error resizing image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error resizing image: {str(e)}")
@@ -73,7 +113,8 @@ async def resize_image(
 @router.post("/compress")
 async def compress_image(
     file: UploadFile = File(...),
-    quality: int = Form(85)
+    quality: int = Form(85),
+    max_latency_ms: Optional[int] = Form(None)  # Latency budget, the best candidate finished in time wins
 ):
     """Compress image with specified quality"""
     try:
@@ -83,23 +124,49 @@ async def compress_image(
         if quality < 10 or quality > 100:
             raise HTTPException(status_code=400, detail="Quality must be between 10 and 100")
         
+        if max_latency_ms is not None and max_latency_ms <= 0:
+            raise HTTPException(status_code=400, detail="max_latency_ms must be a positive integer")
+        
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Compress image
-            output_path = await image_service.compress_image(temp_path, quality)
+            # Only complete candidate races are cached, those do not depend on the latency budget
+            cache_key = result_cache.make_key("image/compress", [content_hash], {"quality": quality})
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Compress image
+                deadline = max_latency_ms / 1000 if max_latency_ms else None
+                output_path, complete = await executor_service.run(
+                    "image.compress", image_service.compress_image_with_status, temp_path, quality, deadline
+                )
+                metrics.record_files("image.compress", [temp_path], output_path, ratio=True)
+                if complete:
+                    await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
             return FileResponse(
                 output_path,
                 media_type=file_service.get_mime_type(output_path),
                 filename="compressed_image.jpg",
-                headers={"Content-Disposition": "attachment; filename=compressed_image.jpg"}
+                headers={"Content-Disposition": "attachment; filename=compressed_image.jpg"},
+                background=cleanup
             )
         finally:
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error compressing image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error compressing image: {str(e)}")
@@ -141,22 +208,238 @@ async def crop_image(
             raise HTTPException(status_code=400, detail="File must be a valid image format")
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Crop image
-            output_path = await image_service.crop_image(temp_path, x, y, width, height)
+            cache_key = result_cache.make_key(
+                "image/crop",
+                [content_hash],
+                {"x": x, "y": y, "width": width, "height": height}
+            )
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Crop image
+                output_path = await executor_service.run("image.crop", image_service.crop_image, temp_path, x, y, width, height)
+                metrics.record_files("image.crop", [temp_path], output_path)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
             return FileResponse(
                 output_path,
                 media_type=file_service.get_mime_type(output_path),
                 filename="cropped_image.jpg",
-                headers={"Content-Disposition": "attachment; filename=cropped_image.jpg"}
+                headers={"Content-Disposition": "attachment; filename=cropped_image.jpg"},
+                background=cleanup
             )
         finally:
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error cropping image: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error cropping image: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error cropping image: {str(e)}")
+
+@router.post("/batch")
+async def batch_images(
+    files: List[UploadFile] = File(...),  # Images and/or zip archives of images
+    operation: str = Form(...),  # "resize" or "compress"
+    width: Optional[int] = Form(None),
+    height: Optional[int] = Form(None),
+    resize_type: Optional[str] = Form("pixels"),
+    percentage: Optional[float] = Form(None),
+    maintain_aspect_ratio: Optional[str] = Form("true"),
+    resize_mode: str = Form("quality"),
+    quality: int = Form(85)
+):
+    """Resize or compress many images with one parameter set, streamed back as a zip
+    
+    Items are processed in parallel. An image that fails does not fail the
+    batch, batch_report.json in the archive lists the outcome of every item.
+    """
+    try:
+        if operation not in BATCH_OPERATIONS:
+            raise HTTPException(status_code=400, detail=f"Operation must be one of: {', '.join(BATCH_OPERATIONS)}")
+        
+        for file in files:
+            if not file.filename or not file_service.validate_file_type(file.filename, IMAGE_EXTENSIONS + ['.zip']):
+                raise HTTPException(status_code=400, detail=f"File {file.filename} must be a valid image format or a zip archive")
+        
+        if operation == "resize":
+            _validate_resize_options(resize_type, width, height, percentage, resize_mode)
+            options = {"width": width, "height": height, "resize_type": resize_type,
+                       "percentage": percentage, "maintain_aspect_ratio": maintain_aspect_ratio.lower() == "true",
+                       "resize_mode": resize_mode}
+        else:
+            if quality < 10 or quality > 100:
+                raise HTTPException(status_code=400, detail="Quality must be between 10 and 100")
+            options = {"quality": quality}
+        
+        # Save uploaded files temporarily
+        temp_files = []
+        content_hashes = []
+        for file in files:
+            temp_path, content_hash = await file_service.save_temp_file(file)
+            temp_files.append((file.filename, temp_path))
+            content_hashes.append(content_hash)
+        
+        items = []
+        streaming = False
+        
+        try:
+            cache_key = result_cache.make_key(
+                f"image/batch/{operation}",
+                content_hashes,
+                options
+            )
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached:
+                return FileResponse(
+                    cached.path,
+                    media_type="application/zip",
+                    filename=f"batch_{operation}.zip",
+                    headers={"Content-Disposition": f"attachment; filename=batch_{operation}.zip"},
+                    background=artifact_store.cleanup_task(cached.path)
+                )
+            
+            # Unpack archives before the response starts, so a bad archive is still a 400
+            for filename, temp_path in temp_files:
+                if not file_service.validate_file_type(filename, ['.zip']):
+                    items.append((filename, temp_path))
+                    continue
+                try:
+                    items += await executor_service.run(
+                        "image.batch", file_service.extract_zip, temp_path,
+                        IMAGE_EXTENSIONS, BATCH_MAX_FILES - len(items)
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=f"{filename}: {str(e)}")
+                file_service.cleanup_file(temp_path)
+            
+            if not items:
+                raise HTTPException(status_code=400, detail="No images found in the upload")
+            if len(items) > BATCH_MAX_FILES:
+                raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_FILES} images can be processed in one batch")
+            
+            def archive_members():
+                try:
+                    # Each result is zipped as soon as it is ready, items run on the thread
+                    # pool within the batch operation's limit
+                    yield from image_service.iter_batch(
+                        items, operation, options, functools.partial(executor_service.submit, "image.batch"),
+                        executor_service.get_profile("image.batch").max_concurrency
+                    )
+                finally:
+                    for _, temp_path in items:
+                        file_service.cleanup_file(temp_path)
+            
+            # Stream the archive as it is built, caching a copy on the way
+            response = StreamingResponse(
+                result_cache.tee(cache_key, file_service.stream_zip(archive_members()), ".zip"),
+                media_type="application/zip",
+                headers={"Content-Disposition": f"attachment; filename=batch_{operation}.zip"}
+            )
+            streaming = True
+            return response
+        finally:
+            # Clean up temp files, a streamed response removes them once done
+            if not streaming:
+                for _, temp_path in temp_files + items:
+                    file_service.cleanup_file(temp_path)
+            
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error processing image batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing image batch: {str(e)}")
+
+@router.post("/pipeline")
+async def image_pipeline(
+    file: UploadFile = File(...),
+    operations: str = Form(...),  # JSON list, e.g. [{"op": "orient"}, {"op": "resize", "width": 800}]
+    output_format: str = Form("jpeg"),  # "jpeg", "png" or "webp"
+    quality: int = Form(95)
+):
+    """Run several operations (orient, crop, resize, enhance) on one decoded image and encode it once
+    
+    Crops and resizes are fused into a single resample, a crop after a resize
+    is applied to the source region before it.
+    """
+    try:
+        if not file.filename or not file_service.validate_file_type(file.filename, IMAGE_EXTENSIONS):
+            raise HTTPException(status_code=400, detail="File must be a valid image format")
+        
+        if output_format not in PIPELINE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Output format must be one of: {', '.join(PIPELINE_FORMATS)}")
+        
+        if quality < 10 or quality > 100:
+            raise HTTPException(status_code=400, detail="Quality must be between 10 and 100")
+        
+        try:
+            steps = image_service.plan_pipeline(json.loads(operations))
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Operations must be valid JSON: {str(e)}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Save uploaded file temporarily
+        temp_path, content_hash = await file_service.save_temp_file(file)
+        
+        try:
+            cache_key = result_cache.make_key(
+                "image/pipeline",
+                [content_hash],
+                {"steps": json.dumps(steps, sort_keys=True), "output_format": output_format, "quality": quality}
+            )
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                try:
+                    output_path = await executor_service.run(
+                        "image.pipeline", image_service.run_pipeline, temp_path, steps, output_format, quality
+                    )
+                except ImageTooLargeError:
+                    raise
+                except ValueError as e:
+                    # Steps that do not fit this image, e.g. a crop outside of it
+                    raise HTTPException(status_code=400, detail=str(e))
+                metrics.record_files("image.pipeline", [temp_path], output_path)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
+            
+            filename = f"processed_image.{PIPELINE_FORMATS[output_format][1]}"
+            return FileResponse(
+                output_path,
+                media_type=file_service.get_mime_type(output_path),
+                filename=filename,
+                headers={"Content-Disposition": f"attachment; filename={filename}"},
+                background=cleanup
+            )
+        finally:
+            # Clean up temp files
+            file_service.cleanup_file(temp_path)
+            
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error running image pipeline: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error running image pipeline: {str(e)}")
@@ -0,0 +1,185 @@
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+from typing import Any, Callable, Dict, List
+import asyncio
+import functools
+import logging
+from app.services.pdf_service import PDFService, COMPRESS_PROFILES, DEFAULT_COMPRESS_PROFILE
+from app.services.file_service import FileService
+from app.services.executor_service import executor_service
+from app.services.job_service import job_service, COMPLETED, EXPIRED
+from app.services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# Initialize services
+pdf_service = PDFService()
+file_service = FileService()
+
+def _run_merge(input_paths: List[str], params: Dict[str, Any], progress_callback: Callable[[int, int], None]) -> str:
+    output_path = pdf_service.merge_pdfs(input_paths, progress_callback=progress_callback)
+    metrics.record_files("job.merge", input_paths, output_path)
+    return output_path
+
+def _run_compress(input_paths: List[str], params: Dict[str, Any], progress_callback: Callable[[int, int], None]) -> str:
+    output_path = pdf_service.compress_pdf(
+        input_paths[0],
+        progress_callback=progress_callback,
+        profile=params.get("profile", DEFAULT_COMPRESS_PROFILE)
+    )
+    metrics.record_files("job.compress", input_paths, output_path, ratio=True)
+    return output_path
+
+def _run_pdf_to_word(input_paths: List[str], params: Dict[str, Any], progress_callback: Callable[[int, int], None]) -> str:
+    output_path = pdf_service.pdf_to_word(
+        input_paths[0],
+        progress_callback=progress_callback,
+        submit=functools.partial(executor_service.submit, "pdf.to_word_range")
+    )
+    metrics.record_files("job.pdf_to_word", input_paths, output_path)
+    return output_path
+
+job_service.register_handler("merge", _run_merge)
+job_service.register_handler("compress", _run_compress)
+job_service.register_handler("pdf_to_word", _run_pdf_to_word)
+
+def _accepted(job: Dict[str, Any]) -> JSONResponse:
+    """202 response pointing the client at the status and result endpoints"""
+    job_id = job["job_id"]
+    return JSONResponse(
+        status_code=202,
+        content={
+            **job,
+            "status_url": f"/jobs/{job_id}",
+            "progress_url": f"/jobs/{job_id}/progress",
+            "result_url": f"/jobs/{job_id}/result",
+        }
+    )
+
+@router.post("/merge")
+async def submit_merge(files: List[UploadFile] = File(...)):
+    """Submit a background job that merges multiple PDF files into one"""
+    try:
+        if len(files) < 2:
+            raise HTTPException(status_code=400, detail="At least 2 PDF files are required for merging")
+
+        for file in files:
+            if not file.filename.lower().endswith('.pdf'):
+                raise HTTPException(status_code=400, detail=f"File {file.filename} is not a PDF")
+
+        temp_files = []
+        try:
+            for file in files:
+                temp_path, _ = await file_service.save_temp_file(file)
+                temp_files.append(temp_path)
+        except Exception:
+            for temp_path in temp_files:
+                file_service.cleanup_file(temp_path)
+            raise
+
+        job = await job_service.submit(
+            "merge", temp_files,
+            result_filename="merged_document.pdf",
+            media_type="application/pdf"
+        )
+        return _accepted(job)
+
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error submitting merge job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting merge job: {str(e)}")
+
+@router.post("/compress")
+async def submit_compress(file: UploadFile = File(...), profile: str = Form(DEFAULT_COMPRESS_PROFILE)):
+    """Submit a background job that compresses a PDF file"""
+    try:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="File must be a PDF")
+        if profile not in COMPRESS_PROFILES:
+            raise HTTPException(status_code=400, detail=f"Profile must be one of: {', '.join(COMPRESS_PROFILES)}")
+
+        temp_path, _ = await file_service.save_temp_file(file)
+        job = await job_service.submit(
+            "compress", [temp_path], {"profile": profile},
+            result_filename="compressed_document.pdf",
+            media_type="application/pdf"
+        )
+        return _accepted(job)
+
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error submitting compress job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting compress job: {str(e)}")
+
+@router.post("/pdf-to-word")
+async def submit_pdf_to_word(file: UploadFile = File(...)):
+    """Submit a background job that converts a PDF to a Word document"""
+    try:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="File must be a PDF")
+
+        temp_path, _ = await file_service.save_temp_file(file)
+        job = await job_service.submit(
+            "pdf_to_word", [temp_path],
+            result_filename="converted_document.docx",
+            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+        return _accepted(job)
+
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error submitting PDF to Word job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting PDF to Word job: {str(e)}")
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status and progress of a job"""
+    job = await asyncio.to_thread(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/progress")
+async def get_job_progress(job_id: str):
+    """Get only the progress of a job, for frequent polling"""
+    job = await asyncio.to_thread(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": job["status"], **job["progress"]}
+
+@router.get("/{job_id}/result")
+async def download_job_result(job_id: str):
+    """Download the result of a completed job (can be repeated until it expires)"""
+    job = await asyncio.to_thread(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == EXPIRED:
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, no result available")
+
+    result = await asyncio.to_thread(job_service.get_result, job_id)
+    if result is None:
+        raise HTTPException(status_code=410, detail="Job result is no longer available")
+
+    return FileResponse(
+        result["path"],
+        media_type=result["media_type"],
+        filename=result["filename"],
+        headers={"Content-Disposition": f"attachment; filename={result['filename']}"}
+    )
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = await asyncio.to_thread(job_service.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,12 +1,17 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from typing import List, Optional
 import os
-import tempfile
-import uuid
+import asyncio
+import json
+import functools
 import logging
-from app.services.pdf_service import PDFService
+from app.services.pdf_service import PDFService, COMPRESS_PROFILES, DEFAULT_COMPRESS_PROFILE
 from app.services.file_service import FileService
+from app.services.executor_service import executor_service
+from app.services.cache_service import result_cache
+from app.services.artifact_service import artifact_store
+from app.services.metrics_service import metrics
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -29,26 +34,45 @@ async def merge_pdfs(files: List[UploadFile] = File(...)):
         
         # Save uploaded files temporarily
         temp_files = []
+        content_hashes = []
         for file in files:
-            temp_path = await file_service.save_temp_file(file)
+            temp_path, content_hash = await file_service.save_temp_file(file)
             temp_files.append(temp_path)
+            content_hashes.append(content_hash)
         
         try:
-            # Merge PDFs
-            output_path = await pdf_service.merge_pdfs(temp_files)
+            # Serve an identical earlier merge from the cache
+            cache_key = result_cache.make_key("merge", content_hashes)
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Merge PDFs
+                output_path = await executor_service.run("pdf.merge", pdf_service.merge_pdfs, temp_files)
+                metrics.record_files("pdf.merge", temp_files, output_path)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
             # Return the merged file
             return FileResponse(
                 output_path,
                 media_type="application/pdf",
                 filename="merged_document.pdf",
-                headers={"Content-Disposition": "attachment; filename=merged_document.pdf"}
+                headers={"Content-Disposition": "attachment; filename=merged_document.pdf"},
+                background=cleanup
             )
         finally:
             # Clean up temp files
             for temp_path in temp_files:
                 file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logger.error(f"Error merging PDFs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error merging PDFs: {str(e)}")
@@ -61,11 +85,19 @@ async def get_page_count(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be a PDF")
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Get page count
-            page_count = await pdf_service.get_page_count(temp_path)
+            cache_key = result_cache.make_key("get-page-count", [content_hash])
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached:
+                page_count = cached.data["page_count"]
+            else:
+                # Get page count
+                page_count = await executor_service.run(
+                    "pdf.page_count", pdf_service.get_page_count, temp_path, content_hash
+                )
+                await asyncio.to_thread(result_cache.put_data, cache_key, {"page_count": page_count})
             
             return {
                 "page_count": page_count,
@@ -76,6 +108,9 @@ async def get_page_count(file: UploadFile = File(...)):
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logger.error(f"Error getting page count: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting page count: {str(e)}")
@@ -107,30 +142,59 @@ async def split_pdf(
                 raise HTTPException(status_code=400, detail="split_page must be a positive integer")
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
+        streaming = False
         
         try:
-            if split_mode == "custom-page" and split_page:
-                # Split at specific page number
-                output_paths = await pdf_service.split_at_page(temp_path, split_page)
-            else:
-                # Split into individual pages or extract specific pages
-                output_paths = await pdf_service.split_pdf(temp_path, pages)
+            cache_key = result_cache.make_key(
+                "split",
+                [content_hash],
+                {"split_mode": split_mode, "split_page": split_page if split_mode == "custom-page" else None, "pages": pages or None}
+            )
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached:
+                return FileResponse(
+                    cached.path,
+                    media_type="application/zip",
+                    filename="split_pages.zip",
+                    headers={"Content-Disposition": "attachment; filename=split_pages.zip"},
+                    background=artifact_store.cleanup_task(cached.path)
+                )
             
-            # Always create zip file for split operations to ensure all files are downloadable
-            if not output_paths:
-                raise HTTPException(status_code=500, detail="No files were generated during the split operation")
+            # Validate and plan the split before the response starts streaming
+            try:
+                parts = await executor_service.run(
+                    "pdf.split", pdf_service.plan_split, temp_path,
+                    pages if split_mode == "all-pages" else None,
+                    split_page if split_mode == "custom-page" else None
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            metrics.record_files("pdf.split", [temp_path], None)
             
-            zip_path = await file_service.create_zip(output_paths, "split_pages.zip")
-            return FileResponse(
-                zip_path,
+            def archive_members():
+                try:
+                    # Pages are rendered in memory by the worker pool and zipped as they are
+                    # produced, large documents in parallel chunks within the split operation's limit
+                    yield from pdf_service.iter_split_parts(
+                        temp_path, parts, functools.partial(executor_service.submit, "pdf.split"),
+                        executor_service.get_profile("pdf.split").max_concurrency
+                    )
+                finally:
+                    file_service.cleanup_file(temp_path)
+            
+            # Stream the archive as it is built, caching a copy on the way
+            response = StreamingResponse(
+                result_cache.tee(cache_key, file_service.stream_zip(archive_members()), ".zip"),
                 media_type="application/zip",
-                filename="split_pages.zip",
                 headers={"Content-Disposition": "attachment; filename=split_pages.zip"}
             )
+            streaming = True
+            return response
         finally:
-            # Clean up temp files
-            file_service.cleanup_file(temp_path)
+            # Clean up temp files, a streamed response removes the upload once done
+            if not streaming:
+                file_service.cleanup_file(temp_path)
             
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -139,34 +203,109 @@ async def split_pdf(
         logger.error(f"Error splitting PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error splitting PDF: {str(e)}")
 
+def _validate_compress_profile(profile: str):
+    if profile not in COMPRESS_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Profile must be one of: {', '.join(COMPRESS_PROFILES)}")
+
 @router.post("/compress")
-async def compress_pdf(file: UploadFile = File(...)):
+async def compress_pdf(
+    file: UploadFile = File(...),
+    profile: str = Form(DEFAULT_COMPRESS_PROFILE)  # "screen", "ebook", "print" or "archive"
+):
     """Compress a PDF file to reduce its size"""
     try:
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="File must be a PDF")
+        _validate_compress_profile(profile)
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Compress PDF
-            output_path = await pdf_service.compress_pdf(temp_path)
+            cache_key = result_cache.make_key("compress", [content_hash], {"profile": profile})
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path, report = cached.path, cached.data
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Compress PDF
+                output_path, report = await executor_service.run(
+                    "pdf.compress", pdf_service.compress_pdf_with_report, temp_path, None, profile
+                )
+                metrics.record_files("pdf.compress", [temp_path], output_path, ratio=True)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path, report)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
+            headers = {"Content-Disposition": "attachment; filename=compressed_document.pdf"}
+            if report:
+                # Engine, sizes and bytes saved by stage
+                headers["X-Compression-Report"] = json.dumps(report)
             return FileResponse(
                 output_path,
                 media_type="application/pdf",
                 filename="compressed_document.pdf",
-                headers={"Content-Disposition": "attachment; filename=compressed_document.pdf"}
+                headers=headers,
+                background=cleanup
             )
         finally:
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logger.error(f"Error compressing PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error compressing PDF: {str(e)}")
 
+@router.post("/compress/estimate")
+async def estimate_compression(
+    file: UploadFile = File(...),
+    profile: Optional[str] = Form(None)  # Estimate one profile, all of them when not given
+):
+    """Estimate the compressed size of a PDF under each profile without compressing it"""
+    try:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="File must be a PDF")
+        if profile is not None:
+            _validate_compress_profile(profile)
+        profiles = [profile] if profile else list(COMPRESS_PROFILES)
+        
+        # Save uploaded file temporarily
+        temp_path, content_hash = await file_service.save_temp_file(file)
+        
+        try:
+            cache_key = result_cache.make_key(
+                "compress-estimate", [content_hash], {"profiles": profiles}
+            )
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached:
+                estimate = cached.data
+            else:
+                estimate = await executor_service.run(
+                    "pdf.compress_estimate", pdf_service.estimate_compression, temp_path, profiles
+                )
+                await asyncio.to_thread(result_cache.put_data, cache_key, estimate)
+            
+            return {
+                **estimate,
+                "filename": file.filename,
+                "success": True
+            }
+        finally:
+            # Clean up temp files
+            file_service.cleanup_file(temp_path)
+            
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error estimating PDF compression: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error estimating PDF compression: {str(e)}")
+
 @router.post("/pdf-to-word")
 async def pdf_to_word(file: UploadFile = File(...)):
     """Convert PDF to Word document"""
@@ -175,22 +314,43 @@ async def pdf_to_word(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be a PDF")
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Convert PDF to Word
-            output_path = await pdf_service.pdf_to_word(temp_path)
+            cache_key = result_cache.make_key("pdf-to-word", [content_hash])
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Convert PDF to Word
+                output_path = await executor_service.run(
+                    "pdf.to_word",
+                    pdf_service.pdf_to_word,
+                    temp_path,
+                    submit=functools.partial(executor_service.submit, "pdf.to_word_range")
+                )
+                metrics.record_files("pdf.to_word", [temp_path], output_path)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
             return FileResponse(
                 output_path,
                 media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                 filename="converted_document.docx",
-                headers={"Content-Disposition": "attachment; filename=converted_document.docx"}
+                headers={"Content-Disposition": "attachment; filename=converted_document.docx"},
+                background=cleanup
             )
         finally:
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logger.error(f"Error converting PDF to Word: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error converting PDF to Word: {str(e)}")
@@ -203,22 +363,38 @@ async def word_to_pdf(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be a Word document (.doc or .docx)")
         
         # Save uploaded file temporarily
-        temp_path = await file_service.save_temp_file(file)
+        temp_path, content_hash = await file_service.save_temp_file(file)
         
         try:
-            # Convert Word to PDF
-            output_path = await pdf_service.word_to_pdf(temp_path)
+            cache_key = result_cache.make_key("word-to-pdf", [content_hash])
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            cleanup = None
+            if cached:
+                output_path = cached.path
+                # A private link to the entry, eviction cannot remove it mid-response
+                cleanup = artifact_store.cleanup_task(output_path)
+            else:
+                # Convert Word to PDF
+                output_path = await executor_service.run("pdf.word_to_pdf", pdf_service.word_to_pdf, temp_path)
+                metrics.record_files("pdf.word_to_pdf", [temp_path], output_path)
+                await asyncio.to_thread(result_cache.put_file, cache_key, output_path)
+                # Delete the output once it has been sent, a cached copy is a separate link
+                cleanup = artifact_store.cleanup_task(output_path)
             
             return FileResponse(
                 output_path,
                 media_type="application/pdf",
                 filename="converted_document.pdf",
-                headers={"Content-Disposition": "attachment; filename=converted_document.pdf"}
+                headers={"Content-Disposition": "attachment; filename=converted_document.pdf"},
+                background=cleanup
             )
         finally:
             # Clean up temp files
             file_service.cleanup_file(temp_path)
             
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logger.error(f"Error converting Word to PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error converting Word to PDF: {str(e)}")
\ No newline at end of file
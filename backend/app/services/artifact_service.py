@@ -0,0 +1,315 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from starlette.background import BackgroundTask
+from app.services.executor_service import propagate_to_processes
+
+logger = logging.getLogger(__name__)
+
+# Workspace of the request or job being handled. Carried into worker threads
+# by the executor, and into worker processes through propagate_to_processes.
+_workspace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("tealpdf_workspace_id", default=None)
+propagate_to_processes(_workspace_id)
+
+# Files written outside of any workspace (scripts, startup work)
+SHARED_WORKSPACE = "_shared"
+
+# Default largest file routed to the small file root
+DEFAULT_SMALL_FILE_BYTES = 8 * 1024 * 1024
+
+
+class ArtifactStore:
+    """Owns the scratch workspaces where uploads and generated outputs are written
+
+    Every request (and every background job) gets its own workspace, a
+    directory sharded by the first characters of its id, removed in one call
+    when the request is done. Files are routed by expected size: when a small
+    file root is configured, typically a tmpfs mount, small uploads and
+    outputs go there and never touch a physical disk.
+
+    Outputs are also deleted right after their response has been sent. A
+    janitor sweeps whatever is left behind (crashed requests, abandoned
+    streams): files older than the maximum age first, then the oldest files
+    until the store fits its size quota. Files younger than the grace period
+    and files in workspaces of requests or jobs still running are never
+    swept, they may still be in use.
+
+    Configuration (environment variables):
+        TEALPDF_ARTIFACT_DIR        root of the workspaces on disk
+        TEALPDF_SMALL_FILE_DIR      root for small files, e.g. /dev/shm/tealpdf (default: unused)
+        TEALPDF_SMALL_FILE_BYTES    largest file routed to the small file root (default 8 MB)
+        TEALPDF_ARTIFACT_MAX_AGE    seconds a leftover file is kept (default 1 hour)
+        TEALPDF_ARTIFACT_MAX_BYTES  size quota (default 2 GB)
+    """
+
+    def __init__(self):
+        self.directory = os.environ.get("TEALPDF_ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "tealpdf_artifacts"))
+        self.small_file_directory = os.environ.get("TEALPDF_SMALL_FILE_DIR") or None
+        self.small_file_max_bytes = int(os.environ.get("TEALPDF_SMALL_FILE_BYTES", DEFAULT_SMALL_FILE_BYTES))
+        self.max_age = int(os.environ.get("TEALPDF_ARTIFACT_MAX_AGE", 60 * 60))
+        self.max_bytes = int(os.environ.get("TEALPDF_ARTIFACT_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+        self.grace_period = 60
+        self.sweep_interval = 300
+
+        self._lock = threading.Lock()
+        # workspace id -> number of requests or jobs running in it
+        self._active_workspaces: Dict[str, int] = {}
+        self._counters = {"released": 0, "workspaces_released": 0, "swept_expired": 0, "swept_quota": 0, "bytes_swept": 0}
+        self._janitor_task: Optional[asyncio.Task] = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self.small_file_directory:
+            try:
+                os.makedirs(self.small_file_directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Small file root {self.small_file_directory} is unusable, using disk only: {str(e)}")
+                self.small_file_directory = None
+
+    @property
+    def roots(self) -> List[str]:
+        """Every directory workspaces are created in"""
+        return [self.directory] + ([self.small_file_directory] if self.small_file_directory else [])
+
+    def _workspace_path(self, root: str, workspace_id: str) -> str:
+        if workspace_id == SHARED_WORKSPACE:
+            return os.path.join(root, SHARED_WORKSPACE)
+        # Sharding keeps directories small when many requests run at once
+        return os.path.join(root, workspace_id[:2], workspace_id)
+
+    @property
+    def current_workspace(self) -> str:
+        """Id of the workspace of the running request or job"""
+        return _workspace_id.get() or SHARED_WORKSPACE
+
+    def path_for(self, filename: str, size_hint: Optional[int] = None) -> str:
+        """Path for a new scratch file in the current workspace
+
+        size_hint is the expected size of the file (e.g. the size of the input
+        it is derived from). Files expected to be small go to the small file
+        root, everything else, including files of unknown size, to disk.
+        """
+        root = self.directory
+        if self.small_file_directory and size_hint is not None and size_hint <= self.small_file_max_bytes:
+            root = self.small_file_directory
+        directory = self._workspace_path(root, self.current_workspace)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+
+    def activate(self, workspace_id: str):
+        """Mark a workspace as in use, the janitor leaves its files alone until deactivate"""
+        with self._lock:
+            self._active_workspaces[workspace_id] = self._active_workspaces.get(workspace_id, 0) + 1
+
+    def deactivate(self, workspace_id: str):
+        with self._lock:
+            remaining = self._active_workspaces.pop(workspace_id, 0) - 1
+            if remaining > 0:
+                self._active_workspaces[workspace_id] = remaining
+
+    def _active_directories(self) -> Tuple[str, ...]:
+        """Directories of the workspaces in use, in all roots"""
+        with self._lock:
+            active = list(self._active_workspaces)
+        return tuple(
+            self._workspace_path(root, workspace_id) + os.sep
+            for root in self.roots for workspace_id in active if workspace_id != SHARED_WORKSPACE
+        )
+
+    @contextmanager
+    def workspace(self, workspace_id: Optional[str] = None) -> Iterator[str]:
+        """Run a block in its own workspace, removed with everything in it afterwards"""
+        workspace_id = workspace_id or uuid.uuid4().hex
+        token = _workspace_id.set(workspace_id)
+        self.activate(workspace_id)
+        try:
+            yield workspace_id
+        finally:
+            _workspace_id.reset(token)
+            self.deactivate(workspace_id)
+            self.release_workspace(workspace_id)
+
+    def release_workspace(self, workspace_id: str):
+        """Remove a workspace and every file in it, in all roots"""
+        if workspace_id == SHARED_WORKSPACE:
+            return
+        removed = False
+        for root in self.roots:
+            path = self._workspace_path(root, workspace_id)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                removed = True
+                try:
+                    # Drop the shard too once its last workspace is gone
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass
+        if removed:
+            with self._lock:
+                self._counters["workspaces_released"] += 1
+
+    def release(self, *paths: str):
+        """Delete delivered artifacts"""
+        for path in paths:
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+                    with self._lock:
+                        self._counters["released"] += 1
+            except Exception as e:
+                logger.error(f"Error removing artifact {path}: {str(e)}")
+
+    def cleanup_task(self, *paths: str) -> BackgroundTask:
+        """Background task for a response that deletes its artifacts once it has been sent"""
+        return BackgroundTask(self.release, *paths)
+
+    def _scan(self, roots: Optional[List[str]] = None) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every file in the store"""
+        files = []
+        for root_directory in roots or self.roots:
+            for root, _, names in os.walk(root_directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        # Removed while walking
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _remove_empty_workspaces(self, now: float, active: Tuple[str, ...]):
+        """Remove workspace and shard directories left empty by sweeps"""
+        for root_directory in self.roots:
+            for root, directories, names in os.walk(root_directory, topdown=False):
+                if root == root_directory or names or directories or (root + os.sep).startswith(active):
+                    continue
+                try:
+                    if now - os.path.getmtime(root) > self.grace_period:
+                        os.rmdir(root)
+                except OSError:
+                    # Filled or removed concurrently
+                    pass
+
+    def sweep(self) -> Dict[str, int]:
+        """Remove expired files, then the oldest ones until the store fits its quota"""
+        now = time.time()
+        active = self._active_directories()
+        files = sorted(self._scan())
+        total_bytes = sum(size for _, size, _ in files)
+        expired = 0
+        over_quota = 0
+        bytes_swept = 0
+
+        for mtime, size, path in files:
+            age = now - mtime
+            if age <= self.grace_period:
+                # Sorted oldest first, everything after this is in use too
+                break
+            if path.startswith(active):
+                # Still used by a running request or job, released when it ends
+                continue
+            if age > self.max_age:
+                reason = "swept_expired"
+            elif total_bytes > self.max_bytes:
+                reason = "swept_quota"
+            else:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Error sweeping artifact {path}: {str(e)}")
+                continue
+
+            total_bytes -= size
+            bytes_swept += size
+            if reason == "swept_expired":
+                expired += 1
+            else:
+                over_quota += 1
+
+        self._remove_empty_workspaces(now, active)
+
+        with self._lock:
+            self._counters["swept_expired"] += expired
+            self._counters["swept_quota"] += over_quota
+            self._counters["bytes_swept"] += bytes_swept
+
+        if expired or over_quota:
+            logger.info(f"Swept {expired} expired and {over_quota} over-quota artifacts ({bytes_swept} bytes)")
+        return {"expired": expired, "over_quota": over_quota, "bytes": bytes_swept}
+
+    async def _janitor_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Artifact sweep failed: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        """Start the periodic janitor (call from the running event loop)"""
+        if self._janitor_task is None:
+            self._janitor_task = asyncio.create_task(self._janitor_loop())
+
+    async def stop(self):
+        """Stop the janitor"""
+        if self._janitor_task is not None:
+            self._janitor_task.cancel()
+            self._janitor_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Files and bytes currently stored per root and cleanup counters"""
+        roots = {}
+        for root in self.roots:
+            files = self._scan([root])
+            roots[root] = {"files": len(files), "bytes": sum(size for _, size, _ in files)}
+
+        with self._lock:
+            return {
+                "files": sum(usage["files"] for usage in roots.values()),
+                "bytes": sum(usage["bytes"] for usage in roots.values()),
+                "max_bytes": self.max_bytes,
+                "roots": roots,
+                **self._counters,
+            }
+
+
+class WorkspaceMiddleware:
+    """Gives every HTTP request its own workspace, removed once the response is sent
+    
+    A plain ASGI middleware, so the workspace outlives streamed bodies and
+    response background tasks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        workspace_id = uuid.uuid4().hex
+        token = _workspace_id.set(workspace_id)
+        artifact_store.activate(workspace_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _workspace_id.reset(token)
+            artifact_store.deactivate(workspace_id)
+            await asyncio.to_thread(artifact_store.release_workspace, workspace_id)
+
+
+# Shared by all services so the quota applies process-wide
+artifact_store = ArtifactStore()
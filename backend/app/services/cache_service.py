@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import shutil
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from app.services.artifact_service import artifact_store
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    """A cached result: an artifact file, a JSON payload, or both
+
+    path is the caller's own link to the cached file in the request
+    workspace, it stays readable even if the entry is evicted meanwhile.
+    """
+    key: str
+    path: Optional[str]
+    data: Optional[Dict[str, Any]]
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def normalize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize parameters so equivalent requests share a cache key
+
+    Unset (None) values are dropped, strings are stripped and integral floats
+    become ints, so e.g. percentage=50 and percentage=50.0 hit the same entry.
+    """
+    return {
+        name: _normalize_value(value)
+        for name, value in sorted(params.items())
+        if value is not None
+    }
+
+
+class ResultCache:
+    """Disk-backed, content-addressed cache of tool results
+
+    Entries are keyed by the content hash of the inputs, the endpoint and the
+    normalized parameters, expire after a TTL and are evicted least recently
+    used first once the cache grows past its size quota.
+
+    Configuration (environment variables):
+        TEALPDF_CACHE_DIR        where cached artifacts are stored
+        TEALPDF_CACHE_MAX_BYTES  size quota (default 1 GB)
+        TEALPDF_CACHE_TTL        seconds an entry stays valid (default 24 hours)
+        TEALPDF_CACHE_ENABLED    set to 0 to disable caching
+        TEALPDF_CACHE_PURGE_INTERVAL  seconds between expired entry purges (default 10 minutes)
+    """
+
+    def __init__(self):
+        self.cache_dir = os.environ.get("TEALPDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tealpdf_cache"))
+        self.max_bytes = int(os.environ.get("TEALPDF_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+        self.ttl = int(os.environ.get("TEALPDF_CACHE_TTL", 24 * 60 * 60))
+        self.enabled = os.environ.get("TEALPDF_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+        self.purge_interval = int(os.environ.get("TEALPDF_CACHE_PURGE_INTERVAL", 10 * 60))
+        self._purge_task: Optional[asyncio.Task] = None
+
+        # key -> metadata, ordered from least to most recently used
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+        self._endpoint_counters: Dict[str, Dict[str, int]] = {}
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_index()
+
+    def make_key(self, endpoint: str, content_hashes: List[str], params: Optional[Dict[str, Any]] = None) -> str:
+        """Build the cache key for an endpoint call (input order matters, e.g. for merges)"""
+        material = json.dumps(
+            {"endpoint": endpoint, "inputs": list(content_hashes), "params": normalize_params(params or {})},
+            sort_keys=True
+        )
+        return f"{endpoint}:{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+
+    def _entry_base(self, key: str) -> str:
+        digest = key.rsplit(':', 1)[-1]
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def _load_index(self):
+        """Rebuild the in-memory index from the metadata files on disk"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(root, name)
+                try:
+                    with open(meta_path, 'r') as f:
+                        meta = json.load(f)
+                    entries.append((os.path.getmtime(meta_path), meta))
+                except Exception as e:
+                    logger.warning(f"Dropping unreadable cache entry {meta_path}: {str(e)}")
+                    self._remove_files(meta_path[:-len('.json')], None)
+
+        # Metadata mtime is bumped on every hit, so it gives the LRU order
+        for _, meta in sorted(entries, key=lambda item: item[0]):
+            self._index[meta["key"]] = meta
+            self._total_bytes += meta.get("size", 0)
+
+        if entries:
+            logger.info(f"Loaded {len(entries)} cache entries ({self._total_bytes} bytes)")
+
+    def _count(self, endpoint: str, counter: str):
+        self._counters[counter] += 1
+        endpoint_counters = self._endpoint_counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+        if counter in endpoint_counters:
+            endpoint_counters[counter] += 1
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up a cached result, returns None on a miss
+        
+        Blocks on file I/O, call it from a worker thread (asyncio.to_thread).
+        """
+        if not self.enabled:
+            return None
+
+        endpoint = key.split(':', 1)[0]
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                self._count(endpoint, "misses")
+                return None
+
+            if time.time() - meta["created_at"] > self.ttl:
+                self._drop(key)
+                self._counters["expirations"] += 1
+                self._count(endpoint, "misses")
+                return None
+
+            base = self._entry_base(key)
+            cached_path = base + meta["ext"] if meta.get("ext") is not None else None
+            if cached_path is not None and not os.path.exists(cached_path):
+                self._drop(key)
+                self._count(endpoint, "misses")
+                return None
+
+            path = None
+            if cached_path is not None:
+                # Eviction takes the lock too, so the link is made before it can unlink the file
+                path = artifact_store.path_for(f"cached_{uuid.uuid4().hex}{meta['ext']}")
+                try:
+                    os.link(cached_path, path)
+                    cached_path = None
+                except OSError:
+                    pass
+
+            self._index.move_to_end(key)
+
+        if cached_path is not None:
+            # Different filesystem, copy outside the lock and count a miss if it was evicted meanwhile
+            try:
+                shutil.copyfile(cached_path, path)
+            except FileNotFoundError:
+                logger.info(f"Cache entry for {endpoint} evicted while being read")
+                with self._lock:
+                    self._count(endpoint, "misses")
+                return None
+
+        with self._lock:
+            self._count(endpoint, "hits")
+
+        try:
+            os.utime(base + '.json')
+        except OSError:
+            pass
+
+        logger.info(f"Cache hit for {endpoint}")
+        return CacheEntry(key=key, path=path, data=meta.get("data"))
+
+    def put_file(self, key: str, source_path: str, data: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Store a copy of an output file, the source file is left in place (blocking, like get)"""
+        if not self.enabled:
+            return None
+        try:
+            base = self._entry_base(key)
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+            ext = os.path.splitext(source_path)[1]
+            cached_path = base + ext
+
+            staging_path = f"{cached_path}.{uuid.uuid4().hex}.tmp"
+            try:
+                # Hard links make caching free when the output is on the same filesystem
+                os.link(source_path, staging_path)
+            except OSError:
+                shutil.copyfile(source_path, staging_path)
+            os.replace(staging_path, cached_path)
+
+            self._store(key, ext, os.path.getsize(cached_path), data)
+            return cached_path
+
+        except Exception as e:
+            logger.warning(f"Could not cache result for {key.split(':', 1)[0]}: {str(e)}")
+            return None
+
+    def tee(self, key: str, chunks: Iterable[bytes], ext: str) -> Iterator[bytes]:
+        """Pass a streamed result through while caching it
+        
+        The copy only becomes an entry once the stream has been fully consumed,
+        a response that is aborted half way leaves nothing behind.
+        """
+        if not self.enabled:
+            yield from chunks
+            return
+
+        staging_path = None
+        try:
+            base = self._entry_base(key)
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+            staging_path = f"{base}{ext}.{uuid.uuid4().hex}.tmp"
+            staging = open(staging_path, 'wb')
+        except Exception as e:
+            logger.warning(f"Could not cache result for {key.split(':', 1)[0]}: {str(e)}")
+            yield from chunks
+            return
+
+        try:
+            with staging:
+                for chunk in chunks:
+                    staging.write(chunk)
+                    yield chunk
+            os.replace(staging_path, base + ext)
+            self._store(key, ext, os.path.getsize(base + ext), None)
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+
+    def put_data(self, key: str, data: Dict[str, Any]):
+        """Store a JSON-serializable result that has no artifact file (blocking, like get)"""
+        if not self.enabled:
+            return
+        try:
+            base = self._entry_base(key)
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+            self._store(key, None, 0, data)
+        except Exception as e:
+            logger.warning(f"Could not cache result for {key.split(':', 1)[0]}: {str(e)}")
+
+    def _store(self, key: str, ext: Optional[str], size: int, data: Optional[Dict[str, Any]]):
+        meta = {"key": key, "ext": ext, "size": size, "data": data, "created_at": time.time()}
+        meta_path = self._entry_base(key) + '.json'
+        staging_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(staging_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(staging_path, meta_path)
+
+        with self._lock:
+            previous = self._index.pop(key, None)
+            if previous:
+                self._total_bytes -= previous.get("size", 0)
+            self._index[key] = meta
+            self._total_bytes += size
+            self._counters["stores"] += 1
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its quota (lock held)"""
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._drop(key)
+            self._counters["evictions"] += 1
+
+    def _drop(self, key: str):
+        """Remove an entry from the index and disk (lock held)"""
+        meta = self._index.pop(key, None)
+        if meta is None:
+            return
+        self._total_bytes -= meta.get("size", 0)
+        self._remove_files(self._entry_base(key), meta.get("ext"))
+
+    def _remove_files(self, base: str, ext: Optional[str]):
+        for path in (base + '.json', base + ext if ext is not None else None):
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                logger.error(f"Error removing cache file {path}: {str(e)}")
+
+    def purge_expired(self) -> int:
+        """Remove every expired entry"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, meta in self._index.items() if now - meta["created_at"] > self.ttl]
+            for key in expired:
+                self._drop(key)
+            self._counters["expirations"] += len(expired)
+        if expired:
+            logger.info(f"Purged {len(expired)} expired cache entries")
+        return len(expired)
+
+    async def _purge_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.purge_expired)
+            except Exception as e:
+                logger.error(f"Cache purge failed: {str(e)}")
+            await asyncio.sleep(self.purge_interval)
+
+    def start(self):
+        """Purge expired entries now and periodically (call from the running event loop)"""
+        if self.enabled and self._purge_task is None:
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self):
+        """Stop the periodic purge"""
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            self._purge_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "endpoints": {endpoint: dict(counters) for endpoint, counters in self._endpoint_counters.items()},
+            }
+
+
+# Shared by all routers so the quota applies process-wide
+result_cache = ResultCache()
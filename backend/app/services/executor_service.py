@@ -0,0 +1,280 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+import multiprocessing
+import logging
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+from app.services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OperationProfile(NamedTuple):
+    """Where an operation runs and how many copies of it may run at once"""
+    pool: str  # "thread" or "process"
+    max_concurrency: int
+
+
+# PyMuPDF, Pillow and pdf2docx spend most of their time in C code that releases
+# the GIL, so they share the thread pool. The PyPDF2 and reportlab paths are
+# pure Python and only scale across cores in worker processes.
+DEFAULT_PROFILES: Dict[str, OperationProfile] = {
+    "pdf.merge": OperationProfile("process", 2),
+    "pdf.split": OperationProfile("process", 2),
+    "pdf.word_to_pdf": OperationProfile("process", 2),
+    # The page count probe is cheap and its cache lives in this process
+    "pdf.page_count": OperationProfile("thread", 4),
+    "pdf.compress": OperationProfile("thread", 2),
+    "pdf.compress_estimate": OperationProfile("thread", 4),
+    "pdf.to_word": OperationProfile("thread", 2),
+    # Page ranges of long PDF-to-Word conversions, pdf2docx's layout analysis is Python
+    "pdf.to_word_range": OperationProfile("process", 2),
+    "image.resize": OperationProfile("thread", 4),
+    "image.compress": OperationProfile("thread", 2),
+    "image.crop": OperationProfile("thread", 4),
+    "image.pipeline": OperationProfile("thread", 4),
+    # Limits both how many batches unpack at once and how many batch items run at once
+    "image.batch": OperationProfile("thread", 2),
+    # Background jobs report progress through callbacks, which only work in-process
+    "job.merge": OperationProfile("thread", 2),
+    "job.compress": OperationProfile("thread", 2),
+    "job.pdf_to_word": OperationProfile("thread", 2),
+}
+
+FALLBACK_PROFILE = OperationProfile("thread", 2)
+
+# Context variables whose values are carried into worker processes, by name.
+# Worker threads see every context variable, processes only these.
+_process_context_vars: Dict[str, contextvars.ContextVar] = {}
+
+
+def propagate_to_processes(var: contextvars.ContextVar):
+    """Carry a context variable's value into operations run in the process pool
+
+    Must be called at import time of a module the worker also imports, so the
+    variable is registered under the same name on both sides.
+    """
+    _process_context_vars[var.name] = var
+
+
+def _call_with_context_values(values: Dict[str, Any], func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run func in a fresh context holding the propagated values (in a worker process)"""
+    def call():
+        for name, value in values.items():
+            var = _process_context_vars.get(name)
+            if var is not None:
+                var.set(value)
+        return func(*args, **kwargs)
+    return contextvars.copy_context().run(call)
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment, falling back to default"""
+    try:
+        value = int(os.environ.get(name, default))
+        return value if value > 0 else default
+    except ValueError:
+        logger.warning(f"Ignoring invalid value for {name}: {os.environ.get(name)}")
+        return default
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    """Parse 'pdf.compress=4,image.resize=8' into a dict of concurrency limits"""
+    limits = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            operation, limit = part.split('=')
+            limits[operation.strip()] = max(1, int(limit))
+        except ValueError:
+            logger.warning(f"Ignoring invalid operation limit: {part}")
+    return limits
+
+
+class ExecutorService:
+    """Runs blocking service calls off the event loop with per-operation limits
+
+    Configuration (environment variables):
+        TEALPDF_THREAD_WORKERS   size of the shared thread pool
+        TEALPDF_PROCESS_WORKERS  size of the shared process pool
+        TEALPDF_OP_LIMITS        per-operation concurrency, e.g. "pdf.compress=4"
+        TEALPDF_DISABLE_PROCESS_POOL  run process operations on threads instead
+    """
+
+    def __init__(self):
+        cpu_count = os.cpu_count() or 2
+        self.thread_workers = _env_int("TEALPDF_THREAD_WORKERS", min(32, cpu_count + 4))
+        self.process_workers = _env_int("TEALPDF_PROCESS_WORKERS", cpu_count)
+        self.process_pool_enabled = os.environ.get("TEALPDF_DISABLE_PROCESS_POOL", "").lower() not in ("1", "true", "yes")
+
+        self.profiles = dict(DEFAULT_PROFILES)
+        for operation, limit in _parse_limits(os.environ.get("TEALPDF_OP_LIMITS", "")).items():
+            pool = self.profiles.get(operation, FALLBACK_PROFILE).pool
+            self.profiles[operation] = OperationProfile(pool, limit)
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Limits for work units submitted from synchronous code, shared by all requests
+        self._unit_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._unit_slots_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def get_profile(self, operation: str) -> OperationProfile:
+        """Get the execution profile for an operation"""
+        profile = self.profiles.get(operation, FALLBACK_PROFILE)
+        if profile.pool == "process" and not self.process_pool_enabled:
+            return OperationProfile("thread", profile.max_concurrency)
+        return profile
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="tealpdf-worker"
+            )
+        return self._thread_pool
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # Forking a process that already runs the event loop and the thread
+            # pool is unsafe, so workers are always spawned fresh.
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def _bind(self, profile: OperationProfile, func: Callable[..., Any], *args, **kwargs) -> Tuple[Executor, Callable[[], Any]]:
+        """Pick the pool for a profile and wrap func so it sees the caller's context variables"""
+        if profile.pool == "process":
+            values = {name: var.get(None) for name, var in _process_context_vars.items()}
+            return self.process_pool, functools.partial(_call_with_context_values, values, func, *args, **kwargs)
+        # Keep context variables (request ids, etc.) visible in the worker thread
+        context = contextvars.copy_context()
+        return self.thread_pool, functools.partial(context.run, func, *args, **kwargs)
+    
+    def submit(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Submit one work unit to the operation's pool from synchronous code
+        
+        Meant for code that already runs off the event loop (e.g. a streaming
+        response body). The unit sees the caller's context variables
+        (the request workspace, ...) the same way run passes them along. At most
+        max_concurrency units of an operation run at once across all callers,
+        submit blocks until one of them finishes. Never call it from the event loop.
+        """
+        profile = self.get_profile(operation)
+        pool, call = self._bind(profile, func, *args, **kwargs)
+        slots = self._get_unit_slots(operation, profile)
+        slots.acquire()
+        try:
+            future = pool.submit(call)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+    
+    def _get_unit_slots(self, operation: str, profile: OperationProfile) -> threading.BoundedSemaphore:
+        with self._unit_slots_lock:
+            if operation not in self._unit_slots:
+                self._unit_slots[operation] = threading.BoundedSemaphore(profile.max_concurrency)
+            return self._unit_slots[operation]
+    
+    def _get_semaphore(self, operation: str) -> asyncio.Semaphore:
+        if operation not in self._semaphores:
+            self._semaphores[operation] = asyncio.Semaphore(self.get_profile(operation).max_concurrency)
+        return self._semaphores[operation]
+
+    def _get_stats(self, operation: str) -> Dict[str, Any]:
+        if operation not in self._stats:
+            self._stats[operation] = {
+                "queued": 0,
+                "in_flight": 0,
+                "completed": 0,
+                "failed": 0,
+                "busy_seconds": 0.0,
+            }
+        return self._stats[operation]
+
+    async def run(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable for the named operation and await its result"""
+        profile = self.get_profile(operation)
+        semaphore = self._get_semaphore(operation)
+        stats = self._get_stats(operation)
+
+        stats["queued"] += 1
+        queued_at = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["queued"] -= 1
+        metrics.observe("tealpdf_operation_queue_seconds", time.perf_counter() - queued_at, operation=operation)
+
+        stats["in_flight"] += 1
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            loop = asyncio.get_running_loop()
+            pool, call = self._bind(profile, func, *args, **kwargs)
+            result = await loop.run_in_executor(pool, call)
+            stats["completed"] += 1
+            outcome = "completed"
+            return result
+        except BrokenProcessPool:
+            stats["failed"] += 1
+            logger.error(f"Process pool broke while running {operation}, it will be recreated")
+            self._process_pool = None
+            raise
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stats["in_flight"] -= 1
+            stats["busy_seconds"] += elapsed
+            metrics.observe("tealpdf_operation_duration_seconds", elapsed, operation=operation, pool=profile.pool, outcome=outcome)
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool sizes and per-operation queue depth and throughput counters"""
+        operations = {}
+        for operation, stats in self._stats.items():
+            profile = self.get_profile(operation)
+            operations[operation] = {
+                **stats,
+                "busy_seconds": round(stats["busy_seconds"], 3),
+                "pool": profile.pool,
+                "max_concurrency": profile.max_concurrency,
+            }
+
+        return {
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers if self.process_pool_enabled else 0,
+            "queue_depth": sum(stats["queued"] for stats in self._stats.values()),
+            "in_flight": sum(stats["in_flight"] for stats in self._stats.values()),
+            "operations": operations,
+        }
+
+    def shutdown(self):
+        """Stop the worker pools"""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        logger.info("Executor pools shut down")
+
+
+# Shared by all routers so the pools and limits apply process-wide
+executor_service = ExecutorService()
@@ -1,42 +1,114 @@
+import io
 import os
-import tempfile
+import time
+import hashlib
 import uuid
 import zipfile
 import aiofiles
-from typing import List
-from fastapi import UploadFile
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from fastapi import UploadFile, HTTPException
 import logging
+from app.services.artifact_service import artifact_store
 
 logger = logging.getLogger(__name__)
 
+# Uploads are streamed to disk in chunks of this size, so at most one chunk
+# per request is held in memory.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Largest accepted upload, can be overridden with TEALPDF_MAX_UPLOAD_BYTES
+DEFAULT_MAX_UPLOAD_BYTES = 500 * 1024 * 1024
+
+# Formats that are already compressed and are stored in archives as-is
+STORED_EXTENSIONS = {'.pdf', '.docx', '.zip', '.jpg', '.jpeg', '.png', '.webp', '.gif', '.tiff'}
+
+class _ZipChunkSink(io.RawIOBase):
+    """Write-only stream that collects zip output until it is drained
+    
+    It is not seekable, so zipfile writes data descriptors after each member
+    instead of seeking back to patch the local headers.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
 class FileService:
     """Service class for file operations"""
     
     def __init__(self):
-        self.temp_dir = tempfile.gettempdir()
-        # Ensure temp directory exists
-        os.makedirs(self.temp_dir, exist_ok=True)
+        self.max_upload_bytes = int(os.environ.get("TEALPDF_MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES))
     
-    async def save_temp_file(self, file: UploadFile) -> str:
-        """Save uploaded file to temporary location"""
+    async def save_temp_file(self, file: UploadFile, max_bytes: Optional[int] = None) -> Tuple[str, str]:
+        """Stream uploaded file to a temporary location, hashing it on the way
+        
+        Returns the temp path and the SHA-256 of the content.
+        """
+        max_bytes = max_bytes or self.max_upload_bytes
+        
+        # Generate unique filename
+        file_extension = os.path.splitext(file.filename)[1]
+        temp_filename = f"{uuid.uuid4().hex}{file_extension}"
+        # The multipart parser knows the size, small uploads can stay off disk
+        temp_path = artifact_store.path_for(temp_filename, getattr(file, "size", None))
+        
         try:
-            # Generate unique filename
-            file_extension = os.path.splitext(file.filename)[1]
-            temp_filename = f"{uuid.uuid4().hex}{file_extension}"
-            temp_path = os.path.join(self.temp_dir, temp_filename)
-            
-            # Save file asynchronously
-            async with aiofiles.open(temp_path, 'wb') as temp_file:
-                content = await file.read()
-                await temp_file.write(content)
-            
+            content_hash = await self._stream_to_file(file, temp_path, max_bytes)
             logger.info(f"Saved temp file: {temp_path}")
-            return temp_path
+            return temp_path, content_hash
             
         except Exception as e:
             logger.error(f"Error saving temp file: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             raise
     
+    async def _stream_to_file(self, file: UploadFile, temp_path: str, max_bytes: int) -> str:
+        """Copy the upload to temp_path chunk by chunk, enforcing the size limit"""
+        hasher = hashlib.sha256()
+        total_size = 0
+        
+        async with aiofiles.open(temp_path, 'wb') as temp_file:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                total_size += len(chunk)
+                if total_size > max_bytes:
+                    self._raise_too_large(file, max_bytes)
+                
+                hasher.update(chunk)
+                await temp_file.write(chunk)
+        
+        return hasher.hexdigest()
+    
+    def _raise_too_large(self, file: UploadFile, max_bytes: int):
+        raise HTTPException(
+            status_code=413,
+            detail=f"File {file.filename} exceeds the maximum upload size of {max_bytes / (1024 * 1024):g} MB"
+        )
+    
+    def get_file_hash(self, file_path: str) -> str:
+        """Get the SHA-256 of a file on disk (uploads get theirs from save_temp_file)"""
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
     def cleanup_file(self, file_path: str):
         """Remove temporary file"""
         try:
@@ -46,10 +118,43 @@ class FileService:
         except Exception as e:
             logger.error(f"Error cleaning up file {file_path}: {str(e)}")
     
+    def archive_name(self, file_path: str, index: int, total: int) -> str:
+        """Derive the name a generated file gets inside a zip archive"""
+        # Use the original descriptive filename
+        filename = os.path.basename(file_path)
+        
+        # For split operations, try to extract meaningful name from the path
+        if "part_" in filename:
+            # Keep the descriptive name (e.g., "part_1_pages_1-3_uuid.pdf")
+            parts = filename.split('_')
+            if len(parts) >= 3:
+                base_name = parts[0] + '_' + parts[1] + '_' + parts[2]
+                ext = os.path.splitext(filename)[1]
+                return base_name + ext
+            return filename
+        elif "page_" in filename and total > 2:
+            # Individual page files, use generic naming
+            base_name, ext = os.path.splitext(filename)
+            return f"page_{index+1}{ext}"
+        else:
+            # Default: use original filename without UUID
+            base_name, ext = os.path.splitext(filename)
+            # Remove UUID if present
+            name_parts = base_name.split('_')
+            if len(name_parts) > 1 and len(name_parts[-1]) == 32:  # UUID length
+                return '_'.join(name_parts[:-1]) + ext
+            return filename
+    
+    def _compress_type(self, archive_name: str) -> int:
+        """Store already-compressed formats as-is, deflating them again gains nothing"""
+        if os.path.splitext(archive_name.lower())[1] in STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+    
     async def create_zip(self, file_paths: List[str], zip_name: str) -> str:
         """Create a zip file containing multiple files"""
         try:
-            zip_path = os.path.join(self.temp_dir, zip_name)
+            zip_path = artifact_store.path_for(zip_name)
             
             # Filter out non-existent files
             valid_file_paths = [path for path in file_paths if os.path.exists(path)]
@@ -64,34 +169,8 @@ class FileService:
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for i, file_path in enumerate(valid_file_paths):
                     if os.path.exists(file_path):
-                        # Use the original descriptive filename
-                        filename = os.path.basename(file_path)
-                        
-                        # For split operations, try to extract meaningful name from the path
-                        if "part_" in filename:
-                            # Keep the descriptive name (e.g., "part_1_pages_1-3_uuid.pdf")
-                            parts = filename.split('_')
-                            if len(parts) >= 3:
-                                base_name = parts[0] + '_' + parts[1] + '_' + parts[2]
-                                ext = os.path.splitext(filename)[1]
-                                archive_name = base_name + ext
-                            else:
-                                archive_name = filename
-                        elif "page_" in filename and len(valid_file_paths) > 2:
-                            # Individual page files, use generic naming
-                            base_name, ext = os.path.splitext(filename)
-                            archive_name = f"page_{i+1}{ext}"
-                        else:
-                            # Default: use original filename without UUID
-                            base_name, ext = os.path.splitext(filename)
-                            # Remove UUID if present
-                            name_parts = base_name.split('_')
-                            if len(name_parts) > 1 and len(name_parts[-1]) == 32:  # UUID length
-                                archive_name = '_'.join(name_parts[:-1]) + ext
-                            else:
-                                archive_name = filename
-                        
-                        zipf.write(file_path, archive_name)
+                        archive_name = self.archive_name(file_path, i, len(valid_file_paths))
+                        zipf.write(file_path, archive_name, compress_type=self._compress_type(archive_name))
                         
                         # Clean up individual file after adding to zip
                         self.cleanup_file(file_path)
@@ -103,6 +182,101 @@ class FileService:
             logger.error(f"Error creating zip file: {str(e)}")
             raise
     
+    def stream_zip(self, members: Iterable[Tuple[str, Union[str, bytes]]]) -> Iterator[bytes]:
+        """Yield a zip archive chunk by chunk as its members become available
+        
+        members yields (archive_name, content) pairs, where content is either the
+        bytes of the member or the path of a file, which is removed once added.
+        Nothing is written to disk, so the first bytes go out as soon as the
+        first member is ready. Meant for StreamingResponse, which iterates
+        synchronous generators on a worker thread.
+        """
+        sink = _ZipChunkSink()
+        count = 0
+        try:
+            with zipfile.ZipFile(sink, 'w', allowZip64=True) as zipf:
+                for archive_name, content in members:
+                    compress_type = self._compress_type(archive_name)
+                    
+                    if isinstance(content, (bytes, bytearray)):
+                        info = zipfile.ZipInfo(archive_name, date_time=time.localtime()[:6])
+                        info.compress_type = compress_type
+                        zipf.writestr(info, content)
+                    else:
+                        info = zipfile.ZipInfo.from_file(content, archive_name)
+                        info.compress_type = compress_type
+                        with open(content, 'rb') as source, zipf.open(info, 'w') as dest:
+                            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b''):
+                                dest.write(chunk)
+                                yield sink.drain()
+                        self.cleanup_file(content)
+                    
+                    count += 1
+                    yield sink.drain()
+                
+                if count == 0:
+                    zipf.writestr("empty.txt", "No files were generated during the operation.")
+                    logger.warning("No files to zip, streamed empty zip with placeholder")
+            
+            # Central directory, written when the archive is closed
+            yield sink.drain()
+            logger.info(f"Streamed zip archive with {count} files")
+            
+        except Exception as e:
+            logger.error(f"Error streaming zip archive: {str(e)}")
+            raise
+    
+    def extract_zip(self, zip_path: str, allowed_extensions: List[str], max_files: int,
+                    max_bytes: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Extract the members of an uploaded zip archive with an allowed extension
+
+        Returns (member filename, temp path) pairs in archive order. Directories,
+        hidden files and other extensions are skipped. Members are only ever
+        written under their base name, so paths inside the archive cannot escape
+        the workspace. Raises ValueError for a corrupt archive, or one that
+        holds more than max_files usable members or unpacks to more than
+        max_bytes (a zip bomb).
+        """
+        max_bytes = max_bytes or self.max_upload_bytes
+        extracted = []
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                members = []
+                for info in archive.infolist():
+                    filename = os.path.basename(info.filename)
+                    if info.is_dir() or not filename or filename.startswith('.') or info.filename.startswith('__MACOSX/'):
+                        continue
+                    if self.validate_file_type(filename, allowed_extensions):
+                        members.append((info, filename))
+
+                if len(members) > max_files:
+                    raise ValueError(f"Archive contains {len(members)} files, at most {max_files} are allowed")
+                # ZipExtFile never returns more than the declared size, so the sum is binding
+                total_size = sum(info.file_size for info, _ in members)
+                if total_size > max_bytes:
+                    raise ValueError(f"Archive unpacks to more than {max_bytes / (1024 * 1024):g} MB")
+
+                for info, filename in members:
+                    temp_path = artifact_store.path_for(
+                        f"{uuid.uuid4().hex}{os.path.splitext(filename)[1]}", info.file_size
+                    )
+                    with archive.open(info) as source, open(temp_path, 'wb') as dest:
+                        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b''):
+                            dest.write(chunk)
+                    extracted.append((filename, temp_path))
+
+            logger.info(f"Extracted {len(extracted)} files from {zip_path}")
+            return extracted
+
+        except zipfile.BadZipFile as e:
+            for _, temp_path in extracted:
+                self.cleanup_file(temp_path)
+            raise ValueError(f"Invalid zip archive: {str(e)}")
+        except Exception:
+            for _, temp_path in extracted:
+                self.cleanup_file(temp_path)
+            raise
+
     def get_file_size(self, file_path: str) -> int:
         """Get file size in bytes"""
         try:
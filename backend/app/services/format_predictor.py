@@ -0,0 +1,176 @@
+import os
+import json
+import random
+import threading
+import logging
+from typing import Dict, List, NamedTuple, Optional
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Encoders ImageService.compress_image can run, in the order they are tried
+ENCODERS = ("png", "webp", "jpeg", "tiff")
+
+# Side of the thumbnail used for analysis, large enough for a stable colour count
+ANALYSIS_SIZE = 256
+
+# More distinct colours than this in the thumbnail means photographic content
+GRAPHIC_MAX_COLORS = 256
+
+# Learned statistics override the priors once a bucket has this many samples
+MIN_SAMPLES = 20
+
+# Encoders winning at least this share of a bucket are always tried,
+# encoders below NEVER_WINS are dropped from it
+KEEP_WIN_RATE = 0.05
+NEVER_WINS = 0.01
+
+# Share of requests that still try every encoder, so the statistics keep improving
+EXPLORATION_RATE = 0.05
+
+
+class ImageFeatures(NamedTuple):
+    """Cheap statistics computed on a downsampled copy of the image"""
+    color_count: Optional[int]  # None when above GRAPHIC_MAX_COLORS
+    entropy: float
+    has_alpha: bool
+    source_format: str
+
+    @property
+    def content_class(self) -> str:
+        # Greyscale photos also have few colours, but a much flatter histogram
+        few_colors = self.color_count is not None and (self.color_count <= 64 or self.entropy < 5.0)
+        if few_colors or self.entropy < 3.0:
+            return "graphic"
+        return "photo"
+
+    @property
+    def bucket(self) -> str:
+        alpha = "alpha" if self.has_alpha else "opaque"
+        return f"{self.content_class}:{alpha}:{self.source_format}"
+
+
+class FormatPredictor:
+    """Predicts which compression encoders can produce the smallest file
+
+    Starts from fixed priors (JPEG/WebP for photos, PNG/WebP for graphics, TIFF
+    never) and refines them with the observed winners per image bucket.
+    Statistics are persisted to TEALPDF_PREDICTOR_STATS when it is set.
+    """
+
+    def __init__(self):
+        self.stats_path = os.environ.get("TEALPDF_PREDICTOR_STATS")
+        self.save_interval = 50
+        # bucket -> encoder -> {"tried": n, "won": n}
+        self._stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def analyze(self, img: Image.Image) -> ImageFeatures:
+        """Compute prediction features from a thumbnail of a loaded image"""
+        # Nearest-neighbour sampling only touches the output pixels and keeps
+        # the exact colours, which matters for the colour count
+        scale = min(1.0, ANALYSIS_SIZE / max(img.size))
+        thumbnail = img.resize(
+            (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+            Image.Resampling.NEAREST
+        )
+
+        has_alpha = False
+        if thumbnail.mode in ('RGBA', 'LA', 'PA'):
+            has_alpha = thumbnail.getchannel('A').getextrema()[0] < 255
+        elif 'transparency' in img.info:
+            has_alpha = True
+
+        colors = thumbnail.getcolors(maxcolors=GRAPHIC_MAX_COLORS)
+        entropy = thumbnail.convert('L').entropy()
+
+        return ImageFeatures(
+            color_count=len(colors) if colors is not None else None,
+            entropy=round(entropy, 3),
+            has_alpha=has_alpha,
+            source_format=(img.format or "unknown").upper()
+        )
+
+    def _priors(self, features: ImageFeatures, quality: int) -> List[str]:
+        if features.content_class == "photo":
+            encoders = ["webp", "jpeg"] if quality < 100 else ["webp", "png"]
+        else:
+            encoders = ["png", "webp"]
+            # Smooth graphics with a lossy budget can still be beaten by JPEG
+            if quality < 100 and features.color_count is None:
+                encoders.append("jpeg")
+        return encoders
+
+    def predict(self, features: ImageFeatures, quality: int) -> List[str]:
+        """Get the encoders worth running for an image, in ENCODERS order"""
+        available = [encoder for encoder in ENCODERS if encoder != "jpeg" or quality < 100]
+
+        if random.random() < EXPLORATION_RATE:
+            return available
+
+        selected = set(self._priors(features, quality))
+        with self._lock:
+            bucket_stats = self._stats.get(features.bucket, {})
+            for encoder in available:
+                encoder_stats = bucket_stats.get(encoder)
+                if not encoder_stats or encoder_stats["tried"] < MIN_SAMPLES:
+                    continue
+                win_rate = encoder_stats["won"] / encoder_stats["tried"]
+                if win_rate >= KEEP_WIN_RATE:
+                    selected.add(encoder)
+                elif win_rate < NEVER_WINS:
+                    selected.discard(encoder)
+
+        predicted = [encoder for encoder in available if encoder in selected]
+        # Never predict nothing, WebP lossless is the most reliable all-rounder
+        return predicted or ["webp"]
+
+    def record(self, features: ImageFeatures, tried: List[str], winner: str):
+        """Record which of the tried encoders produced the smallest output"""
+        with self._lock:
+            bucket_stats = self._stats.setdefault(features.bucket, {})
+            for encoder in tried:
+                encoder_stats = bucket_stats.setdefault(encoder, {"tried": 0, "won": 0})
+                encoder_stats["tried"] += 1
+                if encoder == winner:
+                    encoder_stats["won"] += 1
+            self._unsaved += 1
+            should_save = self.stats_path and self._unsaved >= self.save_interval
+
+        if should_save:
+            self.save()
+
+    def _load(self):
+        if not self.stats_path or not os.path.exists(self.stats_path):
+            return
+        try:
+            with open(self.stats_path, 'r') as f:
+                self._stats = json.load(f)
+            logger.info(f"Loaded format predictor statistics for {len(self._stats)} buckets")
+        except Exception as e:
+            logger.warning(f"Could not load format predictor statistics: {str(e)}")
+
+    def save(self):
+        """Persist the win statistics (no-op without TEALPDF_PREDICTOR_STATS)"""
+        if not self.stats_path:
+            return
+        try:
+            with self._lock:
+                snapshot = json.dumps(self._stats)
+                self._unsaved = 0
+            with open(self.stats_path + '.tmp', 'w') as f:
+                f.write(snapshot)
+            os.replace(self.stats_path + '.tmp', self.stats_path)
+        except Exception as e:
+            logger.warning(f"Could not save format predictor statistics: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Win statistics per bucket and encoder"""
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+
+# Shared so every request contributes to the same statistics
+format_predictor = FormatPredictor()
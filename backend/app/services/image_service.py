@@ -1,33 +1,301 @@
 import os
-import tempfile
 import uuid
+import json
+import math
 import shutil
-from typing import Tuple, Optional
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple, Optional, Union
 import logging
 from PIL import Image, ImageOps, ImageEnhance
 import io
+from app.services.format_predictor import format_predictor
+from app.services.artifact_service import artifact_store
+from app.services.metrics_service import metrics
 
 logger = logging.getLogger(__name__)
 
+# Compression candidates are encoded in parallel. Pillow releases the GIL while
+# encoding, so threads are enough to use every core.
+_encoder_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 2,
+    thread_name_prefix="tealpdf-encoder"
+)
+
+# Images with more pixels are refused before any decoding (decompression bombs)
+MAX_IMAGE_PIXELS = int(os.environ.get("TEALPDF_MAX_IMAGE_PIXELS", 400_000_000))
+
+# Images with more pixels are resized and enhanced strip by strip
+LARGE_IMAGE_PIXELS = int(os.environ.get("TEALPDF_LARGE_IMAGE_PIXELS", 40_000_000))
+
+# Decoded size of one strip
+STRIP_BYTES = 32 * 1024 * 1024
+
+# Pillow's own bomb check warns above this and refuses twice as many pixels
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+class ImageTooLargeError(ValueError):
+    """The image has more pixels than MAX_IMAGE_PIXELS"""
+
+def _open_image(image_path: str) -> Image.Image:
+    """Open an image, refusing it from its header if it has too many pixels"""
+    try:
+        img = Image.open(image_path)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+    width, height = img.size
+    if width * height > MAX_IMAGE_PIXELS:
+        img.close()
+        raise ImageTooLargeError(f"Image of {width}x{height} pixels exceeds the limit of {MAX_IMAGE_PIXELS} pixels")
+    return img
+
+def _flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """Convert to RGB for JPEG output, transparency becomes white
+    
+    RGB images are returned as they are, without a copy. Transparent images
+    are composited in one paste that reads the alpha band in place.
+    """
+    if img.mode == 'RGB':
+        return img
+    if img.mode in ('PA', 'La', 'RGBa') or 'transparency' in img.info:
+        # Other alpha layouts, transparent palette or colour key
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        # A mask image with an alpha band is used through that band
+        background.paste(img, mask=img)
+        return background
+    return img.convert('RGB')
+
+def _strip_metadata(img: Image.Image) -> Image.Image:
+    """Drop EXIF, ICC profile and other metadata from a decoded image in place
+    
+    Encoders read metadata from info, and the TIFF encoder also copies tags
+    from a TIFF source image itself, so both are cleared. The pixel data is
+    left untouched, nothing is copied.
+    """
+    img.info = {key: value for key, value in img.info.items() if key in ('transparency', 'gamma')}
+    for tags in (getattr(img, "tag_v2", None), getattr(img, "tag", None)):
+        if tags is not None:
+            tags.clear()
+    return img
+
+class _NormalizedImage:
+    """A decoded image and the normalized forms encoders need, each built once
+    
+    Compression candidates encode in parallel from the same instance, the
+    first one that needs a form builds it and the others reuse it.
+    """
+    
+    def __init__(self, img: Image.Image):
+        self._lock = threading.Lock()
+        self._rgb: Optional[Image.Image] = None
+        # Without metadata, it must not end up in the outputs
+        self.stripped = _strip_metadata(img)
+    
+    @property
+    def rgb(self) -> Image.Image:
+        """RGB with transparency flattened onto white"""
+        with self._lock:
+            if self._rgb is None:
+                self._rgb = _flatten_to_rgb(self.stripped)
+            return self._rgb
+
+# Modes whose rows can be rebuilt from raw file bytes without a palette
+_RAW_ROW_MODES = ('1', 'L', 'LA', 'RGB', 'RGBA', 'RGBX', 'CMYK', 'I;16')
+
+def _raw_layout(img: Image.Image) -> Optional[Tuple[int, str, int, int]]:
+    """(offset, rawmode, stride, orientation) of an opened, not yet decoded image stored uncompressed
+    
+    Only images whose pixels are one uncompressed block in the file (BMP,
+    PPM, single-strip raw TIFF) qualify; their rows can be read on their own.
+    """
+    tile = getattr(img, "tile", None)
+    if not tile or len(tile) != 1 or getattr(img, "n_frames", 1) > 1 or img.mode not in _RAW_ROW_MODES:
+        return None
+    codec, extents, offset, args = tile[0]
+    if codec != "raw" or tuple(extents) != (0, 0) + img.size or not getattr(img, "filename", None):
+        return None
+    if isinstance(args, str):
+        args = (args,)
+    rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+    if not stride:
+        # Rows are packed without padding
+        stride = len(Image.new(img.mode, (img.size[0], 1)).tobytes("raw", rawmode))
+    return offset, rawmode, stride, orientation
+
+def _load_rows(img: Image.Image, top: int, bottom: int) -> Image.Image:
+    """Rows top to bottom of an opened image, reading only those rows where it is stored uncompressed
+    
+    Other images are decoded whole (honouring any draft set on them) and cropped.
+    """
+    width, height = img.size
+    layout = _raw_layout(img)
+    if layout is None:
+        img.load()
+        return img.crop((0, top, width, bottom))
+    
+    offset, rawmode, stride, orientation = layout
+    # Bottom-up files (orientation -1) store the last row first
+    first_row = top if orientation > 0 else height - bottom
+    with open(img.filename, 'rb') as f:
+        f.seek(offset + first_row * stride)
+        data = f.read((bottom - top) * stride)
+    rows = Image.frombytes(img.mode, (width, bottom - top), data, "raw", rawmode, stride, orientation)
+    rows.info = dict(img.info)
+    return rows
+
+class _PendingGeometry:
+    """Crops and resizes of a pipeline, collected until pixels are needed
+    
+    The chain is kept as one source region and one output size, so any run
+    of crops and resizes costs a single resample of just the region that
+    ends up in the output; a crop after a resize is done before it.
+    """
+    
+    def __init__(self, size: Tuple[int, int]):
+        self.reset(size)
+    
+    def reset(self, size: Tuple[int, int]):
+        self.source_size = size
+        self.box = (0.0, 0.0, float(size[0]), float(size[1]))
+        self.output_size: Optional[Tuple[int, int]] = None
+        self.resize_mode = "quality"
+    
+    @property
+    def pending(self) -> bool:
+        return self.output_size is not None or self.box != (0.0, 0.0) + tuple(map(float, self.source_size))
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Size of the image as the steps so far leave it"""
+        if self.output_size:
+            return self.output_size
+        return (round(self.box[2] - self.box[0]), round(self.box[3] - self.box[1]))
+    
+    def crop(self, x: int, y: int, width: int, height: int):
+        current_width, current_height = self.size
+        if x + width > current_width or y + height > current_height:
+            raise ValueError(f"Crop area extends beyond image boundaries ({current_width}x{current_height})")
+        left, top, right, bottom = self.box
+        scale_x = (right - left) / current_width
+        scale_y = (bottom - top) / current_height
+        self.box = (left + x * scale_x, top + y * scale_y, left + (x + width) * scale_x, top + (y + height) * scale_y)
+        if self.output_size:
+            self.output_size = (width, height)
+    
+    def resize(self, output_size: Tuple[int, int], resize_mode: str):
+        self.output_size = output_size
+        self.resize_mode = resize_mode
+    
+    def apply(self, img: Image.Image) -> Image.Image:
+        """Crop and resample img, decoded or not, to the collected geometry"""
+        if not self.pending:
+            return _pipeline_mode(img)
+        
+        box = self.box
+        headroom = DRAFT_HEADROOM if self.resize_mode == "quality" else 1
+        # Freshly opened images still have their tiles, they have not been decoded
+        undecoded = bool(getattr(img, "tile", None))
+        if undecoded and self.output_size:
+            # JPEGs can be decoded at a reduced scale
+            full_width, full_height = img.size
+            region_width, region_height = box[2] - box[0], box[3] - box[1]
+            img.draft(None, (math.ceil(self.output_size[0] * headroom * full_width / region_width),
+                             math.ceil(self.output_size[1] * headroom * full_height / region_height)))
+            scale_x, scale_y = img.size[0] / full_width, img.size[1] / full_height
+            box = (box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y)
+        if undecoded:
+            # Only read the rows of the region where the image is stored uncompressed
+            top, bottom = int(box[1]), min(img.size[1], math.ceil(box[3]))
+            img = _load_rows(img, top, bottom)
+            box = (box[0], box[1] - top, box[2], box[3] - top)
+        
+        img = _pipeline_mode(img)
+        if self.output_size:
+            img = img.resize(self.output_size, Image.Resampling.LANCZOS, box=box, reducing_gap=float(headroom + 1))
+        else:
+            img = img.crop(tuple(round(edge) for edge in box))
+        self.reset(img.size)
+        return img
+
+def _pipeline_value(kind: type, value: Any, label: str) -> Any:
+    """Check a parameter parsed from JSON against its type; 2.0 is a valid int, true is not a number"""
+    if kind is bool or kind is str:
+        if not isinstance(value, kind):
+            raise ValueError(f"{label} must be of type {kind.__name__}")
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or (kind is int and value != int(value)):
+        raise ValueError(f"{label} must be of type {kind.__name__}")
+    return kind(value)
+
+def _pipeline_mode(img: Image.Image) -> Image.Image:
+    """Convert palette, CMYK and other modes the pipeline steps do not handle well"""
+    if img.mode in ('RGB', 'RGBA', 'L', 'LA'):
+        return img
+    return img.convert('RGBA' if 'transparency' in img.info or img.mode in ('PA', 'La', 'RGBa') else 'RGB')
+
+def _strip_rows(width: int, multiple: int = 1) -> int:
+    """Rows per strip for an image this wide, a multiple of multiple"""
+    rows = max(1, STRIP_BYTES // (width * 4))
+    return max(multiple, rows - rows % multiple)
+
+def _iter_strips(img: Image.Image, rows: int) -> Iterator[Tuple[int, Image.Image]]:
+    """Yield (top, strip) over an opened image, rows at a time
+    
+    Uncompressed images are read from the file one strip at a time and never
+    held whole. Other formats are decoded whole (honouring any draft already
+    set on img) and cut into strips, so only the work per strip is bounded.
+    """
+    width, height = img.size
+    if _raw_layout(img) is None:
+        img.load()
+        for top in range(0, height, rows):
+            yield top, img.crop((0, top, width, min(height, top + rows)))
+        return
+    
+    for top in range(0, height, rows):
+        yield top, _load_rows(img, top, min(height, top + rows))
+
+# "quality" resizes from at least DRAFT_HEADROOM times the target resolution,
+# "fast" lets reduced decoding and box reduction go right down to it
+RESIZE_MODES = ("quality", "fast")
+DRAFT_HEADROOM = 2
+
+# Operations the batch endpoint can apply to every image
+BATCH_OPERATIONS = ("resize", "compress")
+
+# Name of the per-item status report added to every batch archive
+BATCH_REPORT_NAME = "batch_report.json"
+
+# Pipeline steps and their parameters, name -> (type, default); None defaults are required
+PIPELINE_STEPS: Dict[str, Dict[str, Tuple[type, Any]]] = {
+    "orient": {},
+    "crop": {"x": (int, None), "y": (int, None), "width": (int, None), "height": (int, None)},
+    "resize": {"width": (int, 0), "height": (int, 0), "resize_type": (str, "pixels"), "percentage": (float, 0.0),
+               "maintain_aspect_ratio": (bool, True), "resize_mode": (str, "quality")},
+    "enhance": {"brightness": (float, 1.0), "contrast": (float, 1.0), "sharpness": (float, 1.0)},
+}
+PIPELINE_MAX_STEPS = 20
+
+# Pipeline output formats, name -> (Pillow format, extension)
+PIPELINE_FORMATS = {"jpeg": ("JPEG", "jpg"), "png": ("PNG", "png"), "webp": ("WEBP", "webp")}
+
+# Most images accepted in one batch request, uploaded or inside zip archives
+BATCH_MAX_FILES = int(os.environ.get("TEALPDF_BATCH_MAX_FILES", 1000))
+
 class ImageService:
     """Service class for image operations"""
     
-    def __init__(self):
-        self.temp_dir = tempfile.gettempdir()
-    
-    async def resize_image(self, image_path: str, width: Optional[int] = None, height: Optional[int] = None) -> str:
+    def resize_image(self, image_path: str, width: Optional[int] = None, height: Optional[int] = None) -> str:
         """Resize image to specified dimensions while maintaining aspect ratio if only one dimension is provided"""
         try:
-            with Image.open(image_path) as img:
+            with _open_image(image_path) as img:
                 original_width, original_height = img.size
                 
                 # Convert to RGB if necessary (for JPEG output)
-                if img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
+                img = _flatten_to_rgb(img)
                 
                 # Calculate new dimensions
                 if width and height:
@@ -48,7 +316,7 @@ class ImageService:
                 resized_img = img.resize(new_size, Image.Resampling.LANCZOS)
                 
                 # Generate output path
-                output_path = os.path.join(self.temp_dir, f"resized_{uuid.uuid4().hex}.jpg")
+                output_path = artifact_store.path_for(f"resized_{uuid.uuid4().hex}.jpg", os.path.getsize(image_path))
                 
                 # Save resized image
                 resized_img.save(output_path, 'JPEG', quality=95, optimize=True)
@@ -60,79 +328,104 @@ class ImageService:
             logger.error(f"Error resizing image: {str(e)}")
             raise
     
-    async def resize_image_advanced(self, image_path: str, width: Optional[int] = None, height: Optional[int] = None, 
+    def _target_size(self, original_width: int, original_height: int, width: Optional[int], height: Optional[int],
+                     resize_type: str, percentage: Optional[float], maintain_aspect_ratio: bool) -> Tuple[int, int]:
+        """Output size of a resize with pixel/percentage options and aspect ratio control"""
+        # Calculate new dimensions based on resize type
+        if resize_type == "percentage":
+            if not percentage or percentage <= 0:
+                raise ValueError("Valid percentage must be specified for percentage resize")
+            
+            # Calculate new dimensions based on percentage
+            scale_factor = percentage / 100.0
+            new_width = int(original_width * scale_factor)
+            new_height = int(original_height * scale_factor)
+            new_size = (new_width, new_height)
+            
+            logger.info(f"Percentage resize: {percentage}% scale = {new_width}x{new_height}")
+            
+        elif resize_type == "pixels":
+            if maintain_aspect_ratio:
+                # Maintain aspect ratio
+                if width and height:
+                    # Both dimensions provided - choose the one that results in smaller scaling
+                    width_scale = width / original_width
+                    height_scale = height / original_height
+                    scale = min(width_scale, height_scale)
+                    new_width = int(original_width * scale)
+                    new_height = int(original_height * scale)
+                elif width:
+                    # Only width specified - maintain aspect ratio
+                    aspect_ratio = original_height / original_width
+                    new_width = width
+                    new_height = int(width * aspect_ratio)
+                elif height:
+                    # Only height specified - maintain aspect ratio
+                    aspect_ratio = original_width / original_height
+                    new_width = int(height * aspect_ratio)
+                    new_height = height
+                else:
+                    raise ValueError("At least one dimension must be specified for pixel resize")
+            else:
+                # Don't maintain aspect ratio - use exact dimensions
+                if not width or not height:
+                    raise ValueError("Both width and height must be specified when not maintaining aspect ratio")
+                new_width = width
+                new_height = height
+            
+            new_size = (new_width, new_height)
+            logger.info(f"Pixel resize: {original_width}x{original_height} -> {new_width}x{new_height} (maintain aspect ratio: {maintain_aspect_ratio})")
+            
+        else:
+            raise ValueError(f"Invalid resize_type: {resize_type}. Must be 'pixels' or 'percentage'")
+        
+        # Validate new dimensions
+        if new_size[0] <= 0 or new_size[1] <= 0:
+            raise ValueError(f"Invalid dimensions: {new_size[0]}x{new_size[1]}")
+        
+        return new_size
+    
+    def resize_image_advanced(self, image_path: str, width: Optional[int] = None, height: Optional[int] = None, 
                                   resize_type: str = "pixels", percentage: Optional[float] = None, 
-                                  maintain_aspect_ratio: bool = True) -> str:
-        """Advanced resize image with pixel/percentage options and aspect ratio control"""
+                                  maintain_aspect_ratio: bool = True, resize_mode: str = "quality") -> str:
+        """Advanced resize image with pixel/percentage options and aspect ratio control
+        
+        When shrinking, JPEGs are decoded at a reduced scale in the DCT domain and
+        other formats are box-reduced before the final LANCZOS resample, which
+        saves most of the decode time and memory for large photos. The
+        "quality" mode keeps at least DRAFT_HEADROOM times the target
+        resolution for the final resample, "fast" reduces right down to it.
+        """
         try:
-            with Image.open(image_path) as img:
+            if resize_mode not in RESIZE_MODES:
+                raise ValueError(f"Invalid resize_mode: {resize_mode}. Must be one of {', '.join(RESIZE_MODES)}")
+            
+            with _open_image(image_path) as img:
                 original_width, original_height = img.size
                 
-                # Convert to RGB if necessary (for JPEG output)
-                if img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Calculate new dimensions based on resize type
-                if resize_type == "percentage":
-                    if not percentage or percentage <= 0:
-                        raise ValueError("Valid percentage must be specified for percentage resize")
-                    
-                    # Calculate new dimensions based on percentage
-                    scale_factor = percentage / 100.0
-                    new_width = int(original_width * scale_factor)
-                    new_height = int(original_height * scale_factor)
-                    new_size = (new_width, new_height)
-                    
-                    logger.info(f"Percentage resize: {percentage}% scale = {new_width}x{new_height}")
-                    
-                elif resize_type == "pixels":
-                    if maintain_aspect_ratio:
-                        # Maintain aspect ratio
-                        if width and height:
-                            # Both dimensions provided - choose the one that results in smaller scaling
-                            width_scale = width / original_width
-                            height_scale = height / original_height
-                            scale = min(width_scale, height_scale)
-                            new_width = int(original_width * scale)
-                            new_height = int(original_height * scale)
-                        elif width:
-                            # Only width specified - maintain aspect ratio
-                            aspect_ratio = original_height / original_width
-                            new_width = width
-                            new_height = int(width * aspect_ratio)
-                        elif height:
-                            # Only height specified - maintain aspect ratio
-                            aspect_ratio = original_width / original_height
-                            new_width = int(height * aspect_ratio)
-                            new_height = height
-                        else:
-                            raise ValueError("At least one dimension must be specified for pixel resize")
-                    else:
-                        # Don't maintain aspect ratio - use exact dimensions
-                        if not width or not height:
-                            raise ValueError("Both width and height must be specified when not maintaining aspect ratio")
-                        new_width = width
-                        new_height = height
-                    
-                    new_size = (new_width, new_height)
-                    logger.info(f"Pixel resize: {original_width}x{original_height} -> {new_width}x{new_height} (maintain aspect ratio: {maintain_aspect_ratio})")
-                    
-                else:
-                    raise ValueError(f"Invalid resize_type: {resize_type}. Must be 'pixels' or 'percentage'")
+                new_size = self._target_size(original_width, original_height, width, height,
+                                             resize_type, percentage, maintain_aspect_ratio)
                 
-                # Validate new dimensions
-                if new_size[0] <= 0 or new_size[1] <= 0:
-                    raise ValueError(f"Invalid dimensions: {new_size[0]}x{new_size[1]}")
+                # Must happen before anything loads the pixel data
+                headroom = DRAFT_HEADROOM if resize_mode == "quality" else 1
+                img.draft(None, (new_size[0] * headroom, new_size[1] * headroom))
+                if img.size != (original_width, original_height):
+                    logger.info(f"Decoding at reduced scale {img.size[0]}x{img.size[1]} for {new_size[0]}x{new_size[1]} output")
                 
-                # Resize with high-quality resampling
-                resized_img = img.resize(new_size, Image.Resampling.LANCZOS)
+                factor = int(min(img.size[0] / new_size[0], img.size[1] / new_size[1]) / (headroom + 1))
+                if img.size[0] * img.size[1] > LARGE_IMAGE_PIXELS and factor >= 2 and _raw_layout(img) is not None:
+                    # Box-reduce strip by strip, the full-size image is never held in memory
+                    logger.info(f"Reducing {img.size[0]}x{img.size[1]} image by {factor} in strips")
+                    resized_img = self._reduce_in_strips(img, factor).resize(new_size, Image.Resampling.LANCZOS)
+                else:
+                    # Convert to RGB if necessary (for JPEG output)
+                    img = _flatten_to_rgb(img)
+                    
+                    # Resize with high-quality resampling, box-reducing large factors first
+                    resized_img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=float(headroom + 1))
                 
                 # Generate output path
-                output_path = os.path.join(self.temp_dir, f"resized_{uuid.uuid4().hex}.jpg")
+                output_path = artifact_store.path_for(f"resized_{uuid.uuid4().hex}.jpg", os.path.getsize(image_path))
                 
                 # Save resized image
                 resized_img.save(output_path, 'JPEG', quality=95, optimize=True)
@@ -144,108 +437,122 @@ class ImageService:
             logger.error(f"Error resizing image (advanced): {str(e)}")
             raise
     
-    async def compress_image(self, image_path: str, quality: int = 85) -> str:
+    def _reduce_in_strips(self, img: Image.Image, factor: int) -> Image.Image:
+        """Flatten to RGB and box-reduce by factor, one strip at a time"""
+        width, height = img.size
+        reduced = Image.new('RGB', (-(-width // factor), -(-height // factor)))
+        for top, strip in _iter_strips(img, _strip_rows(width, factor)):
+            reduced.paste(_flatten_to_rgb(strip).reduce(factor), (0, top // factor))
+        return reduced
+    
+    def compress_image(self, image_path: str, quality: int = 85, deadline: Optional[float] = None,
+                       exhaustive: bool = False) -> str:
         """Advanced lossless image compression with multiple optimization techniques"""
+        output_path, _ = self.compress_image_with_status(image_path, quality, deadline, exhaustive)
+        return output_path
+
+    def compress_image_with_status(self, image_path: str, quality: int = 85, deadline: Optional[float] = None,
+                                   exhaustive: bool = False) -> Tuple[str, bool]:
+        """Compress an image, returns the output path and whether every candidate finished
+
+        A quick analysis of the image predicts which encoders can win and only
+        those run (all of them with exhaustive=True). The candidates encode
+        concurrently into memory buffers and only the smallest one is written
+        to disk. With a deadline (in seconds) the best candidate finished within
+        that budget is used; if none has finished yet, the first one to finish wins.
+        A result picked before every candidate finished depends on the deadline.
+        """
         try:
-            with Image.open(image_path) as img:
+            with _open_image(image_path) as img:
                 original_size = os.path.getsize(image_path)
                 original_width, original_height = img.size
                 
                 logger.info(f"Starting compression of {original_width}x{original_height} image ({original_size} bytes)")
                 
-                # Try different compression strategies and pick the best one
-                best_path = None
-                best_size = float('inf')
-                best_format = "PNG (lossless)"  # default format
-                
-                # Strategy 1: PNG with maximum compression (lossless)
-                png_path = await self._compress_as_png(img, "png_max")
-                png_size = os.path.getsize(png_path)
-                if png_size < best_size:
-                    if best_path and os.path.exists(best_path):
-                        os.remove(best_path)
-                    best_path = png_path
-                    best_size = png_size
-                    best_format = "PNG (lossless)"
-                else:
-                    os.remove(png_path)
-                
-                # Strategy 2: WebP lossless compression
-                webp_path = await self._compress_as_webp_lossless(img)
-                webp_size = os.path.getsize(webp_path)
-                if webp_size < best_size:
-                    if best_path and os.path.exists(best_path):
-                        os.remove(best_path)
-                    best_path = webp_path
-                    best_size = webp_size
-                    best_format = "WebP (lossless)"
-                else:
-                    os.remove(webp_path)
-                
-                # Strategy 3: JPEG with optimized settings (if quality allows some loss)
-                if quality < 100:  # Only use JPEG if some quality loss is acceptable
-                    jpeg_path = await self._compress_as_jpeg_optimized(img, quality)
-                    jpeg_size = os.path.getsize(jpeg_path)
-                    if jpeg_size < best_size:
-                        if best_path and os.path.exists(best_path):
-                            os.remove(best_path)
-                        best_path = jpeg_path
-                        best_size = jpeg_size
-                        best_format = f"JPEG (quality {quality})"
-                    else:
-                        os.remove(jpeg_path)
-                
-                # Strategy 4: TIFF with LZW compression (lossless)
-                tiff_path = await self._compress_as_tiff_lzw(img)
-                tiff_size = os.path.getsize(tiff_path)
-                if tiff_size < best_size:
-                    if best_path and os.path.exists(best_path):
-                        os.remove(best_path)
-                    best_path = tiff_path
-                    best_size = tiff_size
-                    best_format = "TIFF (LZW)"
-                else:
-                    os.remove(tiff_path)
+                # Decode and normalize once up front, the encoder threads only read the pixel data
+                img.load()
+                # The source format is one of the features, analyze before normalizing drops it
+                features = format_predictor.analyze(img)
+                normalized = _NormalizedImage(img)
                 
-                # Calculate compression statistics
-                compression_ratio = (1 - best_size / original_size) * 100
+                # encoder -> (format label, extension, encode function)
+                candidates = {
+                    "png": ("PNG (lossless)", "png", lambda: self._compress_as_png(normalized.stripped, "png_max")),
+                    "webp": ("WebP (lossless)", "webp", lambda: self._compress_as_webp_lossless(normalized.stripped)),
+                    # Only use JPEG if some quality loss is acceptable
+                    "jpeg": (f"JPEG (quality {quality})", "jpg", lambda: self._compress_as_jpeg_optimized(normalized.rgb, quality)),
+                    "tiff": ("TIFF (LZW)", "tiff", lambda: self._compress_as_tiff_lzw(normalized.stripped)),
+                }
+                if quality >= 100:
+                    del candidates["jpeg"]
                 
-                # Generate final output path with appropriate extension
-                if "PNG" in best_format:
-                    extension = "png"
-                elif "WebP" in best_format:
-                    extension = "webp"
-                elif "JPEG" in best_format:
-                    extension = "jpg"
-                elif "TIFF" in best_format:
-                    extension = "tiff"
+                # Skip encoders that are not expected to win for this kind of image
+                if exhaustive:
+                    selected = list(candidates)
                 else:
-                    extension = "png"  # fallback
+                    selected = [encoder for encoder in format_predictor.predict(features, quality) if encoder in candidates]
+                logger.info(f"Compression candidates for {features.bucket} image: {', '.join(selected)}")
                 
-                final_output_path = os.path.join(self.temp_dir, f"compressed_{uuid.uuid4().hex}.{extension}")
+                futures = {
+                    _encoder_pool.submit(candidates[encoder][2]): encoder
+                    for encoder in selected
+                }
                 
-                # Move the best result to final path
-                if best_path and os.path.exists(best_path):
-                    import shutil
-                    shutil.move(best_path, final_output_path)
-                else:
+                done, pending = concurrent.futures.wait(futures, timeout=deadline)
+                if not done:
+                    logger.info(f"No compression candidate finished within {deadline}s, waiting for the first one")
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                
+                # Abandon whatever has not started yet, running encoders finish in the background
+                for future in pending:
+                    future.cancel()
+                if pending:
+                    logger.info(f"Deadline reached, skipping {len(pending)} unfinished compression candidates")
+                
+                # Pick the smallest encoding among the finished candidates
+                best_data = None
+                best_encoder = None
+                finished = []
+                for future in done:
+                    encoder = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        logger.warning(f"{candidates[encoder][0]} compression candidate failed: {str(e)}")
+                        continue
+                    finished.append(encoder)
+                    if best_data is None or len(data) < len(best_data):
+                        best_data = data
+                        best_encoder = encoder
+                
+                if best_data is None:
                     raise Exception("No valid compression result generated")
                 
+                # Only complete races teach the predictor anything
+                if not pending:
+                    format_predictor.record(features, finished, best_encoder)
+                best_format, best_extension, _ = candidates[best_encoder]
+                
+                # Calculate compression statistics
+                best_size = len(best_data)
+                compression_ratio = (1 - best_size / original_size) * 100
+                
+                # Only the winning candidate is written to disk
+                final_output_path = artifact_store.path_for(f"compressed_{uuid.uuid4().hex}.{best_extension}", best_size)
+                with open(final_output_path, 'wb') as output_file:
+                    output_file.write(best_data)
+                
                 logger.info(f"Successfully compressed image: {compression_ratio:.1f}% reduction using {best_format} (from {original_size} to {best_size} bytes)")
-                return final_output_path
+                metrics.inc("tealpdf_engine_selected_total", operation="image.compress", engine=best_encoder)
+                return final_output_path, not pending
                 
         except Exception as e:
             logger.error(f"Error compressing image: {str(e)}")
             raise
     
-    async def _compress_as_png(self, img: Image.Image, mode: str = "png_max") -> str:
-        """Compress image as PNG with maximum compression settings"""
+    def _compress_as_png(self, img: Image.Image, mode: str = "png_max") -> bytes:
+        """Compress an image without metadata as PNG with maximum compression settings"""
         try:
-            # Remove metadata and optimize color palette
-            optimized_img = self._optimize_image_for_compression(img)
-            
-            output_path = os.path.join(self.temp_dir, f"temp_png_{uuid.uuid4().hex}.png")
-            
             # PNG compression settings for maximum compression
             save_kwargs = {
                 'format': 'PNG',
@@ -253,47 +560,34 @@ class ImageService:
                 'compress_level': 9,  # Maximum compression
             }
             
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, **save_kwargs)
+            
             # Convert to palette mode if possible for better compression
-            if optimized_img.mode in ('RGB', 'RGBA'):
+            if img.mode in ('RGB', 'RGBA'):
                 # Try to convert to palette mode if image has limited colors
                 try:
-                    palette_img = optimized_img.quantize(colors=256)
-                    # Check if conversion is beneficial
-                    temp_path = os.path.join(self.temp_dir, f"temp_palette_test_{uuid.uuid4().hex}.png")
-                    palette_img.save(temp_path, **save_kwargs)
+                    palette_img = img.quantize(colors=256)
+                    palette_buffer = io.BytesIO()
+                    palette_img.save(palette_buffer, **save_kwargs)
                     
                     # If palette version is significantly smaller, use it
-                    original_temp_path = os.path.join(self.temp_dir, f"temp_original_test_{uuid.uuid4().hex}.png")
-                    optimized_img.save(original_temp_path, **save_kwargs)
-                    
-                    palette_size = os.path.getsize(temp_path)
-                    original_size = os.path.getsize(original_temp_path)
-                    
-                    if palette_size < original_size * 0.9:  # If at least 10% smaller
-                        optimized_img = palette_img
-                    
-                    # Clean up test files
-                    os.remove(temp_path)
-                    os.remove(original_temp_path)
+                    if palette_buffer.tell() < output_buffer.tell() * 0.9:  # If at least 10% smaller
+                        output_buffer = palette_buffer
                     
                 except Exception:
                     # If palette conversion fails, continue with original
                     pass
             
-            optimized_img.save(output_path, **save_kwargs)
-            return output_path
+            return output_buffer.getvalue()
             
         except Exception as e:
             logger.error(f"Error in PNG compression: {str(e)}")
             raise
     
-    async def _compress_as_webp_lossless(self, img: Image.Image) -> str:
-        """Compress image as WebP with lossless compression"""
+    def _compress_as_webp_lossless(self, img: Image.Image) -> bytes:
+        """Compress an image without metadata as WebP with lossless compression"""
         try:
-            optimized_img = self._optimize_image_for_compression(img)
-            
-            output_path = os.path.join(self.temp_dir, f"temp_webp_{uuid.uuid4().hex}.webp")
-            
             # WebP lossless compression settings
             save_kwargs = {
                 'format': 'WEBP',
@@ -303,31 +597,17 @@ class ImageService:
                 'optimize': True
             }
             
-            optimized_img.save(output_path, **save_kwargs)
-            return output_path
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, **save_kwargs)
+            return output_buffer.getvalue()
             
         except Exception as e:
             logger.error(f"Error in WebP lossless compression: {str(e)}")
             raise
     
-    async def _compress_as_jpeg_optimized(self, img: Image.Image, quality: int) -> str:
-        """Compress image as JPEG with advanced optimization"""
+    def _compress_as_jpeg_optimized(self, img: Image.Image, quality: int) -> bytes:
+        """Compress an RGB image without metadata as JPEG with advanced optimization"""
         try:
-            # Convert to RGB for JPEG
-            if img.mode in ('RGBA', 'LA'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                optimized_img = background
-            elif img.mode != 'RGB':
-                optimized_img = img.convert('RGB')
-            else:
-                optimized_img = img.copy()
-            
-            # Remove metadata
-            optimized_img = self._optimize_image_for_compression(optimized_img)
-            
-            output_path = os.path.join(self.temp_dir, f"temp_jpeg_{uuid.uuid4().hex}.jpg")
-            
             # Advanced JPEG compression settings
             save_kwargs = {
                 'format': 'JPEG',
@@ -337,63 +617,35 @@ class ImageService:
                 'subsampling': 0 if quality > 90 else 2,  # Better subsampling for high quality
             }
             
-            optimized_img.save(output_path, **save_kwargs)
-            return output_path
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, **save_kwargs)
+            return output_buffer.getvalue()
             
         except Exception as e:
             logger.error(f"Error in JPEG optimization: {str(e)}")
             raise
     
-    async def _compress_as_tiff_lzw(self, img: Image.Image) -> str:
-        """Compress image as TIFF with LZW compression"""
+    def _compress_as_tiff_lzw(self, img: Image.Image) -> bytes:
+        """Compress an image without metadata as TIFF with LZW compression"""
         try:
-            optimized_img = self._optimize_image_for_compression(img)
-            
-            output_path = os.path.join(self.temp_dir, f"temp_tiff_{uuid.uuid4().hex}.tiff")
-            
             # TIFF with LZW compression (lossless)
             save_kwargs = {
                 'format': 'TIFF',
-                'compression': 'lzw',
-                'optimize': True
+                'compression': 'tiff_lzw',
             }
             
-            optimized_img.save(output_path, **save_kwargs)
-            return output_path
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, **save_kwargs)
+            return output_buffer.getvalue()
             
         except Exception as e:
             logger.error(f"Error in TIFF LZW compression: {str(e)}")
             raise
     
-    def _optimize_image_for_compression(self, img: Image.Image) -> Image.Image:
-        """Optimize image for better compression by removing metadata and optimizing color space"""
-        try:
-            # Create a copy without metadata
-            optimized_img = img.copy()
-            
-            # Remove EXIF and other metadata
-            if hasattr(optimized_img, 'getexif'):
-                optimized_img = optimized_img._new(optimized_img.im)
-            
-            # Remove any embedded profiles
-            if 'icc_profile' in optimized_img.info:
-                del optimized_img.info['icc_profile']
-            
-            # Remove other metadata
-            for key in list(optimized_img.info.keys()):
-                if key not in ['transparency', 'gamma']:  # Keep essential info
-                    del optimized_img.info[key]
-            
-            return optimized_img
-            
-        except Exception as e:
-            logger.warning(f"Could not optimize image metadata: {str(e)}")
-            return img.copy()
-    
-    async def crop_image(self, image_path: str, x: int, y: int, width: int, height: int) -> str:
+    def crop_image(self, image_path: str, x: int, y: int, width: int, height: int) -> str:
         """Crop image to specified area"""
         try:
-            with Image.open(image_path) as img:
+            with _open_image(image_path) as img:
                 original_width, original_height = img.size
                 
                 # Validate crop area
@@ -402,20 +654,14 @@ class ImageService:
                 if x + width > original_width or y + height > original_height:
                     raise ValueError("Crop area extends beyond image boundaries")
                 
-                # Crop image
-                crop_box = (x, y, x + width, y + height)
-                cropped_img = img.crop(crop_box)
+                # Crop image, only reading the rows of the crop area where the image is stored uncompressed
+                cropped_img = _load_rows(img, y, y + height).crop((x, 0, x + width, height))
                 
                 # Convert to RGB if necessary (for JPEG output)
-                if cropped_img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', cropped_img.size, (255, 255, 255))
-                    background.paste(cropped_img, mask=cropped_img.split()[-1] if cropped_img.mode == 'RGBA' else None)
-                    cropped_img = background
-                elif cropped_img.mode != 'RGB':
-                    cropped_img = cropped_img.convert('RGB')
+                cropped_img = _flatten_to_rgb(cropped_img)
                 
                 # Generate output path
-                output_path = os.path.join(self.temp_dir, f"cropped_{uuid.uuid4().hex}.jpg")
+                output_path = artifact_store.path_for(f"cropped_{uuid.uuid4().hex}.jpg", os.path.getsize(image_path))
                 
                 # Save cropped image
                 cropped_img.save(output_path, 'JPEG', quality=95, optimize=True)
@@ -427,10 +673,230 @@ class ImageService:
             logger.error(f"Error cropping image: {str(e)}")
             raise
     
-    async def get_image_dimensions(self, image_path: str) -> Tuple[int, int]:
+    def process_batch_item(self, image_path: str, operation: str, options: Dict[str, Any]) -> str:
+        """Apply one batch operation to an image, with the options of the matching single-image call"""
+        if operation == "resize":
+            return self.resize_image_advanced(
+                image_path,
+                options.get("width"),
+                options.get("height"),
+                options.get("resize_type", "pixels"),
+                options.get("percentage"),
+                options.get("maintain_aspect_ratio", True),
+                options.get("resize_mode", "quality")
+            )
+        if operation == "compress":
+            return self.compress_image(image_path, options.get("quality", 85))
+        raise ValueError(f"Invalid batch operation: {operation}. Must be one of {', '.join(BATCH_OPERATIONS)}")
+    
+    def _batch_output_name(self, filename: str, output_path: str, used: Set[str]) -> str:
+        """Name of an item's result in the archive: its input name with the output extension, made unique"""
+        base_name = os.path.splitext(filename)[0]
+        ext = os.path.splitext(output_path)[1]
+        name = f"{base_name}{ext}"
+        counter = 2
+        while name in used:
+            name = f"{base_name}_{counter}{ext}"
+            counter += 1
+        used.add(name)
+        return name
+    
+    def iter_batch(
+        self,
+        items: List[Tuple[str, str]],
+        operation: str,
+        options: Dict[str, Any],
+        submit: Optional[Callable[..., concurrent.futures.Future]] = None,
+        max_in_flight: int = 2
+    ) -> Iterator[Tuple[str, Union[str, bytes]]]:
+        """Process (filename, image path) items, yielding (archive name, output path) as they finish
+        
+        Given a submit callable (e.g. ExecutorService.submit bound to an
+        operation), up to max_in_flight items run in parallel, otherwise one
+        after the other. Results are yielded in input order. An
+        item that fails is recorded and skipped, the batch goes on; the last
+        member yielded is a JSON report with the outcome of every item.
+        """
+        if operation not in BATCH_OPERATIONS:
+            raise ValueError(f"Invalid batch operation: {operation}. Must be one of {', '.join(BATCH_OPERATIONS)}")
+        
+        report = []
+        used_names: Set[str] = set()
+        
+        def finish(filename: str, image_path: str, result: Callable[[], str]):
+            try:
+                output_path = result()
+            except Exception as e:
+                logger.warning(f"Batch {operation} failed for {filename}: {str(e)}")
+                report.append({"file": filename, "status": "error", "error": str(e)})
+                metrics.inc("tealpdf_batch_items_total", operation=f"image.{operation}", outcome="failed")
+                return None
+            
+            archive_name = self._batch_output_name(filename, output_path, used_names)
+            report.append({
+                "file": filename,
+                "status": "ok",
+                "output": archive_name,
+                "input_bytes": os.path.getsize(image_path),
+                "output_bytes": os.path.getsize(output_path),
+            })
+            metrics.record_files(f"image.{operation}", [image_path], output_path, ratio=operation == "compress")
+            metrics.inc("tealpdf_batch_items_total", operation=f"image.{operation}", outcome="completed")
+            return archive_name, output_path
+        
+        if submit is None:
+            for filename, image_path in items:
+                member = finish(filename, image_path, lambda: self.process_batch_item(image_path, operation, options))
+                if member:
+                    yield member
+        else:
+            pending = deque()
+            try:
+                for filename, image_path in items:
+                    pending.append((filename, image_path, submit(self.process_batch_item, image_path, operation, options)))
+                    if len(pending) >= max_in_flight:
+                        filename, image_path, future = pending.popleft()
+                        member = finish(filename, image_path, future.result)
+                        if member:
+                            yield member
+                while pending:
+                    filename, image_path, future = pending.popleft()
+                    member = finish(filename, image_path, future.result)
+                    if member:
+                        yield member
+            finally:
+                # The consumer went away (e.g. the client disconnected)
+                for _, _, future in pending:
+                    future.cancel()
+        
+        failed = sum(1 for item in report if item["status"] == "error")
+        logger.info(f"Batch {operation} finished: {len(report) - failed} succeeded, {failed} failed")
+        yield BATCH_REPORT_NAME, json.dumps({
+            "operation": operation,
+            "options": options,
+            "total": len(report),
+            "succeeded": len(report) - failed,
+            "failed": failed,
+            "items": report,
+        }, indent=2).encode()
+    
+    def plan_pipeline(self, operations: Any) -> List[Dict[str, Any]]:
+        """Validate a pipeline's operations and fill in their defaults
+        
+        operations is a list of {"op": name, ...parameters} objects, see
+        PIPELINE_STEPS. Steps that change nothing are dropped. Raises
+        ValueError for anything malformed.
+        """
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Operations must be a non-empty list")
+        if len(operations) > PIPELINE_MAX_STEPS:
+            raise ValueError(f"At most {PIPELINE_MAX_STEPS} operations are allowed")
+        
+        steps = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get("op") not in PIPELINE_STEPS:
+                raise ValueError(f"Operation {index + 1} must be an object with an op of: {', '.join(PIPELINE_STEPS)}")
+            name = operation["op"]
+            parameters = PIPELINE_STEPS[name]
+            unknown = set(operation) - set(parameters) - {"op"}
+            if unknown:
+                raise ValueError(f"Unknown parameters for {name}: {', '.join(sorted(unknown))}")
+            
+            step = {"op": name}
+            for parameter, (kind, default) in parameters.items():
+                value = operation.get(parameter, default)
+                if value is None:
+                    raise ValueError(f"{name} requires {parameter}")
+                step[parameter] = _pipeline_value(kind, value, f"{name} {parameter}")
+            
+            if name == "orient" and index > 0:
+                raise ValueError("orient must be the first operation")
+            if name == "crop":
+                if step["x"] < 0 or step["y"] < 0:
+                    raise ValueError("Crop coordinates cannot be negative")
+                if step["width"] <= 0 or step["height"] <= 0:
+                    raise ValueError("Crop width and height must be positive")
+            if name == "resize":
+                if step["resize_mode"] not in RESIZE_MODES:
+                    raise ValueError(f"Invalid resize_mode: {step['resize_mode']}. Must be one of {', '.join(RESIZE_MODES)}")
+                if step["width"] < 0 or step["height"] < 0:
+                    raise ValueError("Resize width and height cannot be negative")
+                # Checks the remaining parameters, the source size does not matter here
+                self._target_size(1000, 1000, step["width"] or None, step["height"] or None, step["resize_type"],
+                                  step["percentage"] or None, step["maintain_aspect_ratio"])
+                if step["resize_type"] == "percentage" and step["percentage"] == 100:
+                    continue
+            if name == "enhance":
+                if min(step["brightness"], step["contrast"], step["sharpness"]) < 0:
+                    raise ValueError("Enhancement factors cannot be negative")
+                if step["brightness"] == step["contrast"] == step["sharpness"] == 1.0:
+                    continue
+            steps.append(step)
+        return steps
+    
+    def run_pipeline(self, image_path: str, steps: List[Dict[str, Any]], output_format: str = "jpeg",
+                     quality: int = 95) -> str:
+        """Apply planned pipeline steps to one decoded image and encode the result once
+        
+        Crops and resizes are collected and applied as a single resample of
+        the region that ends up in the output, right before an enhancement or
+        the final encode needs the pixels. The source is only decoded then, so
+        reduced-scale JPEG decoding and reading only the needed rows of
+        uncompressed images still apply.
+        """
+        try:
+            if output_format not in PIPELINE_FORMATS:
+                raise ValueError(f"Invalid output format: {output_format}. Must be one of {', '.join(PIPELINE_FORMATS)}")
+            
+            with _open_image(image_path) as img:
+                original_width, original_height = img.size
+                geometry = _PendingGeometry(img.size)
+                
+                for step in steps:
+                    name = step["op"]
+                    if name == "orient":
+                        # Only rotated images need to be decoded here
+                        if img.getexif().get(0x0112, 1) != 1:
+                            img = ImageOps.exif_transpose(img)
+                            geometry.reset(img.size)
+                    elif name == "crop":
+                        geometry.crop(step["x"], step["y"], step["width"], step["height"])
+                    elif name == "resize":
+                        target = self._target_size(*geometry.size, step["width"] or None, step["height"] or None,
+                                                   step["resize_type"], step["percentage"] or None,
+                                                   step["maintain_aspect_ratio"])
+                        geometry.resize(target, step["resize_mode"])
+                    elif name == "enhance":
+                        img = geometry.apply(img)
+                        if step["brightness"] != 1.0:
+                            img = ImageEnhance.Brightness(img).enhance(step["brightness"])
+                        if step["contrast"] != 1.0:
+                            img = ImageEnhance.Contrast(img).enhance(step["contrast"])
+                        if step["sharpness"] != 1.0:
+                            img = ImageEnhance.Sharpness(img).enhance(step["sharpness"])
+                img = geometry.apply(img)
+                
+                pillow_format, extension = PIPELINE_FORMATS[output_format]
+                output_path = artifact_store.path_for(f"processed_{uuid.uuid4().hex}.{extension}", os.path.getsize(image_path))
+                if pillow_format == "JPEG":
+                    _flatten_to_rgb(img).save(output_path, 'JPEG', quality=quality, optimize=True)
+                elif pillow_format == "WEBP":
+                    img.save(output_path, 'WEBP', quality=quality)
+                else:
+                    img.save(output_path, 'PNG', optimize=True)
+                
+                logger.info(f"Successfully ran pipeline ({', '.join(step['op'] for step in steps) or 'encode'}) "
+                            f"on {original_width}x{original_height} image, output {img.size[0]}x{img.size[1]} {output_format}")
+                return output_path
+                
+        except Exception as e:
+            logger.error(f"Error running image pipeline: {str(e)}")
+            raise
+    
+    def get_image_dimensions(self, image_path: str) -> Tuple[int, int]:
         """Get image dimensions"""
         try:
-            with Image.open(image_path) as img:
+            with _open_image(image_path) as img:
                 width, height = img.size
                 logger.info(f"Image dimensions: {width}x{height}")
                 return (width, height)
@@ -439,33 +905,33 @@ class ImageService:
             logger.error(f"Error getting image dimensions: {str(e)}")
             raise
     
-    async def enhance_image(self, image_path: str, brightness: float = 1.0, contrast: float = 1.0, sharpness: float = 1.0) -> str:
+    def enhance_image(self, image_path: str, brightness: float = 1.0, contrast: float = 1.0, sharpness: float = 1.0) -> str:
         """Enhance image with brightness, contrast, and sharpness adjustments"""
         try:
-            with Image.open(image_path) as img:
-                # Apply enhancements
-                if brightness != 1.0:
-                    enhancer = ImageEnhance.Brightness(img)
-                    img = enhancer.enhance(brightness)
-                
-                if contrast != 1.0:
-                    enhancer = ImageEnhance.Contrast(img)
-                    img = enhancer.enhance(contrast)
-                
-                if sharpness != 1.0:
-                    enhancer = ImageEnhance.Sharpness(img)
-                    img = enhancer.enhance(sharpness)
-                
-                # Convert to RGB if necessary (for JPEG output)
-                if img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
+            with _open_image(image_path) as img:
+                if img.size[0] * img.size[1] > LARGE_IMAGE_PIXELS:
+                    # Enhance strip by strip straight into the RGB output
+                    logger.info(f"Enhancing {img.size[0]}x{img.size[1]} image in strips")
+                    img = self._enhance_in_strips(img, brightness, contrast, sharpness)
+                else:
+                    # Apply enhancements
+                    if brightness != 1.0:
+                        enhancer = ImageEnhance.Brightness(img)
+                        img = enhancer.enhance(brightness)
+                    
+                    if contrast != 1.0:
+                        enhancer = ImageEnhance.Contrast(img)
+                        img = enhancer.enhance(contrast)
+                    
+                    if sharpness != 1.0:
+                        enhancer = ImageEnhance.Sharpness(img)
+                        img = enhancer.enhance(sharpness)
+                    
+                    # Convert to RGB if necessary (for JPEG output)
+                    img = _flatten_to_rgb(img)
                 
                 # Generate output path
-                output_path = os.path.join(self.temp_dir, f"enhanced_{uuid.uuid4().hex}.jpg")
+                output_path = artifact_store.path_for(f"enhanced_{uuid.uuid4().hex}.jpg", os.path.getsize(image_path))
                 
                 # Save enhanced image
                 img.save(output_path, 'JPEG', quality=95, optimize=True)
@@ -477,10 +943,81 @@ class ImageService:
             logger.error(f"Error enhancing image: {str(e)}")
             raise
     
-    async def auto_orient_image(self, image_path: str) -> str:
+    def _enhance_in_strips(self, img: Image.Image, brightness: float, contrast: float,
+                           sharpness: float) -> Image.Image:
+        """enhance_image for large images, same result without its full-size intermediates
+        
+        Memory peaks at the decoded input plus the RGB output and one strip's
+        work, where enhancing whole images holds a full-size copy per enhancer.
+        
+        Brightness and contrast work pixel by pixel, except that contrast blends
+        towards the mean grey of the brightened image, which takes a pass of
+        its own. Sharpening filters 3x3 neighbourhoods, so every strip is
+        sharpened together with the adjacent row of its neighbours.
+        """
+        width, height = img.size
+        rows = _strip_rows(width)
+        
+        def brighten(strip: Image.Image) -> Image.Image:
+            if strip.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                strip = strip.convert('RGBA' if 'transparency' in strip.info else 'RGB')
+            if brightness != 1.0:
+                strip = ImageEnhance.Brightness(strip).enhance(brightness)
+            return strip
+        
+        def adjust(strip: Image.Image) -> Image.Image:
+            strip = brighten(strip)
+            if contrast != 1.0:
+                # ImageEnhance.Contrast with the mean of the whole image
+                degenerate = Image.new('L', strip.size, mean)
+                if degenerate.mode != strip.mode:
+                    degenerate = degenerate.convert(strip.mode)
+                if 'A' in strip.getbands():
+                    degenerate.putalpha(strip.getchannel('A'))
+                strip = Image.blend(degenerate, strip, contrast)
+            return strip
+        
+        mean = 0
+        if contrast != 1.0:
+            histogram = [0] * 256
+            for _, strip in _iter_strips(img, rows):
+                for value, count in enumerate(brighten(strip).convert('L').histogram()):
+                    histogram[value] += count
+            mean = int(sum(value * count for value, count in enumerate(histogram)) / (width * height) + 0.5)
+        
+        output = Image.new('RGB', (width, height))
+        
+        def finish(top: int, strip: Image.Image, above: Optional[Image.Image], below: Optional[Image.Image]):
+            if sharpness != 1.0:
+                window = Image.new(strip.mode, (width, strip.height + (above is not None) + (below is not None)))
+                window.paste(strip, (0, 1 if above is not None else 0))
+                if above is not None:
+                    window.paste(above, (0, 0))
+                if below is not None:
+                    window.paste(below, (0, window.height - 1))
+                window = ImageEnhance.Sharpness(window).enhance(sharpness)
+                offset = 1 if above is not None else 0
+                strip = window.crop((0, offset, width, offset + strip.height))
+            output.paste(_flatten_to_rgb(strip), (0, top))
+        
+        # Each strip is finished once the next one is known, for its first row
+        previous = None
+        above = None
+        for top, strip in _iter_strips(img, rows):
+            strip = adjust(strip)
+            if previous is not None:
+                previous_top, previous_strip = previous
+                finish(previous_top, previous_strip, above, strip.crop((0, 0, width, 1)))
+                above = previous_strip.crop((0, previous_strip.height - 1, width, previous_strip.height))
+            previous = (top, strip)
+        if previous is not None:
+            finish(previous[0], previous[1], above, None)
+        return output
+    
+    def auto_orient_image(self, image_path: str) -> str:
         """Auto-orient image based on EXIF data"""
         try:
-            with Image.open(image_path) as img:
+            with _open_image(image_path) as img:
                 # Auto-orient based on EXIF data
                 oriented_img = ImageOps.exif_transpose(img)
                 
@@ -489,15 +1026,10 @@ class ImageService:
                     oriented_img = img
                 
                 # Convert to RGB if necessary (for JPEG output)
-                if oriented_img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', oriented_img.size, (255, 255, 255))
-                    background.paste(oriented_img, mask=oriented_img.split()[-1] if oriented_img.mode == 'RGBA' else None)
-                    oriented_img = background
-                elif oriented_img.mode != 'RGB':
-                    oriented_img = oriented_img.convert('RGB')
+                oriented_img = _flatten_to_rgb(oriented_img)
                 
                 # Generate output path
-                output_path = os.path.join(self.temp_dir, f"oriented_{uuid.uuid4().hex}.jpg")
+                output_path = artifact_store.path_for(f"oriented_{uuid.uuid4().hex}.jpg", os.path.getsize(image_path))
                 
                 # Save oriented image
                 oriented_img.save(output_path, 'JPEG', quality=95, optimize=True)
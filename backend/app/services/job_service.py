@@ -0,0 +1,416 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import asyncio
+import tempfile
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from app.services.executor_service import executor_service
+from app.services.artifact_service import artifact_store
+
+logger = logging.getLogger(__name__)
+
+# Job states. Queued and running jobs are picked up again after a restart.
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+# Progress is persisted at most this often per job, plus once at the end
+PROGRESS_WRITE_INTERVAL = 0.5
+
+# Handler signature: (input_paths, params, progress_callback) -> output_path
+JobHandler = Callable[[List[str], Dict[str, Any], Callable[[int, int], None]], str]
+
+
+class JobCancelledError(BaseException):
+    """Raised from the progress callback to stop a cancelled job
+
+    Derives from BaseException so the fallback chains in the services, which
+    catch Exception, do not swallow it and start another conversion method.
+    """
+
+
+class JobService:
+    """Persistent background jobs for long-running operations
+
+    Jobs are stored in SQLite next to their input and result files, so queued
+    and interrupted jobs are resumed when the worker restarts.
+
+    Configuration (environment variables):
+        TEALPDF_JOBS_DIR        where the job database and files live
+        TEALPDF_JOB_RESULT_TTL  seconds a finished job is kept (default 3600)
+    """
+
+    def __init__(self):
+        self.jobs_dir = os.environ.get("TEALPDF_JOBS_DIR", os.path.join(tempfile.gettempdir(), "tealpdf_jobs"))
+        self.result_ttl = int(os.environ.get("TEALPDF_JOB_RESULT_TTL", 3600))
+        self.maintenance_interval = 60
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.db_path = os.path.join(self.jobs_dir, "jobs.db")
+
+        # Identifies this worker process for this boot. A restarted container
+        # often reuses the old worker's pid, so the pid alone cannot tell
+        # whether a running job belongs to a live worker.
+        self.worker_token = uuid.uuid4().hex
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_requested = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _init_db(self):
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    operation TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    input_paths TEXT NOT NULL,
+                    result_path TEXT,
+                    result_filename TEXT,
+                    media_type TEXT,
+                    progress_current INTEGER NOT NULL DEFAULT 0,
+                    progress_total INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker_pid INTEGER,
+                    worker_token TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            if "worker_token" not in columns:
+                # Databases created before jobs recorded their worker's boot token
+                db.execute("ALTER TABLE jobs ADD COLUMN worker_token TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    def register_handler(self, operation: str, handler: JobHandler):
+        """Register the function that executes jobs of the given operation"""
+        self._handlers[operation] = handler
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    async def submit(self, operation: str, input_paths: List[str], params: Optional[Dict[str, Any]] = None,
+                     result_filename: str = "result", media_type: str = "application/octet-stream") -> Dict[str, Any]:
+        """Create a job from already saved input files and schedule it
+
+        The input files are moved into the job directory and owned by the job from then on.
+        """
+        if operation not in self._handlers:
+            raise ValueError(f"Unknown job operation: {operation}")
+
+        job_id = uuid.uuid4().hex
+        # Moving the inputs and SQLite calls block, keep them off the event loop
+        await asyncio.to_thread(self._create, job_id, operation, input_paths, params, result_filename, media_type)
+
+        logger.info(f"Submitted {operation} job {job_id}")
+        self._schedule(job_id)
+        return await asyncio.to_thread(self.get_job, job_id)
+
+    def _create(self, job_id: str, operation: str, input_paths: List[str], params: Optional[Dict[str, Any]],
+                result_filename: str, media_type: str):
+        """Move the inputs into the job directory and insert the queued job"""
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+
+        job_inputs = []
+        for index, path in enumerate(input_paths):
+            job_input = os.path.join(job_dir, f"input_{index}{os.path.splitext(path)[1]}")
+            shutil.move(path, job_input)
+            job_inputs.append(job_input)
+
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                """INSERT INTO jobs (id, operation, status, params, input_paths, result_filename,
+                                     media_type, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, operation, QUEUED, json.dumps(params or {}), json.dumps(job_inputs),
+                 result_filename, media_type, now, now)
+            )
+
+    def _schedule(self, job_id: str):
+        if job_id not in self._tasks:
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    def _claim(self, job_id: str) -> Optional[sqlite3.Row]:
+        """Atomically move a queued job to running, returns None if another worker has it"""
+        with self._connect() as db:
+            claimed = db.execute(
+                "UPDATE jobs SET status = ?, worker_pid = ?, worker_token = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, os.getpid(), self.worker_token, time.time(), job_id, QUEUED)
+            ).rowcount
+            if not claimed:
+                return None
+            return db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    async def _run(self, job_id: str):
+        try:
+            row = await asyncio.to_thread(self._claim, job_id)
+            if row is None:
+                return
+
+            handler = self._handlers.get(row["operation"])
+            if handler is None:
+                await asyncio.to_thread(self._finish, job_id, FAILED, error=f"No handler registered for {row['operation']}")
+                return
+
+            # Scratch files of the job live in its own workspace, removed when it ends
+            with artifact_store.workspace(job_id):
+                input_paths = json.loads(row["input_paths"])
+                params = json.loads(row["params"])
+                progress_callback = self._make_progress_callback(job_id)
+
+                try:
+                    output_path = await executor_service.run(
+                        f"job.{row['operation']}", handler, input_paths, params, progress_callback
+                    )
+                except JobCancelledError:
+                    logger.info(f"Job {job_id} cancelled while running")
+                    await asyncio.to_thread(self._finish, job_id, CANCELLED)
+                    return
+                except Exception as e:
+                    logger.error(f"Job {job_id} failed: {str(e)}")
+                    await asyncio.to_thread(self._finish, job_id, FAILED, error=str(e))
+                    return
+
+                result_path = os.path.join(self._job_dir(job_id), f"result{os.path.splitext(output_path)[1]}")
+                await asyncio.to_thread(shutil.move, output_path, result_path)
+                await asyncio.to_thread(self._finish, job_id, COMPLETED, result_path=result_path)
+                logger.info(f"Job {job_id} completed")
+
+        except Exception as e:
+            logger.error(f"Error running job {job_id}: {str(e)}")
+        finally:
+            self._tasks.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+
+    def _make_progress_callback(self, job_id: str) -> Callable[[int, int], None]:
+        """Build the callback the services call from their page loops (on a worker thread)"""
+        last_write = [0.0]
+
+        def progress_callback(current: int, total: int):
+            if job_id in self._cancel_requested:
+                raise JobCancelledError(job_id)
+
+            now = time.time()
+            if now - last_write[0] < PROGRESS_WRITE_INTERVAL and current < total:
+                return
+            last_write[0] = now
+
+            with self._connect() as db:
+                db.execute(
+                    "UPDATE jobs SET progress_current = ?, progress_total = ?, updated_at = ? WHERE id = ?",
+                    (current, total, now, job_id)
+                )
+                # Cancellation may have been requested through another worker process
+                row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row and row["cancel_requested"]:
+                raise JobCancelledError(job_id)
+
+        return progress_callback
+
+    def _finish(self, job_id: str, status: str, result_path: Optional[str] = None, error: Optional[str] = None):
+        now = time.time()
+        with self._connect() as db:
+            if status == COMPLETED:
+                db.execute(
+                    """UPDATE jobs SET status = ?, result_path = ?, progress_current = progress_total,
+                                       updated_at = ?, expires_at = ? WHERE id = ?""",
+                    (status, result_path, now, now + self.result_ttl, job_id)
+                )
+            else:
+                db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+                    (status, error, now, now + self.result_ttl, job_id)
+                )
+
+        # Inputs are no longer needed once the job has finished
+        job_dir = self._job_dir(job_id)
+        if os.path.isdir(job_dir):
+            for name in os.listdir(job_dir):
+                if name.startswith("input_"):
+                    self._remove(os.path.join(job_dir, name))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the public status of a job"""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        total = row["progress_total"]
+        current = row["progress_current"]
+        return {
+            "job_id": row["id"],
+            "operation": row["operation"],
+            "status": row["status"],
+            "progress": {
+                "current": current,
+                "total": total,
+                "percent": round(current / total * 100, 1) if total else (100.0 if row["status"] == COMPLETED else 0.0),
+            },
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "expires_at": row["expires_at"],
+        }
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the result file details of a completed job"""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["status"] != COMPLETED or not row["result_path"]:
+            return None
+        if not os.path.exists(row["result_path"]):
+            return None
+        return {
+            "path": row["result_path"],
+            "filename": row["result_filename"],
+            "media_type": row["media_type"],
+        }
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job, finished jobs are left untouched"""
+        with self._connect() as db:
+            requested = db.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (time.time(), job_id, QUEUED, RUNNING)
+            ).rowcount
+            # Jobs that have not started yet can be cancelled right away
+            cancelled_queued = db.execute(
+                "UPDATE jobs SET status = ? WHERE id = ? AND status = ?",
+                (CANCELLED, job_id, QUEUED)
+            ).rowcount
+
+        if cancelled_queued:
+            self._finish(job_id, CANCELLED)
+        elif requested and job_id in self._tasks:
+            # Running here, the progress callback stops it at its next update. Other
+            # worker processes see cancel_requested in the database instead
+            self._cancel_requested.add(job_id)
+
+        return self.get_job(job_id)
+
+    def _worker_alive(self, pid: Optional[int], token: Optional[str]) -> bool:
+        if not pid:
+            return False
+        if token == self.worker_token:
+            return True
+        if pid == os.getpid():
+            # Our pid, but recorded by a worker from an earlier boot
+            return False
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    async def resume_pending(self):
+        """Requeue jobs orphaned by a dead worker and schedule every queued job"""
+        for job_id in await asyncio.to_thread(self._requeue_orphans):
+            self._schedule(job_id)
+
+    def _requeue_orphans(self) -> List[str]:
+        """Move running jobs of stopped workers back to queued, returns the ids of all queued jobs"""
+        with self._connect() as db:
+            running = db.execute(
+                "SELECT id, worker_pid, worker_token FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for row in running:
+                if not self._worker_alive(row["worker_pid"], row["worker_token"]):
+                    logger.info(f"Requeueing job {row['id']} from stopped worker {row['worker_pid']}")
+                    db.execute(
+                        """UPDATE jobs SET status = ?, worker_pid = NULL, worker_token = NULL, updated_at = ?
+                           WHERE id = ? AND status = ?""",
+                        (QUEUED, time.time(), row["id"], RUNNING)
+                    )
+            queued = db.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [row["id"] for row in queued]
+
+    def expire_finished(self) -> int:
+        """Delete files of finished jobs past their expiry and drop old records"""
+        now = time.time()
+        with self._connect() as db:
+            expired = db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND expires_at IS NOT NULL AND expires_at < ?",
+                (COMPLETED, FAILED, CANCELLED, now)
+            ).fetchall()
+            for row in expired:
+                db.execute(
+                    "UPDATE jobs SET status = ?, result_path = NULL, updated_at = ? WHERE id = ?",
+                    (EXPIRED, now, row["id"])
+                )
+            # Keep expired records around for a while so clients get a clear answer
+            db.execute(
+                "DELETE FROM jobs WHERE status = ? AND updated_at < ?",
+                (EXPIRED, now - self.result_ttl)
+            )
+
+        for row in expired:
+            shutil.rmtree(self._job_dir(row["id"]), ignore_errors=True)
+
+        if expired:
+            logger.info(f"Expired {len(expired)} finished jobs")
+        return len(expired)
+
+    async def _maintenance_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.expire_finished)
+                await self.resume_pending()
+            except Exception as e:
+                logger.error(f"Job maintenance failed: {str(e)}")
+            await asyncio.sleep(self.maintenance_interval)
+
+    def start(self):
+        """Resume pending jobs and start periodic expiry (call from the running event loop)"""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self):
+        """Stop the maintenance loop, running jobs are resumed on the next start"""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Count jobs by status"""
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def _remove(self, path: str):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logger.error(f"Error removing job file {path}: {str(e)}")
+
+
+job_service = JobService()
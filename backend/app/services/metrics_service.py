@@ -0,0 +1,219 @@
+import os
+import time
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cached hits to multi-minute conversions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Output size divided by input size
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.25, 1.5, 2.0)
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> LabelValues:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered in the Prometheus text format
+
+    Metrics are declared once with a name, help text and type, then updated
+    with label values. Gauges whose values live elsewhere (queue depth, cache
+    size, ...) are read at scrape time through collectors.
+
+    Values recorded inside process pool workers stay in those processes, so
+    metrics are recorded by the routers, the executor and the thread pool
+    services, all of which run in the server process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._definitions: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {}
+        self._counters: Dict[str, Dict[LabelValues, float]] = {}
+        self._histograms: Dict[str, Dict[LabelValues, _Histogram]] = {}
+        self._collectors: List[Callable[[], Iterator[Tuple[str, str, str, Dict[str, object], float]]]] = []
+
+    def counter(self, name: str, help_text: str):
+        """Declare a counter"""
+        self._definitions[name] = ("counter", help_text, None)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """Declare a histogram"""
+        self._definitions[name] = ("histogram", help_text, tuple(sorted(buckets)))
+        self._histograms.setdefault(name, {})
+
+    def collector(self, collect: Callable[[], Iterator[Tuple[str, str, str, Dict[str, object], float]]]):
+        """Register a callable yielding (name, type, help, labels, value) samples at scrape time"""
+        self._collectors.append(collect)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increase a counter"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a histogram observation"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._definitions[name][2])
+            histogram.observe(value)
+
+    def record_files(self, operation: str, input_paths: List[str], output_path: Optional[str], ratio: bool = False):
+        """Count the bytes an operation read and wrote, optionally observing its compression ratio
+
+        output_path is None for streamed outputs, whose size is not known upfront.
+        """
+        try:
+            input_bytes = sum(os.path.getsize(path) for path in input_paths)
+            output_bytes = os.path.getsize(output_path) if output_path else None
+        except OSError:
+            return
+        self.inc("tealpdf_operation_input_bytes_total", input_bytes, operation=operation)
+        if output_bytes is None:
+            return
+        self.inc("tealpdf_operation_output_bytes_total", output_bytes, operation=operation)
+        if ratio and input_bytes:
+            self.observe("tealpdf_compression_ratio", output_bytes / input_bytes, operation=operation)
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of a block in a latency histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (metric_type, help_text, _) in self._definitions.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                if metric_type == "counter":
+                    for labels, value in self._counters[name].items():
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+
+                for labels, histogram in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        # Samples of one metric must be contiguous, collectors may interleave them
+        collected: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collect in self._collectors:
+            try:
+                for name, metric_type, help_text, labels, value in collect():
+                    samples = collected.setdefault(name, (metric_type, help_text, []))[2]
+                    samples.append(f"{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {str(e)}")
+
+        for name, (metric_type, help_text, samples) in collected.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Observes the latency of every HTTP request, labelled by route template
+    
+    A plain ASGI middleware, so streamed bodies are included in the latency.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope, unmatched paths
+            # are grouped so scanners cannot blow up the label cardinality
+            route = scope.get("route")
+            metrics.observe(
+                "tealpdf_http_request_duration_seconds",
+                time.perf_counter() - started,
+                route=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=status[0]
+            )
+
+
+# Shared by all services so a single scrape sees everything
+metrics = MetricsRegistry()
+
+metrics.histogram("tealpdf_http_request_duration_seconds", "HTTP request latency by route, method and status")
+metrics.histogram("tealpdf_operation_queue_seconds", "Time service calls wait for a free slot, by operation")
+metrics.histogram("tealpdf_operation_duration_seconds", "Service call run time by operation and outcome")
+metrics.counter("tealpdf_operation_input_bytes_total", "Bytes of input files processed by operation")
+metrics.counter("tealpdf_operation_output_bytes_total", "Bytes of output files produced by operation")
+metrics.histogram("tealpdf_compression_ratio", "Output size divided by input size of compressing operations", RATIO_BUCKETS)
+metrics.counter("tealpdf_compression_saved_bytes_total", "Bytes saved by PDF compression, by stage")
+metrics.counter("tealpdf_engine_selected_total", "Engine that produced the result, by operation")
+metrics.counter("tealpdf_word_engine_routed_total", "PDF to Word engine picked before conversion, by engine and reason")
+metrics.counter("tealpdf_batch_items_total", "Items processed by batch requests, by operation and outcome")
@@ -1,416 +1,774 @@
 import os
-import tempfile
+import copy
+import shutil
 import uuid
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 import logging
 from PyPDF2 import PdfReader, PdfWriter
 from pdf2docx import Converter
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from docx import Document
+from docx.enum.section import WD_SECTION
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part, XmlPart
+from docx.oxml.shape import CT_Inline
 import io
+import threading
+import concurrent.futures
+from collections import OrderedDict, deque
 import fitz  # PyMuPDF for advanced compression
-
-# Handle pdfplumber import with fallback
-try:
-    import pdfplumber
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
-    logging.warning("pdfplumber not available. Install it for better page counting.")
+from app.services.artifact_service import artifact_store
+from app.services.metrics_service import metrics
 
 logger = logging.getLogger(__name__)
 
+# Images inside PDFs being compressed are re-encoded in parallel. Pillow
+# releases the GIL while decoding and encoding, so threads use every core.
+_image_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 2,
+    thread_name_prefix="tealpdf-pdf-images"
+)
+
+# Page count probes kept in memory, keyed by content hash. Module level, so
+# PDFService instances stay picklable for the process pool.
+PROBE_CACHE_SIZE = 1024
+_probe_cache: "OrderedDict[str, dict]" = OrderedDict()
+_probe_cache_lock = threading.Lock()
+
+# Called with (completed_units, total_units) as long operations make progress.
+# Units are pages for conversion, distinct images for compression and input
+# files for merging.
+ProgressCallback = Callable[[int, int], None]
+
+# Pages rendered per split work unit. Each unit opens the source once, so
+# larger chunks parse less often while smaller ones spread better over workers.
+SPLIT_CHUNK_PAGES = 50
+
+
+class SplitPart(NamedTuple):
+    """One output document of a split: its name and 0-based source page indices"""
+    name: str
+    page_indices: List[int]
+
+
+def _chunk_parts(parts: List[SplitPart]) -> List[List[SplitPart]]:
+    """Group consecutive parts into work units of about SPLIT_CHUNK_PAGES pages"""
+    chunks, current, current_pages = [], [], 0
+    for part in parts:
+        if current and current_pages + len(part.page_indices) > SPLIT_CHUNK_PAGES:
+            chunks.append(current)
+            current, current_pages = [], 0
+        current.append(part)
+        current_pages += len(part.page_indices)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _render_split_parts(pdf_path: str, parts: List[SplitPart]) -> List[Tuple[str, bytes]]:
+    """Render split parts to PDF bytes from one parse of the source
+    
+    Module level so it can run in worker processes.
+    """
+    source = fitz.open(pdf_path)
+    try:
+        metadata = {key: value for key, value in (source.metadata or {}).items() if key not in ('format', 'encryption')}
+        rendered = []
+        for part in parts:
+            output = fitz.open()
+            try:
+                # insert_pdf copies only the objects reachable from the copied
+                # pages and grafts shared ones (fonts, images) once per output
+                for start, end in _page_runs(part.page_indices):
+                    output.insert_pdf(source, from_page=start, to_page=end, links=True, annots=True)
+                output.set_metadata(metadata)
+                rendered.append((f"{part.name}.pdf", output.tobytes(garbage=3, deflate=True)))
+            finally:
+                output.close()
+        return rendered
+    finally:
+        source.close()
+
+
+def _page_runs(page_indices: List[int]) -> List[Tuple[int, int]]:
+    """Collapse sorted page indices into inclusive (start, end) runs"""
+    runs = []
+    for index in page_indices:
+        if runs and index == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+
+class CompressProfile(NamedTuple):
+    """Image settings of a named PDF compression profile
+    
+    Images are downsampled to target_dpi at the largest size any page displays
+    them, once they exceed it by DOWNSAMPLE_THRESHOLD. Without a target_dpi
+    pixels are kept, without a jpeg_quality images are left untouched.
+    """
+    target_dpi: Optional[int]
+    jpeg_quality: Optional[int]
+    min_image_bytes: int
+
+
+COMPRESS_PROFILES: Dict[str, CompressProfile] = {
+    "screen": CompressProfile(72, 60, 4 * 1024),
+    "ebook": CompressProfile(150, 75, 8 * 1024),
+    "print": CompressProfile(300, 85, 10 * 1024),
+    # Lossless structural savings only
+    "archive": CompressProfile(None, None, 0),
+}
+DEFAULT_COMPRESS_PROFILE = "print"
+
+# Images only slightly above the target resolution are not worth a lossy resample
+DOWNSAMPLE_THRESHOLD = 1.5
+
+# Distinct images the dry-run estimator re-encodes. The largest are picked,
+# they dominate the output size.
+ESTIMATE_SAMPLE_IMAGES = 8
+
+
+class _ImageUse(NamedTuple):
+    """A distinct image of a document and where it is used"""
+    page_num: int  # first page using it, replacing an image needs one of its pages
+    smask: int
+    width: int
+    height: int
+    stored_size: int  # bytes of the stream as stored in the file
+    display: Optional[Tuple[float, float]]  # largest placement in inches, if any is known
+
+
+def _stored_length(doc: "fitz.Document", xref: int) -> int:
+    """Bytes of a stream as stored in the file, from its /Length without reading the stream"""
+    kind, value = doc.xref_get_key(xref, "Length")
+    try:
+        if kind == "int":
+            return int(value)
+        if kind == "xref":
+            return int(doc.xref_object(int(value.split()[0])).strip())
+    except ValueError:
+        pass
+    return len(doc.xref_stream_raw(xref) or b"")
+
+
+def _stream_bytes(doc: "fitz.Document") -> int:
+    """Stored bytes of a document's streams, object and xref streams aside (they hold structure)"""
+    total = 0
+    for xref in range(1, doc.xref_length()):
+        if doc.xref_is_stream(xref) and doc.xref_get_key(xref, "Type")[1] not in ("/ObjStm", "/XRef"):
+            total += _stored_length(doc, xref)
+    return total
+
+
+def _collect_images(doc: "fitz.Document", measure_display: bool = True) -> Tuple[int, Dict[int, _ImageUse]]:
+    """Count image references and collect each distinct image by xref
+
+    Placements are measured on every page unless measure_display is False,
+    which skips parsing the page contents; see _measure_display.
+    """
+    references = 0
+    images: Dict[int, _ImageUse] = {}
+    for page_num in range(len(doc)):
+        page = doc[page_num]
+        for img in page.get_images(full=True):
+            references += 1
+            if img[0] not in images:
+                images[img[0]] = _ImageUse(page_num, img[1], img[2], img[3], _stored_length(doc, img[0]), None)
+        if measure_display:
+            _measure_display(page, images)
+    return references, images
+
+
+def _measure_display(page: "fitz.Page", images: Dict[int, _ImageUse]):
+    """Record the placements of images on a page, keeping each image's largest"""
+    for info in page.get_image_info(xrefs=True):
+        use = images.get(info["xref"])
+        if use is None:
+            continue
+        bbox = fitz.Rect(info["bbox"])
+        display = (bbox.width / 72, bbox.height / 72)
+        if use.display is not None:
+            display = (max(display[0], use.display[0]), max(display[1], use.display[1]))
+        images[info["xref"]] = use._replace(display=display)
+
+
+def _downsample_size(use: _ImageUse, profile: CompressProfile) -> Optional[Tuple[int, int]]:
+    """Pixel size to downsample an image to under a profile, None to keep it"""
+    if profile.target_dpi is None or use.display is None or min(use.display) <= 0:
+        return None
+    effective_dpi = min(use.width / use.display[0], use.height / use.display[1])
+    if effective_dpi <= profile.target_dpi * DOWNSAMPLE_THRESHOLD:
+        return None
+    scale = profile.target_dpi / effective_dpi
+    return max(1, round(use.width * scale)), max(1, round(use.height * scale))
+
+
+# Pages per PDF-to-Word work unit. pdf2docx analyses layout page by page in
+# Python, so long documents convert their ranges in parallel processes.
+WORD_CHUNK_PAGES = 20
+
+_RELATIONSHIP_ATTRIBUTE_PREFIX = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# References into parts a document has only one of (footnotes, comments, numbering)
+_SHARED_WORD_PART_REFERENCES = ".//w:footnoteReference|.//w:endnoteReference|.//w:commentReference|.//w:numPr"
+
+
+# Pages sampled, spread over the document, to pick a PDF-to-Word engine.
+# Pages with less extractable text than WORD_MIN_TEXT_CHARS on average have
+# no layout worth analysing, and pages nearly covered by an image with at most
+# one font are scans with an OCR text layer; both go straight to PyMuPDF.
+WORD_ROUTE_SAMPLE_PAGES = 5
+WORD_MIN_TEXT_CHARS = 100
+WORD_SCAN_IMAGE_COVERAGE = 0.9
+
+
+class WordRoute(NamedTuple):
+    """Engine picked for a PDF-to-Word conversion, why, and the page count"""
+    engine: str  # "pdf2docx" or "pymupdf"
+    reason: str
+    page_count: int
+
+
+def _word_page_ranges(page_count: int) -> List[Tuple[int, int]]:
+    """Split pages into even (start, end) ranges of at most WORD_CHUNK_PAGES, end exclusive"""
+    range_count = -(-page_count // WORD_CHUNK_PAGES)
+    size = -(-page_count // range_count)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _convert_word_range(pdf_path: str, start: int, end: int, output_path: str) -> str:
+    """Convert pages [start, end) to a DOCX and return the engine that did it
+
+    A range pdf2docx fails on goes to the PyMuPDF path on its own. Module level
+    so it can run in worker processes.
+    """
+    try:
+        cv = Converter(pdf_path)
+        try:
+            cv.convert(output_path, start=start, end=end)
+        finally:
+            cv.close()
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
+            return "pdf2docx"
+        logger.warning(f"pdf2docx produced an empty file for pages {start + 1}-{end}, using PyMuPDF")
+    except Exception as e:
+        logger.warning(f"pdf2docx failed for pages {start + 1}-{end}: {str(e)}, using PyMuPDF")
+    PDFService()._pdf_to_word_with_pymupdf(pdf_path, output_path, pages=range(start, end))
+    return "pymupdf"
+
+
+def _merge_word_parts(part_paths: List[str], output_path: str):
+    """Concatenate DOCX files into one, each starting on a new page
+
+    Every part keeps its own page setup, headers and footers through a section
+    break, and the images, hyperlinks and other parts its body refers to are
+    re-related in the merged document. Parts after the first that refer to
+    notes, comments or numbering raise ValueError: those live in one shared
+    part per document, with ids that would clash.
+    """
+    merged = Document(part_paths[0])
+    body = merged.element.body
+    for part_path in part_paths[1:]:
+        part = Document(part_path)
+        # Closes the previous part's last section with its own page setup
+        merged.add_section(WD_SECTION.NEW_PAGE)
+        relationship_ids = {}
+        for element in part.element.body:
+            if element.tag == body.sectPr.tag:
+                continue
+            if element.xpath(_SHARED_WORD_PART_REFERENCES):
+                raise ValueError("Cannot merge a document part with notes, comments or numbering")
+            element = copy.deepcopy(element)
+            _relate_word_references(element, merged.part, part.part, relationship_ids)
+            body.sectPr.addprevious(element)
+        sectPr = copy.deepcopy(part.element.body.sectPr)
+        # Header and footer references
+        _relate_word_references(sectPr, merged.part, part.part, relationship_ids)
+        body.replace(body.sectPr, sectPr)
+    merged.save(output_path)
+
+
+def _relate_word_references(element, target, source, relationship_ids: Dict[str, str]):
+    """Point the relationship ids in a copy of one of source's elements at target's relationships"""
+    for node in element.iter():
+        for name, value in node.attrib.items():
+            if name.startswith(_RELATIONSHIP_ATTRIBUTE_PREFIX):
+                if value not in relationship_ids:
+                    relationship_ids[value] = _relate_word_part(target, source, value)
+                node.set(name, relationship_ids[value])
+
+
+def _relate_word_part(target, source, relationship_id: str) -> str:
+    """Re-create one of source's relationships in target and return its id there"""
+    relationship = source.rels[relationship_id]
+    if relationship.is_external:
+        return target.relate_to(relationship.target_ref, relationship.reltype, is_external=True)
+    related = relationship.target_part
+    if relationship.reltype == RT.IMAGE:
+        # Stored once however many parts use the same image
+        new_id, _ = target.get_or_add_image(io.BytesIO(related.blob))
+        return new_id
+
+    # Headers, footers, charts, ...: copied under the next free name of their kind
+    package = target.package
+    stem, ext = os.path.splitext(related.partname)
+    partname = package.next_partname(stem.rstrip("0123456789") + "%d" + ext)
+    if isinstance(related, XmlPart):
+        copied = type(related)(partname, related.content_type, copy.deepcopy(related.element), package)
+        _relate_word_references(copied.element, copied, related, {})
+    elif not related.rels:
+        copied = Part(partname, related.content_type, related.blob, package)
+    else:
+        raise ValueError(f"Cannot merge a document part related as {relationship.reltype}")
+    return target.relate_to(copied, relationship.reltype)
+
+
 class PDFService:
     """Service class for PDF operations"""
     
-    def __init__(self):
-        self.temp_dir = tempfile.gettempdir()
-    
-    async def merge_pdfs(self, pdf_paths: List[str]) -> str:
+    def merge_pdfs(self, pdf_paths: List[str], progress_callback: Optional[ProgressCallback] = None) -> str:
         """Merge multiple PDF files into one"""
+        # Generate output path
+        output_path = artifact_store.path_for(
+            f"merged_{uuid.uuid4().hex}.pdf",
+            sum(os.path.getsize(pdf_path) for pdf_path in pdf_paths)
+        )
+        
         try:
-            writer = PdfWriter()
-            
-            # Add all pages from all PDFs
-            for pdf_path in pdf_paths:
-                with open(pdf_path, 'rb') as file:
-                    reader = PdfReader(file)
-                    for page in reader.pages:
-                        writer.add_page(page)
-            
-            # Generate output path
-            output_path = os.path.join(self.temp_dir, f"merged_{uuid.uuid4().hex}.pdf")
-            
-            # Write merged PDF
-            with open(output_path, 'wb') as output_file:
-                writer.write(output_file)
-            
-            logger.info(f"Successfully merged {len(pdf_paths)} PDFs to {output_path}")
+            self._merge_with_pymupdf(pdf_paths, output_path, progress_callback)
+            logger.info(f"Successfully merged {len(pdf_paths)} PDFs to {output_path} with PyMuPDF")
+            return output_path
+        except Exception as e:
+            logger.warning(f"PyMuPDF merge failed: {str(e)}, falling back to PyPDF2")
+        
+        try:
+            self._merge_with_pypdf2(pdf_paths, output_path, progress_callback)
+            logger.info(f"Successfully merged {len(pdf_paths)} PDFs to {output_path} with PyPDF2")
             return output_path
             
         except Exception as e:
             logger.error(f"Error merging PDFs: {str(e)}")
             raise
     
-    async def get_page_count(self, pdf_path: str) -> int:
-        """Get the accurate page count of a PDF file using multiple methods for reliability"""
-        page_count = None
-        methods_tried = []
+    def _merge_with_pymupdf(self, pdf_paths: List[str], output_path: str, progress_callback: Optional[ProgressCallback] = None):
+        """Copy each input's object graph into the output, one input open at a time
         
-        # Method 1: PyPDF2 PdfReader
+        Inputs are closed as soon as their pages are copied, so only the output
+        and one source are held at once, both as compact MuPDF objects rather
+        than Python ones. Saving with garbage=4 merges identical objects, so a
+        font or image embedded in several inputs is stored once.
+        """
+        merged = fitz.open()
         try:
+            for index, pdf_path in enumerate(pdf_paths):
+                source = fitz.open(pdf_path)
+                try:
+                    if source.needs_pass:
+                        raise ValueError(f"{os.path.basename(pdf_path)} is encrypted")
+                    merged.insert_pdf(source)
+                finally:
+                    source.close()
+                
+                if progress_callback:
+                    progress_callback(index + 1, len(pdf_paths))
+            
+            merged.save(output_path, garbage=4, deflate=True)
+        finally:
+            merged.close()
+    
+    def _merge_with_pypdf2(self, pdf_paths: List[str], output_path: str, progress_callback: Optional[ProgressCallback] = None):
+        writer = PdfWriter()
+        
+        # Add all pages from all PDFs
+        for index, pdf_path in enumerate(pdf_paths):
             with open(pdf_path, 'rb') as file:
                 reader = PdfReader(file)
-                page_count = len(reader.pages)
-                methods_tried.append(f"PyPDF2: {page_count} pages")
-                logger.info(f"PyPDF2 page count: {page_count} pages")
-                
-                # Validate the result makes sense
-                if page_count > 0 and page_count < 10000:  # Reasonable bounds
-                    return page_count
-                    
-        except Exception as e:
-            methods_tried.append(f"PyPDF2 failed: {str(e)}")
-            logger.warning(f"PyPDF2 method failed: {str(e)}")
+                for page in reader.pages:
+                    writer.add_page(page)
+            
+            if progress_callback:
+                progress_callback(index + 1, len(pdf_paths))
         
-        # Method 2: Try with pdfplumber (already in requirements) if available
-        if PDFPLUMBER_AVAILABLE:
+        # Write merged PDF
+        with open(output_path, 'wb') as output_file:
+            writer.write(output_file)
+    
+    def get_page_count(self, pdf_path: str, content_hash: Optional[str] = None) -> int:
+        """Get the page count of a PDF file from its page tree, without loading any page"""
+        probe = self.probe_pdf(pdf_path, content_hash)
+        if probe["page_count"] is None:
+            logger.warning("Returning fallback page count of 1")
+            return 1
+        return probe["page_count"]
+    
+    def probe_pdf(self, pdf_path: str, content_hash: Optional[str] = None) -> dict:
+        """Read page count and document metadata from the trailer, xref and /Pages tree
+        
+        Only the cross-reference data, the catalog, the root of the page tree and
+        the info dictionary are parsed. Damaged files, whose xref PyPDF2 cannot
+        use, fall back once to PyMuPDF, which repairs the xref while opening.
+        Results are cached by content hash when one is given.
+        """
+        if content_hash:
+            with _probe_cache_lock:
+                cached = _probe_cache.get(content_hash)
+                if cached is not None:
+                    _probe_cache.move_to_end(content_hash)
+                    return dict(cached)
+        
+        try:
+            probe = self._probe_with_pypdf2(pdf_path)
+        except Exception as e:
+            logger.warning(f"PDF trailer probe failed ({str(e)}), falling back to PyMuPDF")
             try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    page_count = len(pdf.pages)
-                    methods_tried.append(f"pdfplumber: {page_count} pages")
-                    logger.info(f"pdfplumber page count: {page_count} pages")
-                    
-                    if page_count > 0 and page_count < 10000:
-                        return page_count
-                        
-            except Exception as e:
-                methods_tried.append(f"pdfplumber failed: {str(e)}")
-                logger.warning(f"pdfplumber method failed: {str(e)}")
-        else:
-            methods_tried.append("pdfplumber not available")
+                probe = self._probe_with_pymupdf(pdf_path)
+            except Exception as fallback_error:
+                logger.error(f"Could not read page count: {str(fallback_error)}")
+                # Not cached, the file could not be read at all
+                return {"page_count": None, "encrypted": False, "metadata": {}, "method": None}
         
-        # Method 3: Try with fitz (PyMuPDF) if available
+        logger.info(f"{probe['method']} page count: {probe['page_count']} pages")
+        
+        if content_hash:
+            with _probe_cache_lock:
+                _probe_cache[content_hash] = dict(probe)
+                while len(_probe_cache) > PROBE_CACHE_SIZE:
+                    _probe_cache.popitem(last=False)
+        
+        return probe
+    
+    def _probe_with_pypdf2(self, pdf_path: str) -> dict:
+        """Read /Root /Pages /Count directly instead of flattening the page tree"""
+        with open(pdf_path, 'rb') as file:
+            reader = PdfReader(file, strict=False)
+            page_count = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+            if page_count < 1:
+                raise ValueError(f"page tree reports {page_count} pages")
+            
+            metadata = {}
+            encrypted = reader.is_encrypted
+            if not encrypted:
+                info = reader.metadata or {}
+                for key in ('/Title', '/Author', '/Subject', '/Producer'):
+                    if info.get(key):
+                        metadata[key[1:].lower()] = str(info[key])
+            
+            return {"page_count": page_count, "encrypted": encrypted, "metadata": metadata, "method": "PyPDF2 trailer"}
+    
+    def _probe_with_pymupdf(self, pdf_path: str) -> dict:
+        doc = fitz.open(pdf_path)
         try:
-            import fitz  # PyMuPDF
-            doc = fitz.open(pdf_path)
             page_count = doc.page_count
+            if page_count < 1:
+                raise ValueError(f"document has {page_count} pages")
+            metadata = {
+                key: value for key, value in (doc.metadata or {}).items()
+                if key in ('title', 'author', 'subject', 'producer') and value
+            }
+            return {"page_count": page_count, "encrypted": doc.is_encrypted, "metadata": metadata, "method": "PyMuPDF"}
+        finally:
             doc.close()
-            methods_tried.append(f"PyMuPDF: {page_count} pages")
-            logger.info(f"PyMuPDF page count: {page_count} pages")
+    
+    def plan_split(self, pdf_path: str, pages: Optional[str] = None, split_page: Optional[int] = None) -> List[SplitPart]:
+        """Work out which output documents a split produces, without writing any
+        
+        With split_page the document is cut in two, with pages a single document
+        holding those pages is extracted, otherwise every page becomes its own
+        document. Invalid requests raise ValueError before any work is done.
+        """
+        probe = self.probe_pdf(pdf_path)
+        total_pages = probe["page_count"]
+        if total_pages is None:
+            raise ValueError("Could not read the PDF file")
+        
+        if split_page is not None:
+            # Validate split page number
+            if split_page < 1:
+                raise ValueError("Split page number must be a positive integer")
             
-            if page_count > 0 and page_count < 10000:
-                return page_count
-                
-        except ImportError:
-            methods_tried.append("PyMuPDF not available")
-            pass
-        except Exception as e:
-            methods_tried.append(f"PyMuPDF failed: {str(e)}")
-            logger.warning(f"PyMuPDF method failed: {str(e)}")
+            if split_page >= total_pages:
+                raise ValueError(f"Cannot split at page {split_page}. PDF only has {total_pages} pages. Please choose a page between 1 and {total_pages - 1}.")
+            
+            return [
+                SplitPart(f"part_1_pages_1-{split_page}", list(range(split_page))),
+                SplitPart(f"part_2_pages_{split_page+1}-{total_pages}", list(range(split_page, total_pages))),
+            ]
         
-        # Method 4: Parse PDF manually for page count
-        try:
-            with open(pdf_path, 'rb') as file:
-                content = file.read()
-                
-                # Try to find the /Count entry in the /Pages dictionary
-                import re
-                pages_pattern = r'/Type\s*/Pages[^}]*?/Count\s+(\d+)'
-                match = re.search(pages_pattern, content.decode('latin-1', errors='ignore'), re.IGNORECASE | re.DOTALL)
-                
-                if match:
-                    page_count = int(match.group(1))
-                    methods_tried.append(f"Manual parsing: {page_count} pages")
-                    logger.info(f"Manual parsing page count: {page_count} pages")
-                    
-                    if page_count > 0 and page_count < 10000:
-                        return page_count
-                
-                # Fallback: count individual page objects
-                page_objects = re.findall(r'/Type\s*/Page(?![s\w])', content.decode('latin-1', errors='ignore'), re.IGNORECASE)
-                if page_objects:
-                    page_count = len(page_objects)
-                    methods_tried.append(f"Page object count: {page_count} pages")
-                    logger.info(f"Page object counting: {page_count} pages")
-                    
-                    if page_count > 0 and page_count < 10000:
-                        return page_count
-                        
-        except Exception as e:
-            methods_tried.append(f"Manual parsing failed: {str(e)}")
-            logger.warning(f"Manual parsing failed: {str(e)}")
+        if pages:
+            # Parse page ranges (e.g., "1-3,5,7-9")
+            try:
+                page_numbers = self._parse_page_ranges(pages, total_pages)
+            except Exception as e:
+                logger.error(f"Error parsing page ranges '{pages}': {str(e)}")
+                # Fallback to extracting all pages
+                page_numbers = list(range(1, total_pages + 1))
+            
+            if not page_numbers:
+                raise ValueError("No valid pages were extracted. Please check your page range selection.")
+            
+            return [SplitPart("extracted_pages", [page_num - 1 for page_num in page_numbers])]
         
-        # Method 5: Try with different PyPDF2 approach
-        try:
-            from PyPDF2 import PdfFileReader
-            with open(pdf_path, 'rb') as file:
-                reader = PdfFileReader(file, strict=False)
-                page_count = reader.getNumPages()
-                methods_tried.append(f"PyPDF2 legacy: {page_count} pages")
-                logger.info(f"PyPDF2 legacy page count: {page_count} pages")
-                
-                if page_count > 0 and page_count < 10000:
-                    return page_count
-                    
-        except Exception as e:
-            methods_tried.append(f"PyPDF2 legacy failed: {str(e)}")
-            logger.warning(f"PyPDF2 legacy method failed: {str(e)}")
+        # Split into individual pages
+        return [SplitPart(f"page_{index + 1}", [index]) for index in range(total_pages)]
+    
+    def iter_split_parts(
+        self,
+        pdf_path: str,
+        parts: List[SplitPart],
+        submit: Optional[Callable[..., concurrent.futures.Future]] = None,
+        max_in_flight: int = 2
+    ) -> Iterator[Tuple[str, bytes]]:
+        """Yield (filename, PDF bytes) for each planned part, in order
         
-        # If all methods failed or returned unreasonable results
-        logger.error(f"All page counting methods failed or returned invalid results. Methods tried: {methods_tried}")
+        The source is parsed once per chunk of SPLIT_CHUNK_PAGES pages instead of
+        once per output, and each output only receives the objects its pages
+        reference, with resources shared between its pages stored once. Nothing
+        touches the disk. Given a submit function (e.g. executor_service.submit
+        bound to an operation), every chunk is rendered through it, which keeps
+        the work under the operation's concurrency limit and off the caller's
+        thread; up to max_in_flight chunks render in parallel and results are
+        still yielded in order.
+        """
+        chunks = _chunk_parts(parts)
         
-        # Return a minimal fallback
-        if page_count and page_count > 0:
-            logger.warning(f"Returning last valid count: {page_count}")
-            return page_count
+        if submit is None:
+            for chunk in chunks:
+                yield from _render_split_parts(pdf_path, chunk)
+            return
         
-        # Final fallback
-        logger.warning("Returning fallback page count of 1")
-        return 1
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(submit(_render_split_parts, pdf_path, chunk))
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # The consumer went away (e.g. the client disconnected)
+            for future in pending:
+                future.cancel()
     
-    async def split_at_page(self, pdf_path: str, split_page: int) -> List[str]:
+    def _write_split_parts(self, pdf_path: str, parts: List[SplitPart]) -> List[str]:
+        output_paths = []
+        for filename, data in self.iter_split_parts(pdf_path, parts):
+            base_name, ext = os.path.splitext(filename)
+            output_path = artifact_store.path_for(f"{base_name}_{uuid.uuid4().hex}{ext}", len(data))
+            with open(output_path, 'wb') as output_file:
+                output_file.write(data)
+            output_paths.append(output_path)
+        return output_paths
+    
+    def split_at_page(self, pdf_path: str, split_page: int) -> List[str]:
         """Split PDF into two parts at the specified page number with preserved formatting"""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PdfReader(file)
-                total_pages = len(reader.pages)
-                
-                # Validate split page number
-                if split_page is None or split_page < 1:
-                    raise ValueError("Split page number must be a positive integer")
-                
-                if split_page >= total_pages:
-                    raise ValueError(f"Cannot split at page {split_page}. PDF only has {total_pages} pages. Please choose a page between 1 and {total_pages - 1}.")
-                
-                output_paths = []
-                
-                # First part: pages 1 to split_page
-                if split_page > 0:
-                    writer1 = PdfWriter()
-                    
-                    for i in range(split_page):
-                        original_page = reader.pages[i]
-                        writer1.add_page(original_page)
-                    
-                    # Copy metadata if available
-                    if hasattr(reader, 'metadata') and reader.metadata:
-                        writer1.add_metadata(reader.metadata)
-                    
-                    output_path1 = os.path.join(
-                        self.temp_dir, 
-                        f"part_1_pages_1-{split_page}_{uuid.uuid4().hex}.pdf"
-                    )
-                    
-                    with open(output_path1, 'wb') as output_file:
-                        writer1.write(output_file)
-                    
-                    output_paths.append(output_path1)
-                    logger.info(f"Created part 1 (pages 1-{split_page}) with preserved formatting")
-                
-                # Second part: pages split_page+1 to end
-                if split_page < total_pages:
-                    writer2 = PdfWriter()
-                    
-                    for i in range(split_page, total_pages):
-                        original_page = reader.pages[i]
-                        writer2.add_page(original_page)
-                    
-                    # Copy metadata if available
-                    if hasattr(reader, 'metadata') and reader.metadata:
-                        writer2.add_metadata(reader.metadata)
-                    
-                    output_path2 = os.path.join(
-                        self.temp_dir, 
-                        f"part_2_pages_{split_page+1}-{total_pages}_{uuid.uuid4().hex}.pdf"
-                    )
-                    
-                    with open(output_path2, 'wb') as output_file:
-                        writer2.write(output_file)
-                    
-                    output_paths.append(output_path2)
-                    logger.info(f"Created part 2 (pages {split_page+1}-{total_pages}) with preserved formatting")
-                
-                logger.info(f"Successfully split PDF at page {split_page} into {len(output_paths)} parts with preserved formatting")
-                return output_paths
+            if split_page is None:
+                raise ValueError("Split page number must be a positive integer")
+            
+            output_paths = self._write_split_parts(pdf_path, self.plan_split(pdf_path, split_page=split_page))
+            
+            logger.info(f"Successfully split PDF at page {split_page} into {len(output_paths)} parts with preserved formatting")
+            return output_paths
                 
         except Exception as e:
             logger.error(f"Error splitting PDF at page {split_page}: {str(e)}")
             raise
     
-    async def split_pdf(self, pdf_path: str, pages: Optional[str] = None) -> List[str]:
+    def split_pdf(self, pdf_path: str, pages: Optional[str] = None) -> List[str]:
         """Split PDF into pages or extract specific pages with preserved formatting"""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PdfReader(file)
-                total_pages = len(reader.pages)
-                
-                if pages:
-                    # Parse page ranges (e.g., "1-3,5,7-9")
-                    try:
-                        page_numbers = self._parse_page_ranges(pages, total_pages)
-                    except Exception as e:
-                        logger.error(f"Error parsing page ranges '{pages}': {str(e)}")
-                        # Fallback to splitting all pages
-                        page_numbers = list(range(1, total_pages + 1))
-                else:
-                    # Split all pages
-                    page_numbers = list(range(1, total_pages + 1))
-                
-                output_paths = []
-                
-                if len(page_numbers) == total_pages and not pages:
-                    # Split into individual pages with preserved formatting
-                    for i, page_num in enumerate(page_numbers):
-                        writer = PdfWriter()
-                        
-                        # Copy the page with all its properties
-                        original_page = reader.pages[page_num - 1]
-                        
-                        # Preserve page properties and annotations
-                        writer.add_page(original_page)
-                        
-                        # Copy metadata if available
-                        if hasattr(reader, 'metadata') and reader.metadata:
-                            writer.add_metadata(reader.metadata)
-                        
-                        output_path = os.path.join(
-                            self.temp_dir, 
-                            f"page_{page_num}_{uuid.uuid4().hex}.pdf"
-                        )
-                        
-                        with open(output_path, 'wb') as output_file:
-                            writer.write(output_file)
-                        
-                        output_paths.append(output_path)
-                        
-                        logger.info(f"Created individual page {page_num} with preserved formatting")
-                else:
-                    # Extract specific pages into one file with preserved formatting
-                    writer = PdfWriter()
-                    
-                    for page_num in page_numbers:
-                        # Validate page number
-                        if page_num < 1 or page_num > total_pages:
-                            logger.warning(f"Skipping invalid page number {page_num} (PDF has {total_pages} pages)")
-                            continue
-                            
-                        original_page = reader.pages[page_num - 1]
-                        writer.add_page(original_page)
-                    
-                    # Copy metadata if available
-                    if hasattr(reader, 'metadata') and reader.metadata:
-                        writer.add_metadata(reader.metadata)
-                    
-                    output_path = os.path.join(
-                        self.temp_dir, 
-                        f"extracted_pages_{uuid.uuid4().hex}.pdf"
-                    )
-                    
-                    with open(output_path, 'wb') as output_file:
-                        writer.write(output_file)
-                    
-                    output_paths.append(output_path)
-                    
-                    logger.info(f"Created extracted pages file with preserved formatting")
-                
-                if not output_paths:
-                    raise ValueError("No valid pages were extracted. Please check your page range selection.")
-                
-                logger.info(f"Successfully split PDF into {len(output_paths)} files with preserved formatting")
-                return output_paths
+            output_paths = self._write_split_parts(pdf_path, self.plan_split(pdf_path, pages=pages))
+            
+            logger.info(f"Successfully split PDF into {len(output_paths)} files with preserved formatting")
+            return output_paths
                 
         except Exception as e:
             logger.error(f"Error splitting PDF: {str(e)}")
             raise
     
-    async def compress_pdf(self, pdf_path: str) -> str:
-        """Advanced PDF compression with multiple optimization techniques"""
+    def compress_pdf(self, pdf_path: str, progress_callback: Optional[ProgressCallback] = None,
+                     profile: str = DEFAULT_COMPRESS_PROFILE) -> str:
+        """Compress a PDF, see compress_pdf_with_report"""
+        return self.compress_pdf_with_report(pdf_path, progress_callback, profile)[0]
+    
+    def compress_pdf_with_report(self, pdf_path: str, progress_callback: Optional[ProgressCallback] = None,
+                                 profile: str = DEFAULT_COMPRESS_PROFILE) -> Tuple[str, dict]:
+        """Compress a PDF in a single pass and report the bytes each stage saved
+        
+        profile names one of COMPRESS_PROFILES and sets how far images are
+        downsampled and how they are re-encoded. The document is parsed once
+        and every object decides on its own whether an optimization pays off
+        (see _compress_with_pymupdf). PyPDF2 only runs when PyMuPDF cannot
+        process the file, and an output that would not be smaller is replaced
+        by the original bytes.
+        """
+        if profile not in COMPRESS_PROFILES:
+            raise ValueError(f"Compression profile must be one of: {', '.join(COMPRESS_PROFILES)}")
         try:
             # Get original file size for comparison
             original_size = os.path.getsize(pdf_path)
-            logger.info(f"Starting compression of PDF ({original_size} bytes)")
+            logger.info(f"Starting compression of PDF ({original_size} bytes, {profile} profile)")
             
-            # Try PyMuPDF compression first (most effective)
-            output_path = os.path.join(self.temp_dir, f"compressed_{uuid.uuid4().hex}.pdf")
+            output_path = artifact_store.path_for(f"compressed_{uuid.uuid4().hex}.pdf", original_size)
             
             try:
-                # Method 1: PyMuPDF advanced compression
-                compressed_path = await self._compress_with_pymupdf(pdf_path, output_path)
-                
-                compressed_size = os.path.getsize(compressed_path)
-                ratio = (1 - compressed_size / original_size) * 100
-                
-                # If compression achieved good results (>2% reduction), use it
-                if ratio > 2:
-                    logger.info(f"PyMuPDF compression successful: {ratio:.1f}% reduction (from {original_size} to {compressed_size} bytes)")
-                    return compressed_path
-                else:
-                    logger.info(f"PyMuPDF compression minimal ({ratio:.1f}%), trying enhanced PyPDF2 method")
-                    os.remove(compressed_path)  # Clean up
-                    
+                savings = self._compress_with_pymupdf(pdf_path, output_path, progress_callback, COMPRESS_PROFILES[profile])
+                engine = "pymupdf"
             except Exception as e:
                 logger.warning(f"PyMuPDF compression failed: {str(e)}, falling back to PyPDF2")
+                self._compress_with_pypdf2(pdf_path, output_path)
+                # PyPDF2 only compresses content streams
+                savings = {"streams": original_size - os.path.getsize(output_path)}
+                engine = "pypdf2"
             
-            try:
-                # Method 2: Enhanced PyPDF2 compression with optimization
-                compressed_path = await self._compress_with_pypdf2_enhanced(pdf_path, output_path)
-                
-                compressed_size = os.path.getsize(compressed_path)
-                ratio = (1 - compressed_size / original_size) * 100
-                
-                logger.info(f"Enhanced PyPDF2 compression completed: {ratio:.1f}% reduction (from {original_size} to {compressed_size} bytes)")
-                return compressed_path
-                
-            except Exception as e:
-                logger.warning(f"Enhanced PyPDF2 compression failed: {str(e)}, using basic compression")
-            
-            # Method 3: Basic PyPDF2 compression (fallback)
-            compressed_path = await self._compress_with_basic_pypdf2(pdf_path, output_path)
+            compressed_size = os.path.getsize(output_path)
+            if compressed_size >= original_size:
+                # Nothing to gain, deliver the original rather than a larger file
+                shutil.copyfile(pdf_path, output_path)
+                compressed_size = original_size
+                savings = {}
+                engine = "original"
             
-            compressed_size = os.path.getsize(compressed_path)
-            ratio = (1 - compressed_size / original_size) * 100
+            ratio = (1 - compressed_size / original_size) * 100 if original_size else 0.0
+            breakdown = ", ".join(f"{stage} {saved}" for stage, saved in savings.items())
+            logger.info(
+                f"Compression with {engine} saved {ratio:.1f}% "
+                f"(from {original_size} to {compressed_size} bytes; {breakdown or 'no savings'})"
+            )
+            metrics.inc("tealpdf_engine_selected_total", operation="pdf.compress", engine=engine)
+            for stage, saved in savings.items():
+                metrics.inc("tealpdf_compression_saved_bytes_total", saved, stage=stage)
             
-            logger.info(f"Basic PyPDF2 compression completed: {ratio:.1f}% reduction (from {original_size} to {compressed_size} bytes)")
-            return compressed_path
+            return output_path, {
+                "profile": profile,
+                "engine": engine,
+                "original_size": original_size,
+                "compressed_size": compressed_size,
+                "savings": savings,
+            }
             
         except Exception as e:
             logger.error(f"Error compressing PDF: {str(e)}")
             raise
     
-    async def _compress_with_basic_pypdf2(self, input_path: str, output_path: str) -> str:
-        """Basic PyPDF2 compression - guaranteed to work"""
+    def estimate_compression(self, pdf_path: str, profiles: Optional[List[str]] = None) -> dict:
+        """Estimate the compressed size under each profile without writing anything
+        
+        The ESTIMATE_SAMPLE_IMAGES largest images a profile would recompress are
+        re-encoded as compress_pdf would, and the ratio they reach is applied to
+        the other images it would recompress. Image sizes come from the stream
+        dictionaries and placements are only measured on the pages the sampled
+        images first appear on, so nothing else is decoded. Bytes outside
+        images are counted as unchanged, so the streams and structure stages of
+        compress_pdf come on top of the estimate.
+        """
+        profiles = profiles or list(COMPRESS_PROFILES)
+        for profile in profiles:
+            if profile not in COMPRESS_PROFILES:
+                raise ValueError(f"Compression profile must be one of: {', '.join(COMPRESS_PROFILES)}")
+        
         try:
-            with open(input_path, 'rb') as file:
-                reader = PdfReader(file)
-                writer = PdfWriter()
-                
-                # Copy metadata
-                if hasattr(reader, 'metadata') and reader.metadata:
-                    writer.add_metadata(reader.metadata)
-                
-                # Process each page with basic compression
-                for page in reader.pages:
-                    # Apply content stream compression
-                    page.compress_content_streams()
-                    writer.add_page(page)
-                
-                # Write the compressed PDF
-                with open(output_path, 'wb') as output_file:
-                    writer.write(output_file)
+            original_size = os.path.getsize(pdf_path)
+            doc = fitz.open(pdf_path)
+            try:
+                _, images = _collect_images(doc, measure_display=False)
+                eligible_by_profile = {}
+                for name in profiles:
+                    profile = COMPRESS_PROFILES[name]
+                    eligible_by_profile[name] = []
+                    if profile.jpeg_quality is not None:
+                        eligible_by_profile[name] = sorted(
+                            (xref for xref, use in images.items()
+                             if not use.smask and use.stored_size > profile.min_image_bytes),
+                            key=lambda xref: images[xref].stored_size,
+                            reverse=True
+                        )
                 
-                return output_path
+                # Placements decide downsampling, measure them where the sampled images are
+                sample_pages = {
+                    images[xref].page_num
+                    for eligible in eligible_by_profile.values()
+                    for xref in eligible[:ESTIMATE_SAMPLE_IMAGES]
+                }
+                for page_num in sorted(sample_pages):
+                    _measure_display(doc[page_num], images)
                 
+                extracted = {}
+                estimates = {}
+                for name in profiles:
+                    profile = COMPRESS_PROFILES[name]
+                    eligible = eligible_by_profile[name]
+                    sample = eligible[:ESTIMATE_SAMPLE_IMAGES]
+                    
+                    futures = {}
+                    for xref in sample:
+                        if xref not in extracted:
+                            try:
+                                extracted[xref] = doc.extract_image(xref)
+                            except Exception as img_error:
+                                logger.debug(f"Could not extract image xref {xref}: {str(img_error)}")
+                                extracted[xref] = None
+                        if extracted[xref] is not None:
+                            futures[xref] = _image_pool.submit(
+                                self._recompress_image_bytes, extracted[xref]["image"], extracted[xref]["ext"],
+                                _downsample_size(images[xref], profile), profile.jpeg_quality
+                            )
+                    
+                    sample_before, sample_after = 0, 0
+                    for xref in sample:
+                        sample_before += images[xref].stored_size
+                        try:
+                            compressed_bytes = futures[xref].result() if xref in futures else None
+                        except Exception as img_error:
+                            logger.debug(f"Could not compress image xref {xref}: {str(img_error)}")
+                            compressed_bytes = None
+                        if compressed_bytes is not None and len(compressed_bytes) < images[xref].stored_size:
+                            sample_after += len(compressed_bytes)
+                        else:
+                            sample_after += images[xref].stored_size
+                    
+                    eligible_bytes = sum(images[xref].stored_size for xref in eligible)
+                    ratio = sample_after / sample_before if sample_before else 1.0
+                    estimated_size = original_size - round(eligible_bytes * (1 - ratio))
+                    estimates[name] = {
+                        "estimated_size": estimated_size,
+                        "estimated_reduction_percent": round((1 - estimated_size / original_size) * 100, 1) if original_size else 0.0,
+                        "images_eligible": len(eligible),
+                        "images_sampled": len(sample),
+                    }
+            finally:
+                doc.close()
+            
+            return {
+                "original_size": original_size,
+                "images": len(images),
+                "default_profile": DEFAULT_COMPRESS_PROFILE,
+                "profiles": estimates,
+            }
+        
         except Exception as e:
-            logger.error(f"Basic PyPDF2 compression failed: {str(e)}")
+            logger.error(f"Error estimating PDF compression: {str(e)}")
             raise
     
-    async def _compress_with_pymupdf(self, input_path: str, output_path: str) -> str:
-        """Compress PDF using PyMuPDF with advanced optimization"""
+    def _compress_with_pymupdf(self, input_path: str, output_path: str,
+                               progress_callback: Optional[ProgressCallback] = None,
+                               profile: CompressProfile = COMPRESS_PROFILES[DEFAULT_COMPRESS_PROFILE]) -> Dict[str, int]:
+        """Compress PDF using PyMuPDF from one parse, returns the bytes saved by stage
+        
+        images: lossy recompression of the images the profile targets
+        streams: other stream data deflated or dropped as unused
+        structure: everything outside streams (objects, object streams, xref)
+        
+        Stages are measured from the stored stream lengths of the input and the
+        output, images within the stream savings; one that cost bytes reports 0.
+        """
         try:
             # Open the PDF
             doc = fitz.open(input_path)
+            streams_before = _stream_bytes(doc)
             
             # Apply compression settings compatible with PyMuPDF version
             compression_options = {
@@ -419,6 +777,7 @@ class PDFService:
                 "deflate": True,     # Use deflate compression
                 "deflate_images": True,  # Compress images
                 "deflate_fonts": True,   # Compress fonts
+                "use_objstms": True,  # Pack non-stream objects into compressed object streams
                 "ascii": False,      # Don't force ASCII encoding (saves space)
                 "linear": False,     # Don't linearize (saves space)
                 "pretty": False,     # Don't pretty-print (saves space)
@@ -426,81 +785,165 @@ class PDFService:
                 "permissions": -1,   # All permissions
             }
             
-            # Additional image compression for each page
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Get all images on the page
-                image_list = page.get_images(full=True)
+            try:
+                # Recompress every distinct image once, however many pages use it
+                image_stats = self._recompress_images(doc, profile, progress_callback)
+                logger.info(
+                    f"Recompressed {image_stats['recompressed']} of {image_stats['unique_images']} distinct images "
+                    f"({image_stats['image_references']} references on {image_stats['pages']} pages), "
+                    f"saved {image_stats['bytes_saved']} bytes"
+                )
                 
-                for img_index, img in enumerate(image_list):
-                    try:
-                        # Extract image
-                        xref = img[0]
-                        base_image = doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        image_ext = base_image["ext"]
-                        
-                        # Only compress if it's a reasonably large image
-                        if len(image_bytes) > 10000:  # 10KB threshold
-                            # Compress image using Pillow
-                            from PIL import Image
-                            import io
-                            
-                            # Open image
-                            image = Image.open(io.BytesIO(image_bytes))
-                            
-                            # Resize if too large (max 1920x1920 for document quality)
-                            max_size = 1920
-                            if image.width > max_size or image.height > max_size:
-                                try:
-                                    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                                except AttributeError:
-                                    # Fallback for older Pillow versions
-                                    image.thumbnail((max_size, max_size), Image.LANCZOS)
-                            
-                            # Compress and save
-                            output_buffer = io.BytesIO()
-                            if image_ext.lower() in ['jpg', 'jpeg']:
-                                image.save(output_buffer, format='JPEG', quality=85, optimize=True)
-                            elif image_ext.lower() == 'png':
-                                # Convert PNG to JPEG if it doesn't need transparency
-                                if image.mode in ('RGBA', 'LA'):
-                                    # Keep as PNG but optimize
-                                    image.save(output_buffer, format='PNG', optimize=True)
-                                else:
-                                    # Convert to JPEG for better compression
-                                    if image.mode != 'RGB':
-                                        image = image.convert('RGB')
-                                    image.save(output_buffer, format='JPEG', quality=85, optimize=True)
-                            else:
-                                # For other formats, try to convert to JPEG
-                                if image.mode != 'RGB':
-                                    image = image.convert('RGB')
-                                image.save(output_buffer, format='JPEG', quality=85, optimize=True)
-                            
-                            # Replace image in PDF if compression was effective
-                            compressed_bytes = output_buffer.getvalue()
-                            if len(compressed_bytes) < len(image_bytes) * 0.9:  # At least 10% reduction
-                                doc.update_stream(xref, compressed_bytes)
-                                logger.debug(f"Compressed image {img_index} on page {page_num}: {len(image_bytes)} -> {len(compressed_bytes)} bytes")
-                            
-                    except Exception as img_error:
-                        logger.debug(f"Could not compress image {img_index} on page {page_num}: {str(img_error)}")
-                        continue
+                # Save with compression options (removed incompatible options)
+                doc.save(output_path, **compression_options)
+            finally:
+                doc.close()
             
-            # Save with compression options (removed incompatible options)
-            doc.save(output_path, **compression_options)
-            doc.close()
+            output = fitz.open(output_path)
+            try:
+                streams_after = _stream_bytes(output)
+            finally:
+                output.close()
             
-            return output_path
+            total_saved = os.path.getsize(input_path) - os.path.getsize(output_path)
+            streams_saved = max(0, streams_before - streams_after)
+            # Saving re-deflates the new images, so they can end up a little off what replacing them saved
+            images_saved = min(max(0, image_stats["bytes_saved"]), streams_saved)
+            return {
+                "images": images_saved,
+                "streams": streams_saved - images_saved,
+                "structure": max(0, total_saved - (streams_before - streams_after)),
+            }
             
         except Exception as e:
             logger.error(f"PyMuPDF compression failed: {str(e)}")
             raise
     
-    async def _compress_with_pypdf2_enhanced(self, input_path: str, output_path: str) -> str:
-        """Enhanced PyPDF2 compression with optimization"""
+    def _recompress_images(self, doc: "fitz.Document", profile: CompressProfile,
+                           progress_callback: Optional[ProgressCallback] = None) -> dict:
+        """Recompress each distinct image of an open document once
+        
+        Images are collected by xref across all pages, so a logo used on every
+        page is decoded and re-encoded a single time, at the resolution its
+        largest placement needs under the profile. Extraction and replacement
+        touch the document and stay on this thread, the Pillow work runs on the
+        image pool with a bounded number of images in flight.
+        """
+        references, images = _collect_images(doc)
+        stats = {
+            "pages": len(doc),
+            "image_references": references,
+            "unique_images": len(images),
+            "recompressed": 0,
+            "bytes_saved": 0,
+        }
+        if profile.jpeg_quality is None:
+            return stats
+        
+        max_in_flight = 2 * (os.cpu_count() or 2)
+        in_flight = {}
+        processed = 0
+        
+        def apply_result(future):
+            nonlocal processed
+            xref = in_flight.pop(future)
+            use = images[xref]
+            try:
+                compressed_bytes = future.result()
+                # Judged against the stream as stored, which may be smaller than the extracted image
+                if compressed_bytes is not None and len(compressed_bytes) < use.stored_size:
+                    doc[use.page_num].replace_image(xref, stream=compressed_bytes)
+                    stored_size = len(doc.xref_stream_raw(xref))
+                    stats["recompressed"] += 1
+                    stats["bytes_saved"] += use.stored_size - stored_size
+                    logger.debug(f"Compressed image xref {xref}: {use.stored_size} -> {stored_size} bytes")
+            except Exception as img_error:
+                logger.debug(f"Could not compress image xref {xref}: {str(img_error)}")
+            
+            processed += 1
+            if progress_callback:
+                progress_callback(processed, len(images))
+        
+        for xref, use in images.items():
+            try:
+                base_image = self._extract_compressible_image(doc, xref, use, profile)
+            except Exception as img_error:
+                logger.debug(f"Skipping image xref {xref} on page {use.page_num}: {str(img_error)}")
+                processed += 1
+                if progress_callback:
+                    progress_callback(processed, len(images))
+                continue
+            
+            future = _image_pool.submit(
+                self._recompress_image_bytes, base_image["image"], base_image["ext"],
+                _downsample_size(use, profile), profile.jpeg_quality
+            )
+            in_flight[future] = xref
+            
+            # Keep memory bounded: wait for a slot before extracting more images
+            if len(in_flight) >= max_in_flight:
+                finished, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for finished_future in finished:
+                    apply_result(finished_future)
+        
+        for finished_future in concurrent.futures.as_completed(list(in_flight)):
+            apply_result(finished_future)
+        
+        return stats
+    
+    @staticmethod
+    def _extract_compressible_image(doc: "fitz.Document", xref: int, use: _ImageUse, profile: CompressProfile) -> dict:
+        """Extract an image the profile would recompress, raises ValueError for images it skips"""
+        # The soft mask lives in the original image object and would be
+        # lost on replacement, so transparent images are left alone
+        if use.smask:
+            raise ValueError("image has a soft mask")
+        
+        # Only compress if it's a reasonably large image
+        if use.stored_size <= profile.min_image_bytes:
+            raise ValueError("image is too small to be worth compressing")
+        return doc.extract_image(xref)
+    
+    @staticmethod
+    def _recompress_image_bytes(image_bytes: bytes, image_ext: str, target_size: Optional[Tuple[int, int]],
+                                quality: int) -> Optional[bytes]:
+        """Downscale and re-encode one image, returns None unless it shrinks by at least 10%"""
+        from PIL import Image
+        
+        # Open image
+        image = Image.open(io.BytesIO(image_bytes))
+        
+        # Downsample to the profile's resolution at the image's display size
+        if target_size is not None:
+            try:
+                image.thumbnail(target_size, Image.Resampling.LANCZOS)
+            except AttributeError:
+                # Fallback for older Pillow versions
+                image.thumbnail(target_size, Image.LANCZOS)
+        
+        # Compress and save
+        output_buffer = io.BytesIO()
+        if image_ext.lower() in ['jpg', 'jpeg']:
+            if image.mode not in ('RGB', 'L', 'CMYK'):
+                image = image.convert('RGB')
+            image.save(output_buffer, format='JPEG', quality=quality, optimize=True)
+        elif image_ext.lower() == 'png' and image.mode in ('RGBA', 'LA'):
+            # Keep as PNG but optimize
+            image.save(output_buffer, format='PNG', optimize=True)
+        else:
+            # Convert to JPEG for better compression
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.save(output_buffer, format='JPEG', quality=quality, optimize=True)
+        
+        # Replace image in PDF if compression was effective
+        compressed_bytes = output_buffer.getvalue()
+        if len(compressed_bytes) < len(image_bytes) * 0.9:  # At least 10% reduction
+            return compressed_bytes
+        return None
+    
+    def _compress_with_pypdf2(self, input_path: str, output_path: str) -> str:
+        """Lossless PyPDF2 compression for files PyMuPDF cannot process"""
         try:
             with open(input_path, 'rb') as file:
                 reader = PdfReader(file)
@@ -510,17 +953,12 @@ class PDFService:
                 if hasattr(reader, 'metadata') and reader.metadata:
                     writer.add_metadata(reader.metadata)
                 
-                # Process each page with compression
+                # Process each page with basic compression
                 for page in reader.pages:
                     # Apply content stream compression
                     page.compress_content_streams()
-                    
-                    # Add the page to writer
                     writer.add_page(page)
                 
-                # Note: compress_identical_objects() is not available in all PyPDF2 versions
-                # The compression is already applied through page.compress_content_streams()
-                
                 # Write the compressed PDF
                 with open(output_path, 'wb') as output_file:
                     writer.write(output_file)
@@ -528,55 +966,188 @@ class PDFService:
                 return output_path
                 
         except Exception as e:
-            logger.error(f"Enhanced PyPDF2 compression failed: {str(e)}")
+            logger.error(f"PyPDF2 compression failed: {str(e)}")
             raise
     
-    async def pdf_to_word(self, pdf_path: str) -> str:
-        """Convert PDF to Word document with multiple methods"""
+    def pdf_to_word(
+        self,
+        pdf_path: str,
+        progress_callback: Optional[ProgressCallback] = None,
+        submit: Optional[Callable[..., concurrent.futures.Future]] = None
+    ) -> str:
+        """Convert PDF to Word document with multiple methods
+        
+        A sample of pages decides up front whether pdf2docx is worth running
+        (see _route_pdf_to_word). Given submit (e.g. executor_service.submit
+        bound to an operation), pdf2docx documents longer than WORD_CHUNK_PAGES
+        are converted range by range in parallel and the partial documents
+        merged; see _pdf_to_word_in_ranges.
+        """
         try:
             # Get original file size for logging
             original_size = os.path.getsize(pdf_path)
             logger.info(f"Starting PDF to Word conversion ({original_size} bytes)")
             
             # Generate output path
-            output_path = os.path.join(self.temp_dir, f"converted_{uuid.uuid4().hex}.docx")
+            output_path = artifact_store.path_for(f"converted_{uuid.uuid4().hex}.docx", original_size)
             
-            # Method 1: Try pdf2docx (most accurate for complex documents)
-            try:
-                cv = Converter(pdf_path)
-                # Convert without specifying end parameter to avoid None issues
-                cv.convert(output_path, start=0)
-                cv.close()
+            route = self._route_pdf_to_word(pdf_path)
+            metrics.inc("tealpdf_word_engine_routed_total", engine=route.engine, reason=route.reason)
+            logger.info(f"Routing PDF to Word conversion to {route.engine} ({route.reason})")
+            
+            if route.engine == "pdf2docx":
+                if submit is not None and route.page_count > WORD_CHUNK_PAGES:
+                    try:
+                        return self._pdf_to_word_in_ranges(pdf_path, route.page_count, output_path, submit, progress_callback)
+                    except Exception as e:
+                        logger.warning(f"Parallel PDF to Word conversion failed: {str(e)}, converting the whole document")
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+            
+                # Method 1: Try pdf2docx (most accurate for complex documents)
+                try:
+                    cv = Converter(pdf_path)
+                    page_count = route.page_count
+                    # pdf2docx has no per-page hook, so report the start and the end
+                    if progress_callback:
+                        progress_callback(0, page_count)
+                
+                    # Convert without specifying end parameter to avoid None issues
+                    cv.convert(output_path, start=0)
+                    cv.close()
                 
-                # Verify the output file was created and has content
-                if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-                    logger.info(f"Successfully converted PDF to Word using pdf2docx: {output_path}")
-                    return output_path
-                else:
-                    logger.warning("pdf2docx conversion produced empty or invalid file, trying fallback")
+                    if progress_callback:
+                        progress_callback(page_count, page_count)
+                
+                    # Verify the output file was created and has content
+                    if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
+                        logger.info(f"Successfully converted PDF to Word using pdf2docx: {output_path}")
+                        metrics.inc("tealpdf_engine_selected_total", operation="pdf.to_word", engine="pdf2docx")
+                        return output_path
+                    else:
+                        logger.warning("pdf2docx conversion produced empty or invalid file, trying fallback")
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+                    
+                except Exception as e:
+                    logger.warning(f"pdf2docx conversion failed: {str(e)}, trying fallback methods")
                     if os.path.exists(output_path):
                         os.remove(output_path)
-                    
-            except Exception as e:
-                logger.warning(f"pdf2docx conversion failed: {str(e)}, trying fallback methods")
-                if os.path.exists(output_path):
-                    os.remove(output_path)
             
             # Method 2: Try PyMuPDF + python-docx (better text extraction)
             try:
-                return await self._pdf_to_word_with_pymupdf(pdf_path, output_path)
+                output_path = self._pdf_to_word_with_pymupdf(pdf_path, output_path, progress_callback)
+                metrics.inc("tealpdf_engine_selected_total", operation="pdf.to_word", engine="pymupdf")
+                return output_path
             except Exception as e:
                 logger.warning(f"PyMuPDF conversion failed: {str(e)}, using basic fallback")
             
             # Method 3: Basic fallback with PyPDF2
-            return await self._pdf_to_word_fallback(pdf_path)
+            output_path = self._pdf_to_word_fallback(pdf_path)
+            metrics.inc("tealpdf_engine_selected_total", operation="pdf.to_word", engine="pypdf2")
+            return output_path
             
         except Exception as e:
             logger.error(f"Error converting PDF to Word: {str(e)}")
             raise
     
-    async def _pdf_to_word_with_pymupdf(self, pdf_path: str, output_path: str) -> str:
-        """Convert PDF to Word using PyMuPDF for better text extraction"""
+    def _route_pdf_to_word(self, pdf_path: str) -> WordRoute:
+        """Pick the PDF-to-Word engine from a sample of pages
+        
+        pdf2docx's layout analysis only pays off for documents with a real text
+        layer. Text density, image coverage and font count come from the page
+        contents and image placements PyMuPDF reads anyway; no page is rendered.
+        """
+        try:
+            doc = fitz.open(pdf_path)
+            try:
+                page_count = len(doc)
+                if page_count == 0:
+                    return WordRoute("pymupdf", "no_pages", 0)
+                step = max(1, page_count // WORD_ROUTE_SAMPLE_PAGES)
+                sample = range(0, page_count, step)[:WORD_ROUTE_SAMPLE_PAGES]
+                
+                text_chars, image_coverage, fonts = 0, 0.0, set()
+                for page_num in sample:
+                    page = doc[page_num]
+                    text_chars += len(page.get_text("text").strip())
+                    fonts.update(font[3] for font in page.get_fonts())
+                    page_area = abs(page.rect) or 1
+                    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+                    image_coverage += min(1.0, covered / page_area)
+                text_chars /= len(sample)
+                image_coverage /= len(sample)
+            finally:
+                doc.close()
+        except Exception as e:
+            logger.warning(f"PDF to Word routing failed: {str(e)}, using pdf2docx")
+            return WordRoute("pdf2docx", "probe_failed", self.get_page_count(pdf_path))
+        
+        logger.debug(
+            f"PDF to Word sample: {text_chars:.0f} chars/page, "
+            f"{image_coverage:.0%} image coverage, {len(fonts)} fonts"
+        )
+        if text_chars < WORD_MIN_TEXT_CHARS:
+            return WordRoute("pymupdf", "image_only" if image_coverage > 0 else "no_text", page_count)
+        if image_coverage >= WORD_SCAN_IMAGE_COVERAGE and len(fonts) <= 1:
+            return WordRoute("pymupdf", "scanned", page_count)
+        return WordRoute("pdf2docx", "text_layout", page_count)
+    
+    def _pdf_to_word_in_ranges(
+        self,
+        pdf_path: str,
+        page_count: int,
+        output_path: str,
+        submit: Callable[..., concurrent.futures.Future],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> str:
+        """Convert page ranges as parallel work units and merge them in page order
+        
+        Each range falls back to PyMuPDF on its own, so a late pdf2docx failure
+        only costs that range. Progress is reported as ranges complete.
+        """
+        ranges = _word_page_ranges(page_count)
+        part_size = os.path.getsize(pdf_path) // len(ranges)
+        part_paths = [artifact_store.path_for(f"converted_part_{uuid.uuid4().hex}.docx", part_size) for _ in ranges]
+        futures = {}
+        try:
+            for (start, end), part_path in zip(ranges, part_paths):
+                futures[submit(_convert_word_range, pdf_path, start, end, part_path)] = end - start
+            
+            if progress_callback:
+                progress_callback(0, page_count)
+            completed_pages = 0
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                completed_pages += futures[future]
+                if progress_callback:
+                    progress_callback(completed_pages, page_count)
+            
+            _merge_word_parts(part_paths, output_path)
+        finally:
+            for future in futures:
+                future.cancel()
+            # Ranges already running still write their part
+            concurrent.futures.wait(futures)
+            artifact_store.release(*part_paths)
+        
+        engines = [future.result() for future in futures]
+        logger.info(
+            f"Converted PDF to Word in {len(ranges)} page ranges "
+            f"({engines.count('pymupdf')} via PyMuPDF): {output_path}"
+        )
+        engine = "+".join(sorted(set(engines)))
+        metrics.inc("tealpdf_engine_selected_total", operation="pdf.to_word", engine=engine)
+        return output_path
+    
+    def _pdf_to_word_with_pymupdf(self, pdf_path: str, output_path: str,
+                                  progress_callback: Optional[ProgressCallback] = None,
+                                  pages: Optional[range] = None) -> str:
+        """Convert PDF to Word using PyMuPDF for better text extraction
+        
+        pages limits the conversion to a range of 0-based page indices; only the
+        range starting at the first page gets the document title.
+        """
         try:
             import fitz  # PyMuPDF
             from docx import Document
@@ -585,12 +1156,20 @@ class PDFService:
             # Open PDF with PyMuPDF
             doc_pdf = fitz.open(pdf_path)
             
+            if pages is None:
+                pages = range(len(doc_pdf))
+            
             # Create Word document
             doc_word = Document()
-            doc_word.add_heading('Converted from PDF', 0)
+            if pages.start == 0:
+                doc_word.add_heading('Converted from PDF', 0)
+            
+            # (rId, image) of the embedded image part by xref, None for images that
+            # could not be extracted or added; the bytes are not kept around
+            image_memo = {}
             
             # Process each page
-            for page_num in range(len(doc_pdf)):
+            for page_index, page_num in enumerate(pages):
                 page = doc_pdf[page_num]
                 
                 # Add page heading
@@ -621,38 +1200,38 @@ class PDFService:
                             else:
                                 doc_word.add_paragraph(paragraph_text.strip())
                 
-                # Extract images
+                # Extract images, each xref once however many pages place it
                 image_list = page.get_images()
                 for img_index, img in enumerate(image_list):
-                    try:
-                        xref = img[0]
-                        base_image = doc_pdf.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        image_ext = base_image["ext"]
-                        
-                        # Save image temporarily
-                        temp_img_path = os.path.join(self.temp_dir, f"temp_img_{page_num}_{img_index}.{image_ext}")
-                        with open(temp_img_path, "wb") as img_file:
-                            img_file.write(image_bytes)
-                        
-                        # Add image to Word document
+                    xref = img[0]
+                    if xref not in image_memo:
+                        image_memo[xref] = None
                         try:
-                            doc_word.add_picture(temp_img_path, width=Inches(4.0))
-                            logger.debug(f"Added image to Word document: page {page_num}, image {img_index}")
+                            image_bytes = doc_pdf.extract_image(xref)["image"]
+                        except Exception as img_error:
+                            logger.debug(f"Could not extract image {img_index} from page {page_num}: {str(img_error)}")
+                            continue
+                        try:
+                            # Embed the image part once, later placements only reference it
+                            image_memo[xref] = doc_word.part.get_or_add_image(io.BytesIO(image_bytes))
                         except Exception as img_error:
                             logger.debug(f"Could not add image to Word: {str(img_error)}")
-                        finally:
-                            # Clean up temp image
-                            if os.path.exists(temp_img_path):
-                                os.remove(temp_img_path)
-                                
-                    except Exception as img_error:
-                        logger.debug(f"Could not extract image {img_index} from page {page_num}: {str(img_error)}")
+                            continue
+                    if image_memo[xref] is None:
                         continue
+                    
+                    rId, image = image_memo[xref]
+                    width, height = image.scaled_dimensions(Inches(4.0), None)
+                    inline = CT_Inline.new_pic_inline(doc_word.part.next_id, rId, image.filename, width, height)
+                    doc_word.add_paragraph().add_run()._r.add_drawing(inline)
+                    logger.debug(f"Added image to Word document: page {page_num}, image {img_index}")
                 
                 # Add page break (except for last page)
-                if page_num < len(doc_pdf) - 1:
+                if page_index < len(pages) - 1:
                     doc_word.add_page_break()
+                
+                if progress_callback:
+                    progress_callback(page_index + 1, len(pages))
             
             doc_pdf.close()
             
@@ -666,14 +1245,14 @@ class PDFService:
             logger.error(f"PyMuPDF PDF to Word conversion failed: {str(e)}")
             raise
     
-    async def word_to_pdf(self, word_path: str) -> str:
+    def word_to_pdf(self, word_path: str) -> str:
         """Convert Word document to PDF"""
         try:
             # Read Word document
             doc = Document(word_path)
             
             # Generate output path
-            output_path = os.path.join(self.temp_dir, f"converted_{uuid.uuid4().hex}.pdf")
+            output_path = artifact_store.path_for(f"converted_{uuid.uuid4().hex}.pdf", os.path.getsize(word_path))
             
             # Create PDF using reportlab
             from reportlab.pdfgen import canvas
@@ -720,7 +1299,7 @@ class PDFService:
         valid_pages = [p for p in page_numbers if 1 <= p <= total_pages]
         return sorted(list(set(valid_pages)))  # Remove duplicates and sort
     
-    async def _pdf_to_word_fallback(self, pdf_path: str) -> str:
+    def _pdf_to_word_fallback(self, pdf_path: str) -> str:
         """Enhanced fallback method for PDF to Word conversion using PyPDF2"""
         try:
             # Extract text from PDF
@@ -803,7 +1382,7 @@ class PDFService:
                         doc.add_paragraph(f'[Error extracting content from page {i + 1}: {str(page_error)}]')
                 
                 # Generate output path
-                output_path = os.path.join(self.temp_dir, f"converted_fallback_{uuid.uuid4().hex}.docx")
+                output_path = artifact_store.path_for(f"converted_fallback_{uuid.uuid4().hex}.docx", os.path.getsize(pdf_path))
                 doc.save(output_path)
                 
                 logger.info(f"Successfully converted PDF to Word using fallback method: {output_path}")
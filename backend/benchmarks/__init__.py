@@ -0,0 +1 @@
+# TealPDF Benchmarks
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Synthetic benchmark inputs
+Every generator writes into the given directory and returns the path(s) it
+created. Content is seeded, so the same arguments always produce the same
+bytes and results stay comparable across runs.
+"""
+
+import os
+import random
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFilter
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from docx import Document
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud "
+    "exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat."
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(LOREM) for _ in range(words)).capitalize() + "."
+
+
+def photo_image(directory: str, size: int, seed: int = 0, name: str = None) -> str:
+    """Photo-like image: smooth gradients, soft shapes and sensor noise"""
+    rng = random.Random(seed)
+    width, height = size, size * 3 // 4
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(24):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(size // 20, size // 4)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+    img = img.filter(ImageFilter.GaussianBlur(size / 100))
+
+    noise = Image.effect_noise((width, height), 12).convert("RGB")
+    img = Image.blend(img, noise, 0.08)
+
+    path = os.path.join(directory, name or f"photo_{size}_{seed}.jpg")
+    img.save(path, "JPEG", quality=92)
+    return path
+
+
+def graphic_image(directory: str, size: int, seed: int = 0, name: str = None) -> str:
+    """Graphic-like image: flat colours, hard edges and text, with transparency"""
+    rng = random.Random(seed)
+    img = Image.new("RGBA", (size, size * 3 // 4), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    palette = [tuple(rng.randrange(256) for _ in range(3)) + (255,) for _ in range(8)]
+    for _ in range(40):
+        x0, y0 = rng.randrange(img.width), rng.randrange(img.height)
+        x1, y1 = x0 + rng.randrange(size // 4), y0 + rng.randrange(size // 4)
+        draw.rectangle((x0, y0, x1, y1), fill=rng.choice(palette))
+    for line in range(10):
+        draw.text((10, 10 + line * 14), _sentence(rng, 6), fill=(0, 0, 0, 255))
+
+    path = os.path.join(directory, name or f"graphic_{size}_{seed}.png")
+    img.save(path, "PNG")
+    return path
+
+
+def text_pdf(directory: str, pages: int, seed: int = 0, name: str = None) -> str:
+    """Text-only PDF, about 45 lines of text per page"""
+    rng = random.Random(seed)
+    path = os.path.join(directory, name or f"text_{pages}p_{seed}.pdf")
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(50, 800, f"Section {page + 1}")
+        c.setFont("Helvetica", 10)
+        for line in range(45):
+            c.drawString(50, 770 - line * 16, _sentence(rng))
+        c.showPage()
+    c.save()
+    return path
+
+
+def image_pdf(directory: str, pages: int, image_size: int = 1600, seed: int = 0, name: str = None) -> str:
+    """Image-heavy PDF, one distinct photo per page like a scanned document"""
+    path = os.path.join(directory, name or f"images_{pages}p_{image_size}_{seed}.pdf")
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        image_path = photo_image(directory, image_size, seed=seed * 1000 + page, name=f"_page_image_{seed}_{page}.jpg")
+        c.drawImage(image_path, 40, 150, width=515, height=386)
+        c.drawString(40, 800, f"Scanned page {page + 1}")
+        c.showPage()
+        os.remove(image_path)
+    c.save()
+    return path
+
+
+def shared_xobject_pdf(directory: str, pages: int, image_size: int = 1200, seed: int = 0, name: str = None) -> str:
+    """PDF whose pages all reference the same image XObject (logos, letterheads)"""
+    path = os.path.join(directory, name or f"shared_{pages}p_{image_size}_{seed}.pdf")
+    image_path = photo_image(directory, image_size, seed=seed, name=f"_shared_image_{seed}.jpg")
+    rng = random.Random(seed)
+    c = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        # reportlab embeds an image once per document and references it from every page
+        c.drawImage(image_path, 40, 600, width=200, height=150)
+        for line in range(20):
+            c.drawString(50, 560 - line * 16, _sentence(rng))
+        c.showPage()
+    c.save()
+    os.remove(image_path)
+    return path
+
+
+def pdf_set(directory: str, files: int, pages: int, seed: int = 0) -> List[str]:
+    """Several distinct text PDFs, e.g. merge inputs"""
+    return [
+        text_pdf(directory, pages, seed=seed + index, name=f"set_{files}x{pages}_{seed}_{index:03d}.pdf")
+        for index in range(files)
+    ]
+
+
+def word_document(directory: str, paragraphs: int, seed: int = 0, name: str = None) -> str:
+    """Word document with headings and paragraphs"""
+    rng = random.Random(seed)
+    document = Document()
+    for index in range(paragraphs):
+        if index % 10 == 0:
+            document.add_heading(f"Chapter {index // 10 + 1}", level=1)
+        document.add_paragraph(" ".join(_sentence(rng) for _ in range(4)))
+    path = os.path.join(directory, name or f"document_{paragraphs}_{seed}.docx")
+    document.save(path)
+    return path
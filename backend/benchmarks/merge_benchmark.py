@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Merge engine benchmark
+Compares the PyMuPDF and PyPDF2 merge paths on a synthetic corpus of
+scan-like PDFs that all embed the same images, the worst case for peak
+memory and the best case for deduplication.
+
+Run from the backend directory:
+    python -m benchmarks.merge_benchmark --files 50 --pages 4
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import multiprocessing
+
+from PIL import Image
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+
+# Allow running as a plain script from the backend directory as well
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENGINES = ("pymupdf", "pypdf2")
+
+
+def build_corpus(directory: str, files: int, pages: int, image_size: int) -> list:
+    """Write `files` PDFs of `pages` pages, each page showing a shared scan-like image"""
+    scan_path = os.path.join(directory, "scan.png")
+    # Noise does not compress, so every embedded copy costs its full size
+    Image.effect_noise((image_size, image_size), 64).convert("RGB").save(scan_path)
+
+    pdf_paths = []
+    for index in range(files):
+        pdf_path = os.path.join(directory, f"input_{index:03d}.pdf")
+        c = canvas.Canvas(pdf_path, pagesize=A4)
+        for page in range(pages):
+            c.drawImage(scan_path, 40, 200, width=500, height=500)
+            c.drawString(40, 780, f"Document {index + 1}, page {page + 1}")
+            c.showPage()
+        c.save()
+        pdf_paths.append(pdf_path)
+    return pdf_paths
+
+
+def _run_engine(engine: str, pdf_paths: list, output_path: str, results):
+    """Run one merge in a fresh process so its peak RSS is its own"""
+    from app.services.pdf_service import PDFService
+
+    pdf_service = PDFService()
+    merge = pdf_service._merge_with_pymupdf if engine == "pymupdf" else pdf_service._merge_with_pypdf2
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    merge(pdf_paths, output_path)
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results.put({
+        "engine": engine,
+        "seconds": round(elapsed, 3),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "peak_rss_growth_mb": round((peak_kb - baseline_kb) / 1024, 1),
+        "output_mb": round(os.path.getsize(output_path) / (1024 * 1024), 2),
+    })
+
+
+def run_benchmark(files: int, pages: int, image_size: int, repeat: int) -> dict:
+    directory = tempfile.mkdtemp(prefix="tealpdf_bench_merge_")
+    try:
+        pdf_paths = build_corpus(directory, files, pages, image_size)
+        input_mb = sum(os.path.getsize(path) for path in pdf_paths) / (1024 * 1024)
+
+        context = multiprocessing.get_context("spawn")
+        runs = []
+        for _ in range(repeat):
+            for engine in ENGINES:
+                results = context.Queue()
+                output_path = os.path.join(directory, f"merged_{engine}.pdf")
+                process = context.Process(target=_run_engine, args=(engine, pdf_paths, output_path, results))
+                process.start()
+                runs.append(results.get())
+                process.join()
+
+        summary = {}
+        for engine in ENGINES:
+            engine_runs = [run for run in runs if run["engine"] == engine]
+            summary[engine] = {
+                "best_seconds": min(run["seconds"] for run in engine_runs),
+                "peak_rss_mb": max(run["peak_rss_mb"] for run in engine_runs),
+                "peak_rss_growth_mb": max(run["peak_rss_growth_mb"] for run in engine_runs),
+                "output_mb": engine_runs[-1]["output_mb"],
+            }
+
+        return {
+            "corpus": {"files": files, "pages_per_file": pages, "image_size": image_size, "input_mb": round(input_mb, 2)},
+            "engines": summary,
+            "runs": runs,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PyMuPDF and PyPDF2 merge engines")
+    parser.add_argument("--files", type=int, default=50, help="number of input PDFs")
+    parser.add_argument("--pages", type=int, default=4, help="pages per input PDF")
+    parser.add_argument("--image-size", type=int, default=1200, help="side of the embedded scan image in pixels")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per engine, the best time is reported")
+    parser.add_argument("--json", action="store_true", help="print the full results as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.files, args.pages, args.image_size, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    corpus = report["corpus"]
+    print(f"Merging {corpus['files']} files x {corpus['pages_per_file']} pages ({corpus['input_mb']} MB input)")
+    print(f"{'engine':<10}{'seconds':>10}{'peak RSS MB':>14}{'RSS growth MB':>16}{'output MB':>12}")
+    for engine, stats in report["engines"].items():
+        print(f"{engine:<10}{stats['best_seconds']:>10}{stats['peak_rss_mb']:>14}{stats['peak_rss_growth_mb']:>16}{stats['output_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
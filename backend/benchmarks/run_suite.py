@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Service benchmark suite
+Runs the PDFService and ImageService methods on synthetic corpora of growing
+size (pages, image resolution, file count) and reports throughput, p50/p99
+latency and peak memory per case. Each case runs in a fresh process, so its
+peak RSS is its own.
+
+Run from the backend directory:
+    python -m benchmarks.run_suite --output results.json
+    python -m benchmarks.run_suite --quick --cases pdf.compress image
+    python -m benchmarks.run_suite --compare results.json   # exit code 1 on regressions
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import resource
+import subprocess
+import multiprocessing
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# Allow running as a plain script from the backend directory as well
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus
+
+
+class Case(NamedTuple):
+    """One benchmark: the inputs it builds and the service call it times"""
+    name: str
+    operation: str
+    build: Callable[[str], List[str]]
+    run: Callable[[Dict[str, Any], List[str]], Any]
+
+
+def _consume_split(services: Dict[str, Any], inputs: List[str]) -> None:
+    pdf_service = services["pdf"]
+    parts = pdf_service.plan_split(inputs[0])
+    for _ in pdf_service.iter_split_parts(inputs[0], parts):
+        pass
+
+
+def build_cases(quick: bool = False) -> List[Case]:
+    """The benchmark matrix, smaller sizes with quick=True"""
+    page_counts = (5, 20) if quick else (10, 50)
+    many_pages = (50,) if quick else (200, 1000)
+    file_counts = (5,) if quick else (10, 50)
+    image_sizes = (800,) if quick else (1000, 3000)
+
+    cases = []
+    for pages in page_counts:
+        cases += [
+            Case(f"pdf.compress/images-{pages}p", "pdf.compress",
+                 lambda d, pages=pages: [corpus.image_pdf(d, pages, image_size=1200)],
+                 lambda s, inputs: s["pdf"].compress_pdf(inputs[0])),
+            Case(f"pdf.compress/shared-xobject-{pages}p", "pdf.compress",
+                 lambda d, pages=pages: [corpus.shared_xobject_pdf(d, pages)],
+                 lambda s, inputs: s["pdf"].compress_pdf(inputs[0])),
+            Case(f"pdf.to_word/text-{pages}p", "pdf.to_word",
+                 lambda d, pages=pages: [corpus.text_pdf(d, pages)],
+                 lambda s, inputs: s["pdf"].pdf_to_word(inputs[0])),
+        ]
+    for pages in many_pages:
+        cases += [
+            Case(f"pdf.page_count/text-{pages}p", "pdf.page_count",
+                 lambda d, pages=pages: [corpus.text_pdf(d, pages)],
+                 lambda s, inputs: s["pdf"].get_page_count(inputs[0])),
+            Case(f"pdf.split/text-{pages}p", "pdf.split",
+                 lambda d, pages=pages: [corpus.text_pdf(d, pages)],
+                 _consume_split),
+        ]
+    for files in file_counts:
+        cases.append(
+            Case(f"pdf.merge/text-{files}x5p", "pdf.merge",
+                 lambda d, files=files: corpus.pdf_set(d, files, 5),
+                 lambda s, inputs: s["pdf"].merge_pdfs(inputs))
+        )
+    cases.append(
+        Case("pdf.word_to_pdf/doc-100", "pdf.word_to_pdf",
+             lambda d: [corpus.word_document(d, 100)],
+             lambda s, inputs: s["pdf"].word_to_pdf(inputs[0]))
+    )
+    for size in image_sizes:
+        cases += [
+            Case(f"image.resize/photo-{size}", "image.resize",
+                 lambda d, size=size: [corpus.photo_image(d, size)],
+                 lambda s, inputs: s["image"].resize_image_advanced(inputs[0], resize_type="percentage", percentage=50)),
+            Case(f"image.resize/photo-{size}-thumbnail-fast", "image.resize",
+                 lambda d, size=size: [corpus.photo_image(d, size)],
+                 lambda s, inputs: s["image"].resize_image_advanced(inputs[0], width=200, resize_mode="fast")),
+            Case(f"image.crop/photo-{size}", "image.crop",
+                 lambda d, size=size: [corpus.photo_image(d, size)],
+                 lambda s, inputs: s["image"].crop_image(inputs[0], 10, 10, size // 2, size // 3)),
+            Case(f"image.compress/photo-{size}", "image.compress",
+                 lambda d, size=size: [corpus.photo_image(d, size)],
+                 lambda s, inputs: s["image"].compress_image(inputs[0], 85, exhaustive=True)),
+            Case(f"image.compress/graphic-{size}", "image.compress",
+                 lambda d, size=size: [corpus.graphic_image(d, size)],
+                 lambda s, inputs: s["image"].compress_image(inputs[0], 85, exhaustive=True)),
+        ]
+    return cases
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _discard(output: Any):
+    """Remove what a case produced, so iterations do not fill the workspace"""
+    from app.services.artifact_service import artifact_store
+
+    if isinstance(output, str):
+        artifact_store.release(output)
+    elif isinstance(output, (list, tuple)):
+        artifact_store.release(*[path for path in output if isinstance(path, str)])
+
+
+def _run_case(name: str, quick: bool, inputs: List[str], iterations: int, warmup: int, results):
+    """Time one case in this (fresh) process and report its statistics"""
+    from app.services.artifact_service import artifact_store
+    from app.services.pdf_service import PDFService
+    from app.services.image_service import ImageService
+
+    case = next(case for case in build_cases(quick) if case.name == name)
+    services = {"pdf": PDFService(), "image": ImageService()}
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencies = []
+    try:
+        with artifact_store.workspace():
+            for iteration in range(warmup + iterations):
+                started = time.perf_counter()
+                output = case.run(services, inputs)
+                elapsed = time.perf_counter() - started
+                _discard(output)
+                if iteration >= warmup:
+                    latencies.append(elapsed)
+    except Exception as e:
+        results.put({"case": name, "operation": case.operation, "error": str(e)})
+        return
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    input_bytes = sum(os.path.getsize(path) for path in inputs)
+    mean = sum(latencies) / len(latencies)
+    results.put({
+        "case": name,
+        "operation": case.operation,
+        "iterations": len(latencies),
+        "input_bytes": input_bytes,
+        "mean_seconds": round(mean, 4),
+        "p50_seconds": round(_percentile(latencies, 50), 4),
+        "p99_seconds": round(_percentile(latencies, 99), 4),
+        "min_seconds": round(min(latencies), 4),
+        "max_seconds": round(max(latencies), 4),
+        "ops_per_second": round(1 / mean, 3) if mean else None,
+        "input_mb_per_second": round(input_bytes / (1024 * 1024) / mean, 3) if mean else None,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "peak_rss_growth_mb": round((peak_kb - baseline_kb) / 1024, 1),
+    })
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(filters: List[str], iterations: int, warmup: int, quick: bool) -> Dict[str, Any]:
+    cases = [case for case in build_cases(quick) if not filters or any(f in case.name for f in filters)]
+    directory = tempfile.mkdtemp(prefix="tealpdf_bench_")
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    try:
+        for case in cases:
+            case_directory = os.path.join(directory, case.name.replace("/", "_"))
+            os.makedirs(case_directory)
+            inputs = case.build(case_directory)
+
+            queue = context.Queue()
+            process = context.Process(target=_run_case, args=(case.name, quick, inputs, iterations, warmup, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            results.append(result)
+            _print_result(result)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "warmup": warmup,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def _print_result(result: Dict[str, Any]):
+    if "error" in result:
+        print(f"{result['case']:<40} ERROR {result['error']}")
+        return
+    print(
+        f"{result['case']:<40}{result['p50_seconds']:>10.4f}{result['p99_seconds']:>10.4f}"
+        f"{result['ops_per_second']:>10.2f}{result['input_mb_per_second']:>10.2f}{result['peak_rss_mb']:>10.1f}"
+    )
+
+
+# Smallest absolute growth counted as a regression, below this it is noise
+MIN_REGRESSION = {"p50_seconds": 0.005, "peak_rss_mb": 5.0}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases whose p50 latency or peak memory grew by more than threshold"""
+    previous = {result["case"]: result for result in baseline["results"] if "error" not in result}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["case"])
+        if before is None or "error" in result:
+            continue
+        for metric, min_growth in MIN_REGRESSION.items():
+            growth = result[metric] - before[metric]
+            if before[metric] and growth > min_growth and result[metric] > before[metric] * (1 + threshold):
+                change = (result[metric] / before[metric] - 1) * 100
+                regressions.append(f"{result['case']}: {metric} {before[metric]} -> {result[metric]} (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDF and image services on synthetic inputs")
+    parser.add_argument("--cases", nargs="*", default=[], help="only run cases whose name contains one of these")
+    parser.add_argument("--iterations", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per case before timing")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast smoke run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative growth counted as a regression")
+    args = parser.parse_args()
+
+    print(f"{'case':<40}{'p50 s':>10}{'p99 s':>10}{'ops/s':>10}{'MB/s':>10}{'peak MB':>10}")
+    report = run_suite(args.cases, args.iterations, args.warmup, args.quick)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import os
 import logging
-from app.routers import pdf_tools, image_tools
+from app.routers import pdf_tools, image_tools, jobs
+from app.services.executor_service import executor_service
+from app.services.job_service import job_service
+from app.services.cache_service import result_cache
+from app.services.format_predictor import format_predictor
+from app.services.artifact_service import artifact_store, WorkspaceMiddleware
+from app.services.metrics_service import metrics, MetricsMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,11 +32,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Compression-Report"],
 )
 
+# Give every request its own scratch workspace, removed once the response is sent
+app.add_middleware(WorkspaceMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(pdf_tools.router, prefix="", tags=["PDF Tools"])
 app.include_router(image_tools.router, prefix="/image", tags=["Image Tools"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
 
 @app.get("/")
 async def root():
@@ -41,6 +54,61 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "API is operational"}
 
+@app.get("/stats")
+async def stats():
+    """Worker pool queue depth, job, cache, artifact and format predictor counters"""
+    return {
+        "executor": executor_service.get_stats(),
+        "jobs": await asyncio.to_thread(job_service.get_stats),
+        "cache": result_cache.get_stats(),
+        "artifacts": await asyncio.to_thread(artifact_store.get_stats),
+        "image_format_predictor": format_predictor.get_stats(),
+    }
+
+def _collect_gauges():
+    """Current values of the counters kept by the services, read at scrape time"""
+    executor_stats = executor_service.get_stats()
+    for operation, stats in executor_stats["operations"].items():
+        yield "tealpdf_operation_queue_depth", "gauge", "Calls waiting for a free slot, by operation", {"operation": operation}, stats["queued"]
+        yield "tealpdf_operation_in_flight", "gauge", "Calls currently running, by operation", {"operation": operation}, stats["in_flight"]
+
+    for status, count in job_service.get_stats().items():
+        yield "tealpdf_jobs", "gauge", "Background jobs by status", {"status": status}, count
+
+    cache_stats = result_cache.get_stats()
+    yield "tealpdf_cache_entries", "gauge", "Entries in the result cache", {}, cache_stats["entries"]
+    yield "tealpdf_cache_bytes", "gauge", "Bytes stored in the result cache", {}, cache_stats["bytes"]
+    for counter in ("hits", "misses", "evictions"):
+        yield f"tealpdf_cache_{counter}_total", "counter", f"Result cache {counter}", {}, cache_stats[counter]
+
+    artifact_stats = artifact_store.get_stats()
+    for root, usage in artifact_stats["roots"].items():
+        yield "tealpdf_artifact_files", "gauge", "Scratch files on disk, by root", {"root": root}, usage["files"]
+        yield "tealpdf_artifact_bytes", "gauge", "Bytes of scratch files on disk, by root", {"root": root}, usage["bytes"]
+
+metrics.collector(_collect_gauges)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(await asyncio.to_thread(metrics.render), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def startup():
+    """Resume background jobs left over from a previous run, start the artifact janitor and cache purge"""
+    job_service.start()
+    artifact_store.start()
+    result_cache.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background maintenance, save predictor statistics and stop worker pools"""
+    await job_service.stop()
+    await artifact_store.stop()
+    await result_cache.stop()
+    format_predictor.save()
+    executor_service.shutdown()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -0,0 +1,33 @@
+import os
+import time
+
+from app.services.artifact_service import ArtifactStore
+
+
+def _write_old(path, seconds_old):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * 200)
+    old = time.time() - seconds_old
+    os.utime(path, (old, old))
+
+
+def test_sweep_leaves_active_workspaces_alone(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEALPDF_ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.setenv("TEALPDF_ARTIFACT_MAX_BYTES", "100")
+    store = ArtifactStore()
+    leftover_path = os.path.join(store._workspace_path(store.directory, "ab" * 16), "leftover.pdf")
+    _write_old(leftover_path, store.grace_period + 10)
+
+    with store.workspace():
+        active_path = store.path_for("input.pdf")
+        _write_old(active_path, store.max_age + 10)
+
+        result = store.sweep()
+        assert os.path.exists(active_path)
+        assert not os.path.exists(leftover_path)
+        assert result["over_quota"] == 1
+
+    # Released with its workspace once the block ends
+    assert not os.path.exists(active_path)
+    assert store._active_workspaces == {}
@@ -0,0 +1,42 @@
+import io
+import os
+
+import fitz
+import pytest
+from PIL import Image
+
+from app.services.artifact_service import artifact_store
+from app.services.pdf_service import PDFService
+
+
+def _pdf_with_image(tmp_path):
+    buffer = io.BytesIO()
+    Image.effect_noise((600, 600), 60).convert("RGB").save(buffer, "PNG")
+    document = fitz.open()
+    page = document.new_page()
+    # Placed at 100 pt, far above the resolution of any profile
+    page.insert_image(fitz.Rect(0, 0, 100, 100), stream=buffer.getvalue())
+    page.insert_text((72, 700), "hello " * 50)
+    path = tmp_path / "scan.pdf"
+    document.save(path)
+    return str(path)
+
+
+def test_report_stages_add_up_to_the_bytes_saved(tmp_path):
+    source = _pdf_with_image(tmp_path)
+
+    with artifact_store.workspace():
+        output_path, report = PDFService().compress_pdf_with_report(source, profile="screen")
+
+        assert report["engine"] == "pymupdf"
+        assert report["original_size"] == os.path.getsize(source)
+        assert report["compressed_size"] == os.path.getsize(output_path)
+        assert set(report["savings"]) == {"images", "streams", "structure"}
+        assert all(saved >= 0 for saved in report["savings"].values())
+        assert sum(report["savings"].values()) == report["original_size"] - report["compressed_size"]
+        assert report["savings"]["images"] > report["original_size"] // 2
+
+
+def test_unknown_profiles_are_refused(tmp_path):
+    with pytest.raises(ValueError, match="Compression profile must be one of"):
+        PDFService().compress_pdf_with_report(_pdf_with_image(tmp_path), profile="tiny")
@@ -0,0 +1,59 @@
+import os
+import zipfile
+
+import pytest
+
+from app.services.artifact_service import artifact_store
+from app.services.file_service import FileService
+
+
+def _archive(tmp_path, members):
+    path = tmp_path / "upload.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def test_only_allowed_members_are_extracted_under_their_base_name(tmp_path):
+    path = _archive(tmp_path, {
+        "scans/page1.png": b"one",
+        "../../escape.jpg": b"two",
+        "notes.txt": b"skip",
+        ".hidden.png": b"skip",
+        "__MACOSX/scans/._page1.png": b"skip",
+    })
+
+    with artifact_store.workspace():
+        extracted = FileService().extract_zip(path, [".png", ".jpg"], max_files=5)
+        assert [name for name, _ in extracted] == ["page1.png", "escape.jpg"]
+        for _, temp_path in extracted:
+            assert os.path.dirname(temp_path) == os.path.dirname(artifact_store.path_for("probe"))
+        assert open(extracted[1][1], "rb").read() == b"two"
+
+
+def test_too_many_members_are_refused(tmp_path):
+    path = _archive(tmp_path, {f"{index}.png": b"x" for index in range(3)})
+
+    with artifact_store.workspace():
+        with pytest.raises(ValueError, match="at most 2"):
+            FileService().extract_zip(path, [".png"], max_files=2)
+
+
+def test_archives_unpacking_past_the_byte_limit_are_refused(tmp_path):
+    # Compresses to a few hundred bytes, unpacks to 2 MB
+    path = _archive(tmp_path, {"bomb.png": b"\0" * (2 * 1024 * 1024)})
+
+    with artifact_store.workspace():
+        with pytest.raises(ValueError, match="unpacks to more than"):
+            FileService().extract_zip(path, [".png"], max_files=5, max_bytes=1024 * 1024)
+        directory = os.path.dirname(artifact_store.path_for("probe"))
+        assert os.listdir(directory) == []
+
+
+def test_corrupt_archives_are_refused(tmp_path):
+    path = tmp_path / "upload.zip"
+    path.write_bytes(b"not a zip")
+
+    with pytest.raises(ValueError, match="Invalid zip archive"):
+        FileService().extract_zip(str(path), [".png"], max_files=5)
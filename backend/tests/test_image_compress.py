@@ -0,0 +1,53 @@
+import pytest
+from PIL import Image, TiffImagePlugin
+
+from app.services.format_predictor import format_predictor
+from app.services.image_service import ImageService, _NormalizedImage, _iter_strips, _load_rows
+
+
+def test_compress_keeps_source_format_in_predictor_bucket(tmp_path):
+    path = tmp_path / "graphic.png"
+    Image.new("RGB", (64, 64), (0, 128, 128)).save(path, "PNG")
+
+    ImageService().compress_image(str(path), quality=85, exhaustive=True)
+
+    buckets = list(format_predictor.get_stats())
+    assert any(bucket.endswith(":PNG") for bucket in buckets), buckets
+    assert not any(bucket.endswith(":UNKNOWN") for bucket in buckets), buckets
+
+
+def test_compression_candidates_carry_no_metadata(tmp_path):
+    description = TiffImagePlugin.ImageFileDirectory_v2()
+    description[270] = "secret description"
+    path = tmp_path / "tagged.tif"
+    Image.new("RGB", (64, 64), (200, 10, 10)).save(path, "TIFF", tiffinfo=description, icc_profile=b"secret icc")
+
+    service = ImageService()
+    with Image.open(path) as img:
+        img.load()
+        normalized = _NormalizedImage(img)
+        outputs = [
+            service._compress_as_png(normalized.stripped),
+            service._compress_as_webp_lossless(normalized.stripped),
+            service._compress_as_jpeg_optimized(normalized.rgb, 85),
+            service._compress_as_tiff_lzw(normalized.stripped),
+        ]
+    for data in outputs:
+        assert b"secret" not in data
+
+
+@pytest.mark.parametrize("fmt, ext", [("BMP", "bmp"), ("TIFF", "tif"), ("PPM", "ppm"), ("PNG", "png")])
+def test_row_reads_match_full_decode(tmp_path, fmt, ext):
+    path = tmp_path / f"rows.{ext}"
+    source = Image.linear_gradient("L").resize((97, 61)).convert("RGB")
+    source.save(path, fmt)
+
+    with Image.open(path) as img:
+        rows = _load_rows(img, 13, 40)
+    assert rows.tobytes() == source.crop((0, 13, 97, 40)).tobytes()
+
+    with Image.open(path) as img:
+        strips = list(_iter_strips(img, 16))
+    assert [top for top, _ in strips] == [0, 16, 32, 48]
+    for top, strip in strips:
+        assert strip.tobytes() == source.crop((0, top, 97, min(61, top + 16))).tobytes()
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.job_service import CANCELLED, COMPLETED, QUEUED, RUNNING, JobService
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEALPDF_JOBS_DIR", str(tmp_path / "jobs"))
+    service = JobService()
+    service.register_handler("echo", lambda input_paths, params, progress_callback: input_paths[0])
+    return service
+
+
+def _queued_job(jobs, tmp_path, job_id="a" * 32):
+    source = tmp_path / f"{job_id}.txt"
+    source.write_text("input")
+    jobs._create(job_id, "echo", [str(source)], {}, "result.txt", "text/plain")
+    return job_id
+
+
+def _set_running(jobs, job_id, pid, token):
+    with jobs._connect() as db:
+        db.execute(
+            "UPDATE jobs SET status = ?, worker_pid = ?, worker_token = ? WHERE id = ?",
+            (RUNNING, pid, token, job_id)
+        )
+
+
+def test_cancelling_a_queued_job_finishes_it(jobs, tmp_path):
+    job_id = _queued_job(jobs, tmp_path)
+
+    assert jobs.cancel(job_id)["status"] == CANCELLED
+    assert jobs._cancel_requested == set()
+
+
+def test_cancelling_unknown_or_finished_jobs_remembers_nothing(jobs, tmp_path):
+    job_id = _queued_job(jobs, tmp_path)
+    jobs.cancel(job_id)
+
+    assert jobs.cancel(job_id)["status"] == CANCELLED
+    assert jobs.cancel("missing") is None
+    assert jobs._cancel_requested == set()
+
+
+def test_cancelling_a_job_running_elsewhere_only_flags_it(jobs, tmp_path):
+    job_id = _queued_job(jobs, tmp_path)
+    _set_running(jobs, job_id, os.getpid() + 1, "other-worker")
+
+    assert jobs.cancel(job_id)["status"] == RUNNING
+    assert jobs._cancel_requested == set()
+    with jobs._connect() as db:
+        assert db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == 1
+
+
+def test_restart_requeues_jobs_of_the_previous_boot(jobs, tmp_path):
+    own = _queued_job(jobs, tmp_path, "a" * 32)
+    previous_boot = _queued_job(jobs, tmp_path, "b" * 32)
+    waiting = _queued_job(jobs, tmp_path, "c" * 32)
+    _set_running(jobs, own, os.getpid(), jobs.worker_token)
+    # A restarted container often gets its old pid back
+    _set_running(jobs, previous_boot, os.getpid(), "previous-boot")
+
+    assert jobs._requeue_orphans() == [previous_boot, waiting]
+    assert jobs.get_job(own)["status"] == RUNNING
+    assert jobs.get_job(previous_boot)["status"] == QUEUED
+
+
+def test_resumed_jobs_run_to_completion(jobs, tmp_path):
+    job_id = _queued_job(jobs, tmp_path)
+    _set_running(jobs, job_id, os.getpid(), "previous-boot")
+
+    async def resume():
+        await jobs.resume_pending()
+        await asyncio.gather(*jobs._tasks.values())
+
+    asyncio.run(resume())
+    job = jobs.get_job(job_id)
+    assert job["status"] == COMPLETED
+    assert open(jobs.get_result(job_id)["path"]).read() == "input"
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from app.services.artifact_service import artifact_store
+from app.services.cache_service import ResultCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEALPDF_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("TEALPDF_CACHE_MAX_BYTES", "250")
+    monkeypatch.setenv("TEALPDF_CACHE_ENABLED", "1")
+    return ResultCache()
+
+
+def _output(tmp_path, name, size=100):
+    path = tmp_path / name
+    path.write_bytes(name.encode()[:1] * size)
+    return str(path)
+
+
+def test_keys_depend_on_inputs_order_and_normalized_params(cache):
+    key = cache.make_key("image/resize", ["a", "b"], {"width": 50.0, "format": " png ", "height": None})
+    assert key.startswith("image/resize:")
+    assert key == cache.make_key("image/resize", ["a", "b"], {"format": "png", "width": 50})
+    assert key != cache.make_key("image/resize", ["b", "a"], {"format": "png", "width": 50})
+    assert key != cache.make_key("image/crop", ["a", "b"], {"format": "png", "width": 50})
+
+
+def test_hit_returns_a_private_link_and_counts_once(cache, tmp_path):
+    key = cache.make_key("merge", ["a"])
+    assert cache.get(key) is None
+
+    cache.put_file(key, _output(tmp_path, "merged.pdf"), {"pages": 3})
+    with artifact_store.workspace():
+        entry = cache.get(key)
+        assert entry.data == {"pages": 3}
+        assert open(entry.path, "rb").read() == b"m" * 100
+
+        # Removing the caller's link leaves the entry in place
+        os.remove(entry.path)
+        assert cache.get(key) is not None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["endpoints"]["merge"] == {"hits": 2, "misses": 1}
+
+
+def test_least_recently_used_entry_is_evicted(cache, tmp_path):
+    first, second, third = (cache.make_key("merge", [name]) for name in "abc")
+    cache.put_file(first, _output(tmp_path, "a.pdf"))
+    cache.put_file(second, _output(tmp_path, "b.pdf"))
+    with artifact_store.workspace():
+        assert cache.get(first) is not None
+
+    cache.put_file(third, _output(tmp_path, "c.pdf"))
+
+    with artifact_store.workspace():
+        assert cache.get(second) is None
+        assert cache.get(first) is not None
+        assert cache.get(third) is not None
+    stats = cache.get_stats()
+    assert (stats["evictions"], stats["entries"], stats["bytes"]) == (1, 2, 200)
+
+
+def test_tee_stores_only_fully_consumed_streams(cache):
+    key = cache.make_key("split", ["a"])
+
+    stream = cache.tee(key, iter([b"one", b"two", b"three"]), ".zip")
+    assert next(stream) == b"one"
+    stream.close()
+    assert cache.get(key) is None
+    assert not [name for _, _, names in os.walk(cache.cache_dir) for name in names]
+
+    assert b"".join(cache.tee(key, iter([b"one", b"two"]), ".zip")) == b"onetwo"
+    with artifact_store.workspace():
+        assert open(cache.get(key).path, "rb").read() == b"onetwo"
+
+
+def test_index_is_rebuilt_from_disk(cache):
+    key = cache.make_key("get-page-count", ["a"])
+    cache.put_data(key, {"page_count": 4})
+
+    reloaded = ResultCache()
+    assert reloaded.get(key).data == {"page_count": 4}
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from PIL import Image
+
+from app.services.pdf_service import _merge_word_parts
+
+
+def _png() -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (0, 128, 128)).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def _part(path, name: str, link: str = None, header_image: bool = False):
+    document = Document()
+    section = document.sections[0]
+    header = section.header.paragraphs[0]
+    header.text = f"Header {name}"
+    if header_image:
+        header.add_run().add_picture(_png())
+    section.footer.paragraphs[0].text = f"Footer {name}"
+    paragraph = document.add_paragraph(f"Body {name}")
+    if link:
+        hyperlink = OxmlElement("w:hyperlink")
+        hyperlink.set(qn("r:id"), document.part.relate_to(link, RT.HYPERLINK, is_external=True))
+        run = OxmlElement("w:r")
+        text = OxmlElement("w:t")
+        text.text = link
+        run.append(text)
+        hyperlink.append(run)
+        paragraph._p.append(hyperlink)
+    document.add_picture(_png())
+    document.save(path)
+    return path
+
+
+def test_merge_keeps_headers_footers_and_links(tmp_path):
+    parts = [
+        _part(tmp_path / "a.docx", "A"),
+        _part(tmp_path / "b.docx", "B", link="https://example.com/b", header_image=True),
+        _part(tmp_path / "c.docx", "C"),
+    ]
+    output = tmp_path / "merged.docx"
+    _merge_word_parts([str(path) for path in parts], str(output))
+
+    merged = Document(str(output))
+    assert len(merged.sections) == 3
+    for section, name in zip(merged.sections, "ABC"):
+        assert section.header.paragraphs[0].text == f"Header {name}"
+        assert section.footer.paragraphs[0].text == f"Footer {name}"
+    assert [p.text[:6] for p in merged.paragraphs if p.text.startswith("Body")] == ["Body A", "Body B", "Body C"]
+
+    header_b = merged.sections[1].header.part
+    assert any(rel.reltype == RT.IMAGE for rel in header_b.rels.values())
+    links = [rel.target_ref for rel in merged.part.rels.values() if rel.reltype == RT.HYPERLINK]
+    assert links == ["https://example.com/b"]
+    # Every part's body image is the same picture, stored once
+    assert len([rel for rel in merged.part.rels.values() if rel.reltype == RT.IMAGE]) == 1
+
+
+def test_merge_refuses_footnote_references(tmp_path):
+    first = _part(tmp_path / "a.docx", "A")
+    second = Document(str(_part(tmp_path / "b.docx", "B")))
+    reference = OxmlElement("w:footnoteReference")
+    reference.set(qn("w:id"), "1")
+    run = OxmlElement("w:r")
+    run.append(reference)
+    second.paragraphs[0]._p.append(run)
+    second.save(str(tmp_path / "b.docx"))
+
+    with pytest.raises(ValueError):
+        _merge_word_parts([str(first), str(tmp_path / "b.docx")], str(tmp_path / "merged.docx"))